@@ -0,0 +1,131 @@
+"""Admission control for document analysis.
+
+Uploads pass through ``admit`` before their files are stored, so an
+overloaded service turns requests away quickly instead of queueing them:
+
+- Backpressure: once ``ANALYSIS_MAX_QUEUE_DEPTH`` analysis jobs are
+  queued or running, new uploads get 503 with a Retry-After of
+  ``ANALYSIS_OVERLOAD_RETRY_AFTER`` seconds. The depth is counted in the
+  database, so it covers the jobs of every web process. Summary jobs are
+  not counted, because they only run when no analysis job is waiting.
+- Rate limiting: each user (the JWT identity) has a token bucket holding
+  up to ``ANALYSIS_RATE_BURST`` documents, refilled at
+  ``ANALYSIS_RATE_PER_MINUTE``. An upload of n documents needs
+  min(n, burst) tokens and takes n. A batch larger than the burst is
+  therefore admitted on a full bucket, and its user then waits for the
+  bucket to refill. Over the limit, uploads get 429 with a Retry-After
+  of the seconds until enough tokens are back.
+
+Buckets are rows of ``rate_limit_buckets``, so every web process sees
+the same limit. Each check is a single conditional UPDATE that refills
+and takes the tokens, which is atomic on SQLite and PostgreSQL alike. A
+user without a row has a full bucket; rows that have refilled are
+deleted whenever a new one is added. 0 disables either check. Admission
+outcomes are counted in ``smartdoc_analysis_admissions_total``.
+"""
+import math
+import time
+
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+
+from config import Config
+from models import db, AnalysisJob, RateLimitBucket
+import metrics
+
+admissions = metrics.counter('smartdoc_analysis_admissions_total',
+                             'Analysis admission decisions by outcome (admitted, rate_limited, overloaded)')
+queue_depth_gauge = metrics.gauge('smartdoc_analysis_queue_depth',
+                                  'Analysis jobs queued or running in all processes, as of the last admission check')
+
+
+class AdmissionRejected(Exception):
+    """An upload was turned away; status is 429 or 503, retry_after is in seconds"""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def queue_depth():
+    """Analysis jobs queued or running in every process"""
+    depth = AnalysisJob.query.filter(
+        AnalysisJob.kind == 'analysis', AnalysisJob.status.in_(('queued', 'running'))
+    ).count()
+    queue_depth_gauge.set(depth)
+    return depth
+
+
+def _limits():
+    """(tokens per second, burst)"""
+    return Config.ANALYSIS_RATE_PER_MINUTE / 60.0, max(1, Config.ANALYSIS_RATE_BURST)
+
+
+def _refilled(now):
+    """SQL expression for a bucket's tokens at `now`"""
+    rate, burst = _limits()
+    tokens = RateLimitBucket.tokens + (now - RateLimitBucket.updated_at) * rate
+    return case((tokens > burst, float(burst)), else_=tokens)
+
+
+def _take(user_id, cost, now):
+    """Take cost tokens from the user's bucket if min(cost, burst) are available; returns 0 or the seconds to wait"""
+    rate, burst = _limits()
+    needed = min(cost, burst)
+    refilled = _refilled(now)
+    taken = RateLimitBucket.query.filter(RateLimitBucket.user_id == user_id, refilled >= needed).update(
+        {'tokens': refilled - cost, 'updated_at': now}, synchronize_session=False
+    )
+    if not taken:
+        available = db.session.query(refilled).filter(RateLimitBucket.user_id == user_id).scalar()
+        if available is not None:
+            db.session.rollback()
+            return (needed - available) / rate
+        # No row: the bucket is full
+        RateLimitBucket.query.filter(_refilled(now) >= burst).delete(synchronize_session=False)
+        try:
+            with db.session.begin_nested():
+                db.session.add(RateLimitBucket(user_id=user_id, tokens=float(burst - cost), updated_at=now))
+        except IntegrityError:
+            # Another request of the same user added the row first
+            db.session.commit()
+            return _take(user_id, cost, now)
+    db.session.commit()
+    return 0
+
+
+def admit(user_id, documents=1):
+    """Admit an upload of `documents` documents for analysis, or raise AdmissionRejected"""
+    if Config.ANALYSIS_MAX_QUEUE_DEPTH > 0 and queue_depth() >= Config.ANALYSIS_MAX_QUEUE_DEPTH:
+        admissions.inc(outcome='overloaded')
+        raise AdmissionRejected('The analysis queue is full, please retry later', 503,
+                                Config.ANALYSIS_OVERLOAD_RETRY_AFTER)
+
+    if Config.ANALYSIS_RATE_PER_MINUTE > 0 and documents > 0:
+        wait = _take(user_id, documents, time.time())
+        if wait:
+            admissions.inc(outcome='rate_limited')
+            retry_after = max(1, math.ceil(wait))
+            raise AdmissionRejected(f'Upload rate limit reached, retry in {retry_after} seconds', 429, retry_after)
+
+    admissions.inc(outcome='admitted')
+
+
+def stats():
+    """Current queue depth, limits, buckets and this process's admission counts"""
+    counts = {dict(labels)['outcome']: count for _, labels, count in admissions.samples()}
+    refilled = _refilled(time.time())
+    tracked_users, limited_users = db.session.query(
+        func.count(RateLimitBucket.user_id), func.coalesce(func.sum(case((refilled < 1, 1), else_=0)), 0)
+    ).one()
+    return {
+        'queue_depth': queue_depth(),
+        'max_queue_depth': Config.ANALYSIS_MAX_QUEUE_DEPTH,
+        'rate_per_minute': Config.ANALYSIS_RATE_PER_MINUTE,
+        'rate_burst': Config.ANALYSIS_RATE_BURST,
+        'admitted': counts.get('admitted', 0),
+        'rejected': {'rate_limited': counts.get('rate_limited', 0), 'overloaded': counts.get('overloaded', 0)},
+        'users_tracked': tracked_users,
+        'users_out_of_tokens': limited_users
+    }
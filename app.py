@@ -1,16 +1,51 @@
 import os
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Request, current_app, request, jsonify, send_from_directory, g, Response
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
+from sqlalchemy import and_, or_, event
+from sqlalchemy.orm import joinedload
 from config import Config
-from models import db, User, Document, Analysis
-from utils import allowed_file, analyze_document
+from models import db, User, Document, UploadSession, BackfillRun
+from utils import allowed_file
+import utils
+from migrations import run_migrations, schema_lock
+import admission
+import auth
+import backfill
+import jobs
+import metrics
+import search
+import stats
+import storage
+import text_store
+import uploads
+import inference
+import model_server
+import result_cache
+from model_registry import registry
 import json
+import sqlite3
+import base64
+import time
 from datetime import datetime
 
+
+
+class SizedRequest(Request):
+    """A request whose size limit is BATCH_MAX_REQUEST_SIZE on the batch upload route, MAX_CONTENT_LENGTH elsewhere"""
+
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'upload_documents_batch':
+            return current_app.config['BATCH_MAX_REQUEST_SIZE']
+        return super().max_content_length
+
+
 app = Flask(__name__, static_folder='static', static_url_path='')
 app.config.from_object(Config)
+app.request_class = SizedRequest
 
 # Initialize extensions
 CORS(app)
@@ -21,22 +56,236 @@ jwt = JWTManager(app)
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 
+@event.listens_for(db.Engine, 'connect')
+def _configure_sqlite(dbapi_connection, connection_record):
+    """Enable WAL and a busy timeout on every new SQLite connection"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {app.config['SQLITE_BUSY_TIMEOUT_MS']}")
+    if app.config['SQLITE_WAL']:
+        cursor.execute('PRAGMA journal_mode = WAL')
+        cursor.execute('PRAGMA synchronous = NORMAL')
+    cursor.close()
+
+
+def upgrade_database():
+    """Create tables, apply migrations and create the admin user (one process at a time)"""
+    with schema_lock():
+        db.create_all()
+        run_migrations()
+        search.init_search()
+        
+        # Create admin user if not exists
+        admin = User.query.filter_by(email=app.config['ADMIN_EMAIL']).first()
+        if not admin:
+            admin = User(
+                email=app.config['ADMIN_EMAIL'],
+                full_name='Admin User',
+                is_admin=True
+            )
+            admin.set_password(app.config['ADMIN_PASSWORD'], app.config['BCRYPT_ROUNDS'])
+            db.session.add(admin)
+            db.session.commit()
+            print(f"Admin user created: {app.config['ADMIN_EMAIL']}")
+
+
 # Initialize database and create admin user
-with app.app_context():
-    db.create_all()
+if app.config['AUTO_MIGRATE']:
+    with app.app_context():
+        upgrade_database()
+
+
+
+def start_background_work():
+    """Resume queued analysis jobs and running backfills in this process"""
+    jobs.init_app(app)
+    backfill.init_app(app)
+
+
+def after_fork():
+    """Prepare a worker forked from a preloaded parent (called by gunicorn.conf.py)"""
+    # Pooled connections were opened by the parent; the child must open its own
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    start_background_work()
+
+
+if app.config['MODEL_PRELOAD']:
+    # Loaded before the server forks, so every worker shares the weights copy-on-write;
+    # threads do not survive a fork, so background work starts in after_fork()
+    registry.warm_up()
+else:
+    start_background_work()
+
+
+# ==================== INSTRUMENTATION ====================
+
+@event.listens_for(db.Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which is dropped with the statement even when it raises
+    if context is not None:
+        context.query_start = time.perf_counter()
+
+
+@event.listens_for(db.Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, 'query_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    metrics.db_duration.observe(elapsed, statement=statement.lstrip().split(' ', 1)[0].upper())
+    if g:
+        g.db_time = g.get('db_time', 0.0) + elapsed
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+    metrics.http_in_flight.inc()
+
+
+@app.after_request
+def _record_request(response):
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.http_requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    metrics.http_duration.observe(elapsed, endpoint=endpoint, method=request.method)
     
-    # Create admin user if not exists
-    admin = User.query.filter_by(email=app.config['ADMIN_EMAIL']).first()
-    if not admin:
-        admin = User(
-            email=app.config['ADMIN_EMAIL'],
-            full_name='Admin User',
-            is_admin=True
+    if app.config['SERVER_TIMING']:
+        response.headers['Server-Timing'] = (
+            f"db;dur={g.get('db_time', 0.0) * 1000:.2f}, app;dur={elapsed * 1000:.2f}"
         )
-        admin.set_password(app.config['ADMIN_PASSWORD'])
-        db.session.add(admin)
+    return response
+
+
+@app.teardown_request
+def _end_request(exc):
+    if 'request_start' in g:
+        metrics.http_in_flight.dec()
+
+
+@app.errorhandler(413)
+def _request_too_large(e):
+    return jsonify({'error': f'The request exceeds the maximum size of {request.max_content_length} bytes'}), 413
+
+
+@app.cli.command('upgrade-db')
+def upgrade_db_command():
+    """Create tables and apply pending schema migrations"""
+    upgrade_database()
+    print('Database is up to date')
+
+
+@app.cli.command('serve-models')
+def serve_models_command():
+    """Load the models and serve them to other processes on MODEL_SERVER_ADDRESS"""
+    model_server.serve()
+
+
+@app.cli.command('warm-up')
+def warm_up_models():
+    """Load all enabled models and report load times"""
+    registry.warm_up()
+    print(json.dumps(registry.status(), indent=2))
+
+
+# ==================== HELPERS ====================
+
+def encode_cursor(document):
+    """Encode a document's sort key as an opaque pagination cursor"""
+    key = f"{document.uploaded_at.isoformat()}|{document.id}"
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decode a pagination cursor into (uploaded_at, id)"""
+    uploaded_at, doc_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+    return datetime.fromisoformat(uploaded_at), int(doc_id)
+
+
+def paginate_documents(query):
+    """Return one page of documents (newest first) and the cursor for the next page"""
+    limit = request.args.get('limit', app.config['DOCUMENTS_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, app.config['DOCUMENTS_MAX_PAGE_SIZE']))
+    
+    cursor = request.args.get('cursor')
+    if cursor:
+        uploaded_at, doc_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Document.uploaded_at < uploaded_at,
+            and_(Document.uploaded_at == uploaded_at, Document.id < doc_id)
+        ))
+    
+    # Load analyses in the same query instead of one SELECT per document
+    documents = (
+        query.options(joinedload(Document.analysis))
+        .order_by(Document.uploaded_at.desc(), Document.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    
+    next_cursor = encode_cursor(documents[limit - 1]) if len(documents) > limit else None
+    return documents[:limit], next_cursor
+
+
+def add_document(user_id, filename, file_type, content_hash, file_path, file_size):
+    """Add a Document for a stored upload, reusing a previous analysis of the same content
+    
+    Returns (document, reused); the caller commits.
+    """
+    document = Document(
+        filename=filename,
+        file_path=file_path,
+        file_type=file_type,
+        file_size=file_size,
+        content_hash=content_hash,
+        user_id=user_id
+    )
+    db.session.add(document)
+    db.session.flush()
+    
+    previous = storage.find_analysis(content_hash, file_type)
+    if previous:
+        storage.copy_analysis(previous, document.id)
+        search.copy_document(previous.document_id, document, previous)
+    return document, previous is not None
+
+
+def create_document(user_id, filename, file_type, content_hash, file_path, file_size):
+    """Record a stored upload and reuse or queue its analysis; returns the JSON response"""
+    document, reused = add_document(user_id, filename, file_type, content_hash, file_path, file_size)
+    if reused:
         db.session.commit()
-        print(f"Admin user created: {app.config['ADMIN_EMAIL']}")
+        # A copied provisional summary gets its own refinement (a result cache hit once the original's is done)
+        if document.analysis.summary_status == 'provisional':
+            jobs.enqueue_summaries([document])
+        return jsonify({
+            'message': 'Document uploaded and analyzed successfully',
+            'document': document.to_dict()
+        }), 201
+    
+    db.session.commit()
+    
+    # Queue analysis in the background worker pool
+    job = jobs.enqueue(document)
+    
+    if job.status in ('done', 'failed'):
+        # Inline mode (ANALYSIS_WORKERS=0) analyzed the document within this request
+        db.session.refresh(document)
+        return jsonify({
+            'message': 'Document uploaded and analyzed successfully' if job.status == 'done'
+                       else 'Document uploaded, analysis failed',
+            'document': document.to_dict(),
+            'job': job.to_dict()
+        }), 201
+    
+    return jsonify({
+        'message': 'Document uploaded, analysis queued',
+        'document': document.to_dict(),
+        'job': job.to_dict()
+    }), 202
 
 
 # ==================== ROUTES ====================
@@ -47,6 +296,15 @@ def index():
     return send_from_directory('static', 'index.html')
 
 
+@app.route('/metrics')
+def get_metrics():
+    """Expose metrics in the Prometheus text format"""
+    if not app.config['METRICS_ENABLED']:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 # ==================== AUTH ROUTES ====================
 
 @app.route('/api/auth/register', methods=['POST'])
@@ -69,13 +327,13 @@ def register():
             full_name=data['full_name'],
             is_admin=False
         )
-        user.set_password(data['password'])
+        auth.set_password(user, data['password'])
         
         db.session.add(user)
         db.session.commit()
         
         # Create access token
-        access_token = create_access_token(identity=user.id)
+        access_token = create_access_token(identity=user.id, additional_claims=auth.identity_claims(user))
         
         return jsonify({
             'message': 'User registered successfully',
@@ -83,6 +341,9 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except auth.LoginBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -101,11 +362,12 @@ def login():
         # Find user
         user = User.query.filter_by(email=data['email']).first()
         
-        if not user or not user.check_password(data['password']):
+        if not user or not auth.check_password(user, data['password']):
             return jsonify({'error': 'Invalid email or password'}), 401
+        db.session.commit()  # persists a rehashed password
         
         # Create access token
-        access_token = create_access_token(identity=user.id)
+        access_token = create_access_token(identity=user.id, additional_claims=auth.identity_claims(user))
         
         return jsonify({
             'message': 'Login successful',
@@ -113,7 +375,10 @@ def login():
             'user': user.to_dict()
         }), 200
         
+    except auth.LoginBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
@@ -139,7 +404,7 @@ def get_current_user():
 @app.route('/api/documents/upload', methods=['POST'])
 @jwt_required()
 def upload_document():
-    """Upload and analyze a document"""
+    """Upload a document and queue it for analysis"""
     try:
         user_id = get_jwt_identity()
         
@@ -156,57 +421,120 @@ def upload_document():
         if not allowed_file(file.filename, app.config['ALLOWED_EXTENSIONS']):
             return jsonify({'error': 'Invalid file type. Only PDF and TXT files are allowed'}), 400
         
-        # Save file
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{user_id}_{timestamp}_{filename}"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(file_path)
+        # Refuse before storing anything when analysis is saturated or the user is over their rate
+        admission.admit(user_id)
         
-        # Get file info
+        # Save file (identical content is stored once and shared)
+        filename = secure_filename(file.filename)
         file_type = filename.rsplit('.', 1)[1].lower()
-        file_size = os.path.getsize(file_path)
-        
-        # Create document record
-        document = Document(
-            filename=filename,
-            file_path=file_path,
-            file_type=file_type,
-            file_size=file_size,
-            user_id=user_id
+        content_hash, file_path, file_size = storage.save_upload(
+            file.stream, app.config['UPLOAD_FOLDER'], file_type
         )
-        db.session.add(document)
-        db.session.commit()
         
-        # Analyze document
+        return create_document(user_id, filename, file_type, content_hash, file_path, file_size)
+        
+    except admission.AdmissionRejected as e:
+        return jsonify({'error': str(e)}), e.status, {'Retry-After': str(e.retry_after)}
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/documents/batch', methods=['POST'])
+@jwt_required()
+def upload_documents_batch():
+    """Upload many documents (files and/or zip archives) and queue them for batch analysis"""
+    try:
+        user_id = get_jwt_identity()
+        
+        files = [f for f in request.files.getlist('files') + request.files.getlist('file') if f.filename]
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+        
+        # Expand zip archives into their members; each entry is (name, stream opener)
+        results = []
+        entries = []
+        for file in files:
+            if file.filename.lower().endswith('.zip'):
+                try:
+                    archive, members = uploads.list_archive(file.stream, app.config['BATCH_MAX_UNCOMPRESSED_SIZE'])
+                except uploads.UploadError as e:
+                    results.append({'filename': file.filename, 'status': 'rejected', 'error': str(e)})
+                    continue
+                entries.extend(
+                    (os.path.basename(info.filename), lambda archive=archive, info=info: archive.open(info))
+                    for info in members
+                )
+            else:
+                entries.append((file.filename, lambda file=file: file.stream))
+        
+        if len(entries) > app.config['BATCH_MAX_FILES']:
+            return jsonify({'error': f"A batch may contain at most {app.config['BATCH_MAX_FILES']} files"}), 400
+        
+        # Each file of an allowed type counts against the user's rate
+        admission.admit(user_id, sum(
+            1 for name, _ in entries if allowed_file(secure_filename(name), app.config['ALLOWED_EXTENSIONS'])
+        ))
+        
+        # Write and hash every file before touching the database, so the transaction below stays short
+        written = []
+        stored = 0
         try:
-            analysis_results = analyze_document(file_path, file_type)
+            for name, open_stream in entries:
+                filename = secure_filename(name)
+                if not filename or not allowed_file(filename, app.config['ALLOWED_EXTENSIONS']):
+                    results.append({'filename': name, 'status': 'rejected',
+                                    'error': 'Invalid file type. Only PDF and TXT files are allowed'})
+                    continue
+                written.append((filename, *storage.write_upload(open_stream(), app.config['UPLOAD_FOLDER'])))
             
-            # Create analysis record
-            analysis = Analysis(
-                document_id=document.id,
-                extracted_text=analysis_results['extracted_text'][:10000],  # Store first 10k chars
-                summary=analysis_results['summary'],
-                key_points=analysis_results['key_points'],
-                sentiment=analysis_results['sentiment'],
-                sentiment_score=analysis_results['sentiment_score'],
-                word_count=analysis_results['word_count']
-            )
-            db.session.add(analysis)
-            db.session.commit()
-            
-            return jsonify({
-                'message': 'Document uploaded and analyzed successfully',
-                'document': document.to_dict()
-            }), 201
+            # Store every file and add its Document in a single transaction
+            queued = []
+            for filename, tmp_path, content_hash, file_size in written:
+                file_type = filename.rsplit('.', 1)[1].lower()
+                stored += 1
+                file_path = storage.store_file(tmp_path, app.config['UPLOAD_FOLDER'], content_hash, file_type,
+                                               file_size)
+                document, reused = add_document(user_id, filename, file_type, content_hash, file_path, file_size)
+                result = {'filename': filename, 'status': 'analyzed' if reused else 'queued', 'document': document}
+                results.append(result)
+                if not reused:
+                    queued.append(result)
             
-        except Exception as e:
-            # If analysis fails, still keep the document but return error
-            return jsonify({
-                'error': f'Document uploaded but analysis failed: {str(e)}',
-                'document': document.to_dict()
-            }), 500
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            # Remove the temporary files, and the files moved into the store for rows that were rolled back
+            for index, (filename, tmp_path, content_hash, _) in enumerate(written):
+                storage.discard(tmp_path, app.config['UPLOAD_FOLDER'], content_hash,
+                                filename.rsplit('.', 1)[1].lower(), moved=index < stored)
+            raise
+        
+        # Queue the new documents; they are analyzed in groups sharing model batches
+        for result, job in zip(queued, jobs.enqueue_batch([r['document'] for r in queued])):
+            result['job'] = job.to_dict()
+        jobs.enqueue_summaries([r['document'] for r in results if r['status'] == 'analyzed'
+                                and r['document'].analysis.summary_status == 'provisional'])
         
+        for result in results:
+            if 'document' in result:
+                result['document'] = result['document'].to_dict()
+        
+        counts = {status: sum(1 for r in results if r['status'] == status)
+                  for status in ('queued', 'analyzed', 'rejected')}
+        
+        return jsonify({
+            'message': f"{counts['queued'] + counts['analyzed']} of {len(results)} files accepted",
+            'counts': counts,
+            'results': results
+        }), 202 if queued else 201
+        
+    except admission.AdmissionRejected as e:
+        return jsonify({'error': str(e)}), e.status, {'Retry-After': str(e.retry_after)}
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -215,13 +543,53 @@ def upload_document():
 @app.route('/api/documents', methods=['GET'])
 @jwt_required()
 def get_documents():
-    """Get all documents for current user"""
+    """Get a page of documents for current user"""
     try:
         user_id = get_jwt_identity()
-        documents = Document.query.filter_by(user_id=user_id).order_by(Document.uploaded_at.desc()).all()
+        
+        try:
+            documents, next_cursor = paginate_documents(Document.query.filter_by(user_id=user_id))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
         
         return jsonify({
-            'documents': [doc.to_dict() for doc in documents]
+            'documents': [doc.to_dict() for doc in documents],
+            'next_cursor': next_cursor
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/documents/search', methods=['GET'])
+@jwt_required()
+def search_documents():
+    """Full-text search over the current user's documents (admins may pass all=1)"""
+    try:
+        user_id = get_jwt_identity()
+        
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Missing search query'}), 400
+        
+        limit = request.args.get('limit', 20, type=int)
+        limit = max(1, min(limit, app.config['DOCUMENTS_MAX_PAGE_SIZE']))
+        offset = max(0, request.args.get('offset', 0, type=int))
+        
+        scope = user_id
+        if request.args.get('all') == '1':
+            if not auth.is_admin():
+                return jsonify({'error': 'Admin access required'}), 403
+            scope = None
+        
+        hits = search.search(query, user_id=scope, limit=limit + 1, offset=offset)
+        
+        return jsonify({
+            'results': [
+                {'document': doc.to_dict(), 'score': score, 'snippet': snippet}
+                for doc, score, snippet in hits[:limit]
+            ],
+            'next_offset': offset + limit if len(hits) > limit else None
         }), 200
         
     except Exception as e:
@@ -234,7 +602,7 @@ def get_document(doc_id):
     """Get a specific document"""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        is_admin = auth.is_admin()
         
         document = Document.query.get(doc_id)
         
@@ -242,7 +610,7 @@ def get_document(doc_id):
             return jsonify({'error': 'Document not found'}), 404
         
         # Check if user owns the document or is admin
-        if document.user_id != user_id and not user.is_admin:
+        if document.user_id != user_id and not is_admin:
             return jsonify({'error': 'Access denied'}), 403
         
         return jsonify({'document': document.to_dict()}), 200
@@ -251,13 +619,52 @@ def get_document(doc_id):
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/documents/<int:doc_id>/text', methods=['GET'])
+@jwt_required()
+def get_document_text(doc_id):
+    """Get a range of a document's extracted text (?offset=&limit= in characters)"""
+    try:
+        user_id = get_jwt_identity()
+        is_admin = auth.is_admin()
+        
+        document = Document.query.get(doc_id)
+        
+        if not document:
+            return jsonify({'error': 'Document not found'}), 404
+        
+        # Check if user owns the document or is admin
+        if document.user_id != user_id and not is_admin:
+            return jsonify({'error': 'Access denied'}), 403
+        
+        length = text_store.get_length(doc_id)
+        if length is None:
+            return jsonify({'error': 'Document has not been analyzed yet'}), 404
+        
+        max_chars = app.config['TEXT_RANGE_MAX_CHARS']
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = max(1, min(request.args.get('limit', max_chars, type=int), max_chars))
+        content = text_store.load_text(doc_id, offset, offset + limit)
+        end = offset + len(content)
+        
+        return jsonify({
+            'document_id': doc_id,
+            'offset': offset,
+            'length': length,
+            'text': content,
+            'next_offset': end if end < length else None
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/documents/<int:doc_id>', methods=['DELETE'])
 @jwt_required()
 def delete_document(doc_id):
     """Delete a document"""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        is_admin = auth.is_admin()
         
         document = Document.query.get(doc_id)
         
@@ -265,12 +672,13 @@ def delete_document(doc_id):
             return jsonify({'error': 'Document not found'}), 404
         
         # Check if user owns the document or is admin
-        if document.user_id != user_id and not user.is_admin:
+        if document.user_id != user_id and not is_admin:
             return jsonify({'error': 'Access denied'}), 403
         
-        # Delete file from disk
-        if os.path.exists(document.file_path):
-            os.remove(document.file_path)
+        # Delete file from disk once no other document shares it
+        storage.release(document)
+        search.remove_document(document.id)
+        text_store.delete_text(document.id)
         
         # Delete from database
         db.session.delete(document)
@@ -283,6 +691,177 @@ def delete_document(doc_id):
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Get the status of an analysis job"""
+    try:
+        user_id = get_jwt_identity()
+        is_admin = auth.is_admin()
+        
+        job = jobs.get_job(job_id)
+        
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        # Check if user owns the document or is admin
+        if job.document.user_id != user_id and not is_admin:
+            return jsonify({'error': 'Access denied'}), 403
+        
+        response = {'job': job.to_dict()}
+        if job.status == 'done':
+            response['document'] = job.document.to_dict()
+        
+        return jsonify(response), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# ==================== CHUNKED UPLOAD ROUTES ====================
+
+def get_upload_session(upload_id, user_id):
+    """Return the caller's upload session or None"""
+    session = db.session.get(UploadSession, upload_id)
+    if session is None or session.user_id != user_id:
+        return None
+    return session
+
+
+@app.route('/api/uploads', methods=['POST'])
+@jwt_required()
+def init_upload():
+    """Start a resumable chunked upload"""
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        
+        filename = secure_filename(data.get('filename') or '')
+        if not filename:
+            return jsonify({'error': 'No file selected'}), 400
+        
+        if not allowed_file(filename, app.config['ALLOWED_EXTENSIONS']):
+            return jsonify({'error': 'Invalid file type. Only PDF and TXT files are allowed'}), 400
+        
+        size = data.get('size')
+        if not isinstance(size, int) or size <= 0:
+            return jsonify({'error': 'A positive file size is required'}), 400
+        if size > app.config['CHUNKED_UPLOAD_MAX_SIZE']:
+            return jsonify({'error': f"File exceeds the maximum size of {app.config['CHUNKED_UPLOAD_MAX_SIZE']} bytes"}), 413
+        
+        # Admitted when the upload starts, so a client never sends a file that would be refused
+        admission.admit(user_id)
+        
+        session = uploads.create_session(
+            user_id, filename, filename.rsplit('.', 1)[1].lower(), size,
+            app.config['UPLOAD_FOLDER'], app.config['UPLOAD_SESSION_EXPIRY_HOURS']
+        )
+        
+        return jsonify({
+            'upload': session.to_dict(),
+            'chunk_size': app.config['UPLOAD_CHUNK_MAX_SIZE']
+        }), 201
+        
+    except admission.AdmissionRejected as e:
+        return jsonify({'error': str(e)}), e.status, {'Retry-After': str(e.retry_after)}
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+@jwt_required()
+def get_upload(upload_id):
+    """Get an upload's progress; clients resume from the `received` offset"""
+    try:
+        session = get_upload_session(upload_id, get_jwt_identity())
+        
+        if not session:
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        return jsonify({'upload': session.to_dict()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+@jwt_required()
+def put_upload_chunk(upload_id):
+    """Write one chunk of an upload at the given offset"""
+    try:
+        session = get_upload_session(upload_id, get_jwt_identity())
+        
+        if not session:
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        offset = request.args.get('offset', request.headers.get('Upload-Offset'), type=int)
+        if offset is None:
+            return jsonify({'error': 'Chunk offset is required'}), 400
+        
+        checksum = uploads.write_chunk(
+            session, offset, request.stream, request.content_length,
+            expected_sha256=request.headers.get('X-Chunk-SHA256'),
+            max_chunk_size=app.config['UPLOAD_CHUNK_MAX_SIZE']
+        )
+        
+        return jsonify({'upload': session.to_dict(), 'chunk_sha256': checksum}), 200
+        
+    except uploads.UploadError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'upload': session.to_dict()}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_upload(upload_id):
+    """Finish a chunked upload and queue the document for analysis"""
+    try:
+        user_id = get_jwt_identity()
+        session = get_upload_session(upload_id, user_id)
+        
+        if not session:
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        data = request.get_json(silent=True) or {}
+        content_hash, file_path = uploads.complete_session(
+            session, app.config['UPLOAD_FOLDER'], expected_sha256=data.get('sha256')
+        )
+        
+        return create_document(user_id, session.filename, session.file_type, content_hash, file_path,
+                               session.total_size)
+        
+    except uploads.UploadError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def abort_upload(upload_id):
+    """Cancel an unfinished upload"""
+    try:
+        session = get_upload_session(upload_id, get_jwt_identity())
+        
+        if not session:
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        uploads.discard_session(session)
+        db.session.commit()
+        
+        return jsonify({'message': 'Upload cancelled'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 # ==================== ADMIN ROUTES ====================
 
 @app.route('/api/admin/users', methods=['GET'])
@@ -290,10 +869,7 @@ def delete_document(doc_id):
 def get_all_users():
     """Get all users (admin only)"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user.is_admin:
+        if not auth.is_admin():
             return jsonify({'error': 'Admin access required'}), 403
         
         users = User.query.all()
@@ -308,17 +884,19 @@ def get_all_users():
 @app.route('/api/admin/documents', methods=['GET'])
 @jwt_required()
 def get_all_documents():
-    """Get all documents (admin only)"""
+    """Get a page of all documents (admin only)"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user.is_admin:
+        if not auth.is_admin():
             return jsonify({'error': 'Admin access required'}), 403
         
-        documents = Document.query.order_by(Document.uploaded_at.desc()).all()
+        try:
+            documents, next_cursor = paginate_documents(Document.query)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
         return jsonify({
-            'documents': [doc.to_dict() for doc in documents]
+            'documents': [doc.to_dict() for doc in documents],
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -330,47 +908,129 @@ def get_all_documents():
 def get_stats():
     """Get system statistics (admin only)"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        if not auth.is_admin():
+            return jsonify({'error': 'Admin access required'}), 403
         
-        if not user.is_admin:
+        fresh = request.args.get('fresh', '0').lower() in ('1', 'true')
+        
+        return jsonify({'stats': stats.get_stats(fresh=fresh)}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/admin/inference', methods=['GET'])
+@jwt_required()
+def get_inference_stats():
+    """Get model load state, achieved batch sizes and result cache hit rates (admin only)"""
+    try:
+        if not auth.is_admin():
             return jsonify({'error': 'Admin access required'}), 403
         
-        total_users = User.query.count()
-        total_documents = Document.query.count()
-        total_analyses = Analysis.query.count()
+        return jsonify({
+            'models': registry.status(),
+            'inference': registry.server.inference_stats() if registry.server else inference.stats(),
+            'result_cache': result_cache.stats()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/admin/admission', methods=['GET'])
+@jwt_required()
+def get_admission_stats():
+    """Get analysis queue depth, admission limits and rejection counts (admin only)"""
+    try:
+        if not auth.is_admin():
+            return jsonify({'error': 'Admin access required'}), 403
         
-        # Sentiment breakdown
-        positive_docs = Analysis.query.filter_by(sentiment='positive').count()
-        negative_docs = Analysis.query.filter_by(sentiment='negative').count()
-        neutral_docs = Analysis.query.filter_by(sentiment='neutral').count()
+        return jsonify({'admission': admission.stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/admin/backfill', methods=['GET'])
+@jwt_required()
+def get_backfill():
+    """Get re-analysis status: current version, stale analyses and the latest run (admin only)"""
+    try:
+        if not auth.is_admin():
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        version = utils.analysis_version()
+        run = backfill.current_run()
         
         return jsonify({
-            'stats': {
-                'total_users': total_users,
-                'total_documents': total_documents,
-                'total_analyses': total_analyses,
-                'sentiment_breakdown': {
-                    'positive': positive_docs,
-                    'negative': negative_docs,
-                    'neutral': neutral_docs
-                }
-            }
+            'current_version': version,
+            'stale_analyses': backfill.stale_query(version).count(),
+            'run': backfill.progress(run) if run else None
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/admin/backfill', methods=['POST'])
+@jwt_required()
+def start_backfill():
+    """Start re-analyzing documents analyzed by older models or algorithms (admin only)"""
+    try:
+        if not auth.is_admin():
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        batch_size = data.get('batch_size')
+        if batch_size is not None and (not isinstance(batch_size, int) or batch_size <= 0):
+            return jsonify({'error': 'batch_size must be a positive integer'}), 400
+        
+        run = backfill.start(batch_size)
+        
+        return jsonify({'run': backfill.progress(run)}), 202
+        
+    except backfill.BackfillError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/admin/backfill/<int:run_id>/<action>', methods=['POST'])
+@jwt_required()
+def update_backfill(run_id, action):
+    """Pause, resume or cancel a backfill run (admin only)"""
+    try:
+        if not auth.is_admin():
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        if action not in ('pause', 'resume', 'cancel'):
+            return jsonify({'error': 'Unknown action'}), 404
+        
+        run = db.session.get(BackfillRun, run_id)
+        
+        if not run:
+            return jsonify({'error': 'Backfill not found'}), 404
+        
+        backfill.set_status(run, action)
+        
+        return jsonify({'run': backfill.progress(run)}), 200
+        
+    except backfill.BackfillError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/admin/users/<int:user_id>', methods=['DELETE'])
 @jwt_required()
 def delete_user(user_id):
     """Delete a user (admin only)"""
     try:
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
         
-        if not current_user.is_admin:
+        if not auth.is_admin():
             return jsonify({'error': 'Admin access required'}), 403
         
         user = User.query.get(user_id)
@@ -384,8 +1044,11 @@ def delete_user(user_id):
         
         # Delete user's documents from disk
         for doc in user.documents:
-            if os.path.exists(doc.file_path):
-                os.remove(doc.file_path)
+            storage.release(doc)
+            search.remove_document(doc.id)
+            text_store.delete_text(doc.id)
+        for session in UploadSession.query.filter_by(user_id=user.id).all():
+            uploads.discard_session(session)
         
         # Delete user (cascade will delete documents and analyses)
         db.session.delete(user)
@@ -399,4 +1062,6 @@ def delete_user(user_id):
 
 
 if __name__ == '__main__':
+    if app.config['MODEL_PRELOAD']:
+        start_background_work()
     app.run(debug=True, port=5000)
@@ -0,0 +1,73 @@
+"""Password hashing and token identity claims.
+
+bcrypt runs on a small dedicated thread pool (bcrypt releases the GIL
+while hashing), so a burst of logins is limited to ``LOGIN_WORKERS``
+concurrent hashes instead of taking every request thread and CPU core.
+When more than ``LOGIN_MAX_PENDING`` verifications are waiting, new ones
+are refused straight away with ``LoginBusy``.
+
+Access tokens carry the user's ``is_admin`` flag as a claim, so
+authorization checks read the token instead of loading the user.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+from config import Config
+from models import db, User
+
+_executor = None
+_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(Config.LOGIN_MAX_PENDING)
+
+
+class LoginBusy(Exception):
+    """Too many password verifications are already waiting"""
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=Config.LOGIN_WORKERS, thread_name_prefix='bcrypt')
+        return _executor
+
+
+def _run(fn, *args):
+    """Run a bcrypt call on the hashing pool and wait for it"""
+    if not _pending.acquire(blocking=False):
+        raise LoginBusy('Too many login attempts in progress, retry shortly')
+    try:
+        return _get_executor().submit(fn, *args).result()
+    finally:
+        _pending.release()
+
+
+def set_password(user, password):
+    """Hash a new password at the configured cost"""
+    _run(user.set_password, password, Config.BCRYPT_ROUNDS)
+
+
+def check_password(user, password):
+    """Verify a password, rehashing it when the configured cost has changed (caller commits)"""
+    if not _run(user.check_password, password):
+        return False
+    if user.password_rounds() != Config.BCRYPT_ROUNDS:
+        _run(user.set_password, password, Config.BCRYPT_ROUNDS)
+    return True
+
+
+def identity_claims(user):
+    """Extra claims stored in the user's access token"""
+    return {'is_admin': bool(user.is_admin)}
+
+
+def is_admin():
+    """Whether the current token belongs to an admin"""
+    claims = get_jwt()
+    if 'is_admin' in claims:
+        return bool(claims['is_admin'])
+    # Tokens issued before the claim was added
+    user = db.session.get(User, get_jwt_identity())
+    return bool(user and user.is_admin)
@@ -0,0 +1,304 @@
+"""Admin-triggered re-analysis of documents analyzed by older models or algorithms.
+
+Every analysis records ``utils.analysis_version()``. A backfill run walks
+the analyses whose version differs from the current one in id order,
+``batch_size`` at a time. Each batch is re-analyzed from the stored text
+(documents whose text was only kept truncated are extracted from their
+file again) in groups on the analysis worker pool, behind upload jobs and
+using at most ``BACKFILL_MAX_SLOTS`` workers, with a pause between
+batches.
+
+Progress and the id cursor are committed after every batch, so a run
+survives restarts: the process that owns a run refreshes a heartbeat, and
+any web process takes over a running backfill whose owner has gone quiet.
+"""
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
+
+from models import db, Analysis, BackfillRun
+import jobs
+import metrics
+import search
+import text_store
+import utils
+
+# Migration 3 moved only the first 10k characters of older analyses into the text store
+LEGACY_TEXT_LIMIT = 10000
+
+_app = None
+_thread = None
+_lock = threading.Lock()
+# Set whenever a run is started or resumed, so a worker thread about to exit looks again
+_requested = threading.Event()
+_owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+backfill_documents = metrics.counter('smartdoc_backfill_documents_total', 'Documents re-analyzed by backfills, by outcome')
+
+
+class BackfillError(Exception):
+    """A backfill cannot be started or changed in its current state"""
+
+
+def init_app(app):
+    """Bind to the Flask app and resume a backfill left running"""
+    global _app
+    _app = app
+
+    # Spawned pool workers re-import the main module; they must not run backfills
+    if multiprocessing.parent_process() is not None:
+        return
+
+    with app.app_context():
+        if BackfillRun.query.filter_by(status='running').first():
+            _ensure_worker()
+
+
+def stale_query(target_version):
+    """Analyses produced by another version than target_version"""
+    return Analysis.query.filter(or_(Analysis.version.is_(None), Analysis.version != target_version))
+
+
+def current_run():
+    """Return the most recent backfill run, if any"""
+    return BackfillRun.query.order_by(BackfillRun.id.desc()).first()
+
+
+def progress(run):
+    """Run details with completion percentage, throughput and estimated time left"""
+    result = run.to_dict()
+    done = run.processed + run.failed
+    elapsed = ((run.finished_at or datetime.utcnow()) - run.created_at).total_seconds()
+    rate = done / elapsed if elapsed > 0 else 0.0
+    result['percent'] = round(100.0 * done / run.total, 1) if run.total else 100.0
+    result['documents_per_second'] = round(rate, 3)
+    result['eta_seconds'] = round((run.total - done) / rate) if rate and run.status == 'running' else None
+    return result
+
+
+def start(batch_size=None):
+    """Start a backfill to the current analysis version"""
+    if BackfillRun.query.filter(BackfillRun.status.in_(['running', 'paused'])).first():
+        raise BackfillError('A backfill is already in progress')
+
+    target = utils.analysis_version()
+    run = BackfillRun(
+        target_version=target,
+        status='running',
+        total=stale_query(target).count(),
+        batch_size=batch_size or _app.config['BACKFILL_BATCH_SIZE']
+    )
+    db.session.add(run)
+    db.session.commit()
+    _ensure_worker()
+    return run
+
+
+def set_status(run, action):
+    """Pause, resume or cancel a run"""
+    transitions = {
+        'pause': ({'running'}, 'paused'),
+        'resume': ({'paused'}, 'running'),
+        'cancel': ({'running', 'paused'}, 'cancelled'),
+    }
+    allowed, status = transitions[action]
+    if run.status not in allowed:
+        raise BackfillError(f'Cannot {action} a {run.status} backfill')
+
+    run.status = status
+    run.owner = None
+    run.updated_at = datetime.utcnow()
+    if status == 'cancelled':
+        run.finished_at = datetime.utcnow()
+    db.session.commit()
+    if status == 'running':
+        _ensure_worker()
+    return run
+
+
+def _ensure_worker():
+    """Start the backfill thread in this process if it is not running"""
+    global _thread
+    with _lock:
+        _requested.set()
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_worker_loop, name='analysis-backfill', daemon=True)
+            _thread.start()
+
+
+def _worker_loop():
+    """Process backfills until none is running and none was started or resumed meanwhile"""
+    global _thread
+    while True:
+        _requested.clear()
+        _process_runs()
+        with _lock:
+            if not _requested.is_set():
+                _thread = None
+                return
+
+
+def _process_runs():
+    """Claim the running backfill and process it batch by batch"""
+    heartbeat = _app.config['BACKFILL_HEARTBEAT_SECONDS']
+    while True:
+        with _app.app_context():
+            run = BackfillRun.query.filter_by(status='running').first()
+            if run is None:
+                return
+            if not _claim(run.id, heartbeat):
+                # Another process owns the run; stand by in case it stops
+                db.session.remove()
+                time.sleep(heartbeat)
+                continue
+            try:
+                finished = _process_batch(run.id)
+            except Exception as e:
+                db.session.rollback()
+                run = db.session.get(BackfillRun, run.id)
+                run.status = 'failed'
+                run.error = str(e)
+                run.finished_at = datetime.utcnow()
+                db.session.commit()
+                print(f"Backfill {run.id} failed: {e}")
+                return
+        if finished:
+            return
+        time.sleep(_app.config['BACKFILL_DELAY_SECONDS'])
+
+
+def _claim(run_id, heartbeat):
+    """Take or keep ownership of a running backfill; False if another live process owns it"""
+    cutoff = datetime.utcnow() - timedelta(seconds=3 * heartbeat)
+    claimed = BackfillRun.query.filter(
+        BackfillRun.id == run_id,
+        BackfillRun.status == 'running',
+        or_(BackfillRun.owner.is_(None), BackfillRun.owner == _owner, BackfillRun.updated_at < cutoff)
+    ).update({'owner': _owner, 'updated_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return bool(claimed)
+
+
+def _heartbeat(run_id, stop):
+    """Keep the run's heartbeat fresh while a batch is being analyzed"""
+    interval = _app.config['BACKFILL_HEARTBEAT_SECONDS']
+    while not stop.wait(interval):
+        with _app.app_context():
+            _claim(run_id, interval)
+
+
+def _process_batch(run_id):
+    """Re-analyze the next batch of stale analyses; returns True when the run is over"""
+    run = db.session.get(BackfillRun, run_id)
+    batch = (
+        stale_query(run.target_version)
+        .options(joinedload(Analysis.document))
+        .filter(Analysis.id > run.cursor)
+        .order_by(Analysis.id)
+        .limit(run.batch_size)
+        .all()
+    )
+    if not batch:
+        run.status = 'done'
+        run.owner = None
+        run.finished_at = datetime.utcnow()
+        db.session.commit()
+        return True
+
+    items = []
+    for analysis in batch:
+        document = analysis.document
+        length = text_store.get_length(analysis.document_id)
+        truncated = analysis.version is None and length == LEGACY_TEXT_LIMIT
+        if length and not (truncated and os.path.exists(document.file_path)):
+            items.append((text_store.load_text(analysis.document_id), None, None))
+        else:
+            items.append((None, document.file_path, document.file_type))
+    analysis_ids = [analysis.id for analysis in batch]
+    db.session.commit()  # end the read transaction while the workers run
+
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(run_id, stop), name='backfill-heartbeat', daemon=True)
+    beat.start()
+    try:
+        outcomes = _run_groups(items)
+    finally:
+        stop.set()
+        beat.join()
+
+    run = db.session.get(BackfillRun, run_id)
+    if run.status == 'running' and run.owner is None:
+        # Paused and resumed meanwhile; keep this batch if the run is still ours to take
+        _claim(run_id, _app.config['BACKFILL_HEARTBEAT_SECONDS'])
+        run = db.session.get(BackfillRun, run_id)
+    if run.status != 'running' or run.owner != _owner:
+        # Paused, cancelled or taken over meanwhile; this batch is redone on resume
+        db.session.rollback()
+        return True
+
+    for analysis_id, item, (results, error) in zip(analysis_ids, items, outcomes):
+        analysis = db.session.get(Analysis, analysis_id)
+        if analysis is None:
+            continue  # document deleted meanwhile
+        if error is not None:
+            run.failed += 1
+            backfill_documents.inc(outcome='failed')
+            print(f"Backfill could not re-analyze document {analysis.document_id}: {error}")
+            continue
+
+        metrics.record_analysis(results.get('trace'))
+        analysis.summary = results['summary']
+        analysis.summary_status = results['summary_status']
+        analysis.key_points = results['key_points']
+        analysis.sentiment = results['sentiment']
+        analysis.sentiment_score = results['sentiment_score']
+        analysis.word_count = results['word_count']
+        analysis.version = results['version']
+        analysis.analyzed_at = datetime.utcnow()
+
+        body = results.get('extracted_text')
+        if body is not None:
+            text_store.save_text(analysis.document_id, body)
+        else:
+            body = item[0]
+        search.index_document(analysis.document, analysis.summary, body)
+        run.processed += 1
+        backfill_documents.inc(outcome='done')
+
+    run.cursor = analysis_ids[-1]
+    run.updated_at = datetime.utcnow()
+    db.session.commit()
+    return False
+
+
+def _run_groups(items):
+    """Analyze items in ANALYSIS_BATCH_SIZE groups on at most BACKFILL_MAX_SLOTS workers"""
+    group_size = max(1, _app.config['ANALYSIS_BATCH_SIZE'])
+    in_flight = threading.BoundedSemaphore(max(1, _app.config['BACKFILL_MAX_SLOTS']))
+
+    futures = []
+    for start in range(0, len(items), group_size):
+        group = items[start:start + group_size]
+        in_flight.acquire()
+        try:
+            future = jobs.submit_background(utils.reanalyze_documents, group)
+        except Exception:
+            in_flight.release()
+            raise
+        future.add_done_callback(lambda f: in_flight.release())
+        futures.append((future, len(group)))
+
+    outcomes = []
+    for future, size in futures:
+        try:
+            outcomes.extend(future.result())
+        except Exception as e:
+            outcomes.extend([(None, str(e))] * size)
+    return outcomes
@@ -0,0 +1,48 @@
+"""Shared helpers for the benchmark scripts"""
+import os
+import resource
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def add_repo_to_path():
+    """Make the app modules (utils, config, ...) importable from a benchmark script"""
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+
+def disable_result_cache():
+    """Turn off the analysis result cache, so repeated texts are timed cold instead of as cache hits"""
+    from config import Config
+    Config.RESULT_CACHE_ENABLED = False
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def latency_summary(seconds):
+    """Summarize a list of latencies (seconds) as milliseconds"""
+    return {
+        'count': len(seconds),
+        'mean_ms': round(sum(seconds) / len(seconds) * 1000, 3) if seconds else None,
+        'p50_ms': round(percentile(seconds, 50) * 1000, 3) if seconds else None,
+        'p90_ms': round(percentile(seconds, 90) * 1000, 3) if seconds else None,
+        'p99_ms': round(percentile(seconds, 99) * 1000, 3) if seconds else None,
+        'max_ms': round(max(seconds) * 1000, 3) if seconds else None
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its finished children, in MB"""
+    to_mb = 1024.0 if sys.platform != 'darwin' else 1024.0 * 1024.0
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / to_mb, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / to_mb, 1)
+    }
@@ -0,0 +1,86 @@
+"""Synthetic document corpus for the benchmarks"""
+import random
+
+WORDS_PER_PAGE = 500
+
+_VOCABULARY = (
+    "the a of and to in is that for on with as by this report results growth risk "
+    "market customer product revenue team quarter analysis system model data process "
+    "significant important improve decline success problem efficient critical issue "
+    "research company project strategy performance service network security cost"
+).split()
+
+_NAMES = ["Acme Corp", "London", "Maria Lopez", "the World Bank", "Project Apollo", "Tokyo"]
+
+
+def generate_sentence(rng):
+    """Build one pseudo-English sentence"""
+    words = [rng.choice(_VOCABULARY) for _ in range(rng.randint(8, 24))]
+    if rng.random() < 0.3:
+        words.insert(rng.randint(0, len(words)), rng.choice(_NAMES))
+    sentence = ' '.join(words)
+    return sentence[0].upper() + sentence[1:] + rng.choice('..!?')
+
+
+def generate_text(pages, seed=0):
+    """Generate roughly WORDS_PER_PAGE words per page of text"""
+    rng = random.Random(seed)
+    sentences = []
+    words = 0
+    while words < pages * WORDS_PER_PAGE:
+        sentence = generate_sentence(rng)
+        sentences.append(sentence)
+        words += sentence.count(' ') + 1
+    return ' '.join(sentences)
+
+
+def _pdf_escape(line):
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path, pages, seed=0, lines_per_page=45, chars_per_line=90):
+    """Write a text PDF with the given number of pages (Helvetica, no external dependencies)"""
+    rng = random.Random(seed)
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # page tree, filled in once the page object numbers are known
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    page_refs = []
+    for _ in range(pages):
+        words = []
+        while sum(len(w) + 1 for w in words) < lines_per_page * chars_per_line:
+            words.extend(generate_sentence(rng).split())
+        lines, current = [], ''
+        for word in words:
+            if len(current) + len(word) + 1 > chars_per_line:
+                lines.append(current)
+                current = ''
+            current = f'{current} {word}' if current else word
+        lines = (lines + [current])[:lines_per_page]
+
+        stream = 'BT /F1 10 Tf 12 TL 40 760 Td ' + ' '.join(f"({_pdf_escape(line)}) '" for line in lines) + ' ET'
+        stream = stream.encode('latin-1')
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % content_ref
+        )
+        page_refs.append(len(objects))
+
+    kids = b' '.join(b'%d 0 R' % ref for ref in page_refs)
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(page_refs))
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+
+    with open(path, 'wb') as file:
+        file.write(out)
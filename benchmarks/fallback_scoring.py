@@ -0,0 +1,92 @@
+"""Benchmark the fallback sentiment and key-point scoring against the original implementations.
+
+Usage:
+    python benchmarks/fallback_scoring.py --megabytes 1 4 16
+
+Prints one JSON object per text size with the median seconds for the
+original substring-counting functions and the single-pass versions in
+utils.
+"""
+import argparse
+import json
+import re
+import statistics
+import time
+
+from common import add_repo_to_path
+
+add_repo_to_path()
+
+import utils  # noqa: E402
+from corpus import generate_text, WORDS_PER_PAGE  # noqa: E402
+
+
+def legacy_fallback_sentiment(text):
+    """Original implementation: one str.count() pass per keyword"""
+    text_lower = text.lower()
+    positive_count = sum(text_lower.count(word) for word in utils.POSITIVE_WORDS)
+    negative_count = sum(text_lower.count(word) for word in utils.NEGATIVE_WORDS)
+    total = positive_count + negative_count
+    if total == 0:
+        return "neutral", 0.0
+    positive_ratio = positive_count / total
+    if positive_ratio > 0.6:
+        return "positive", round(positive_ratio, 3)
+    if positive_ratio < 0.4:
+        return "negative", -round(1 - positive_ratio, 3)
+    return "neutral", 0.0
+
+
+def legacy_fallback_key_points(text):
+    """Original implementation: split the whole text, substring-match each sentence"""
+    sentences = re.split(r'[.!?]+', text)
+    sentences = [s.strip() for s in sentences if len(s.strip()) > 30]
+    if not sentences:
+        return []
+    key_points = []
+    for sentence in sentences[:30]:
+        sentence_lower = sentence.lower()
+        if any(keyword in sentence_lower for keyword in utils.IMPORTANT_KEYWORDS):
+            key_points.append(sentence)
+            if len(key_points) >= 5:
+                break
+    if len(key_points) < 5:
+        for sentence in sentences[:15]:
+            if sentence not in key_points and len(sentence.split()) >= 8:
+                key_points.append(sentence)
+                if len(key_points) >= 5:
+                    break
+    return key_points[:5]
+
+
+def median_seconds(fn, text, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        times.append(time.perf_counter() - start)
+    return round(statistics.median(times), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--megabytes', type=float, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for megabytes in args.megabytes:
+        # ~6.5 bytes per generated word
+        text = generate_text(max(1, int(megabytes * 2 ** 20 / 6.5 / WORDS_PER_PAGE)))
+        print(json.dumps({
+            'megabytes': round(len(text) / 2 ** 20, 2),
+            'sentiment_legacy_seconds': median_seconds(legacy_fallback_sentiment, text, args.repeat),
+            'sentiment_seconds': median_seconds(utils.analyze_fallback_sentiment, text, args.repeat),
+            'key_points_legacy_seconds': median_seconds(legacy_fallback_key_points, text, args.repeat),
+            'key_points_seconds': median_seconds(utils.extract_fallback_key_points, text, args.repeat),
+            'sentiment_legacy': legacy_fallback_sentiment(text),
+            'sentiment': utils.analyze_fallback_sentiment(text)
+        }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Compare the CPU inference backends of the summarizer and sentiment models.
+
+Usage:
+    python benchmarks/inference_backends.py --backends pytorch quantized onnx \\
+        --documents 16 --batch-size 8 --threads 4 --output bench-backends.json
+
+Each backend runs in its own process, so that process's peak RSS is the
+memory figure. For each model the script reports:
+- the time of a first load, which converts the model unless
+  MODEL_CACHE_DIR already holds it, and of a second load from the cache
+- single-document latency
+- batched throughput
+
+Outputs are compared with the first backend (normally ``pytorch``):
+- sentiment label agreement and mean absolute score difference
+- summary exact-match rate and mean unigram F1
+
+Requires transformers and torch; the onnx backend also needs
+optimum[onnxruntime].
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import time
+from collections import Counter
+from datetime import datetime
+
+from common import add_repo_to_path, latency_summary, peak_rss_mb
+from corpus import generate_text
+
+add_repo_to_path()
+
+from config import Config  # noqa: E402
+
+SUMMARY_OPTIONS = {'max_length': 150, 'min_length': 50, 'do_sample': False, 'truncation': True}
+
+
+def _time_model(model, texts, batch_size, **options):
+    """Per-document latencies, then one batched pass; returns (latencies, throughput, outputs)"""
+    model(texts[:1], **options)  # warm-up
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        model([text], **options)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    outputs = model(texts, batch_size=batch_size, **options)
+    throughput = len(texts) / (time.perf_counter() - start)
+    return latencies, round(throughput, 3), outputs
+
+
+def run_backend(backend, texts, batch_size, threads, interop_threads):
+    """Benchmark one backend (runs in a fresh process)"""
+    import model_backends
+
+    Config.INFERENCE_BACKEND = backend
+    Config.TORCH_NUM_THREADS = threads
+    Config.TORCH_INTEROP_THREADS = interop_threads
+
+    result = {'backend': backend, 'models': {}}
+    outputs = {}
+    for key, task, model_name, options in (
+        ('summarizer', 'summarization', Config.SUMMARIZER_MODEL, SUMMARY_OPTIONS),
+        ('sentiment', 'sentiment-analysis', Config.SENTIMENT_MODEL, {'truncation': True}),
+    ):
+        start = time.perf_counter()
+        model_backends.load_pipeline(task, model_name, backend)
+        first_load = time.perf_counter() - start
+        start = time.perf_counter()
+        model = model_backends.load_pipeline(task, model_name, backend)
+        cached_load = time.perf_counter() - start
+
+        latencies, throughput, raw = _time_model(model, texts, batch_size, **options)
+        outputs[key] = raw
+        result['models'][key] = {
+            'load_seconds': round(first_load, 3),
+            'cached_load_seconds': round(cached_load, 3),
+            'latency': latency_summary(latencies),
+            'documents_per_second': throughput
+        }
+
+    result['peak_rss_mb'] = peak_rss_mb()['self']
+    result['outputs'] = {
+        'summaries': [output['summary_text'] for output in outputs['summarizer']],
+        'sentiment': [(output['label'], output['score']) for output in outputs['sentiment']]
+    }
+    return result
+
+
+def unigram_f1(candidate, reference):
+    """Token-overlap F1 between two summaries"""
+    candidate_tokens = Counter(candidate.lower().split())
+    reference_tokens = Counter(reference.lower().split())
+    overlap = sum((candidate_tokens & reference_tokens).values())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(candidate_tokens.values())
+    recall = overlap / sum(reference_tokens.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def agreement(outputs, baseline):
+    """Compare a backend's outputs with the baseline backend's"""
+    pairs = list(zip(outputs['sentiment'], baseline['sentiment']))
+    summaries = list(zip(outputs['summaries'], baseline['summaries']))
+    return {
+        'sentiment_label_agreement': round(sum(a[0] == b[0] for a, b in pairs) / len(pairs), 3),
+        'sentiment_score_mean_abs_diff': round(sum(abs(a[1] - b[1]) for a, b in pairs) / len(pairs), 4),
+        'summary_exact_match': round(sum(a == b for a, b in summaries) / len(summaries), 3),
+        'summary_unigram_f1': round(sum(unigram_f1(a, b) for a, b in summaries) / len(summaries), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='+', default=['pytorch', 'quantized', 'onnx'])
+    parser.add_argument('--documents', type=int, default=16)
+    parser.add_argument('--pages', type=float, default=1, help='document length (about 500 words per page)')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--threads', type=int, default=Config.TORCH_NUM_THREADS)
+    parser.add_argument('--interop-threads', type=int, default=Config.TORCH_INTEROP_THREADS)
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    texts = [generate_text(args.pages, seed=i) for i in range(args.documents)]
+    context = multiprocessing.get_context('spawn')
+    runs = []
+    for backend in args.backends:
+        with context.Pool(1) as pool:
+            try:
+                runs.append(pool.apply(run_backend, (backend, texts, args.batch_size, args.threads,
+                                                     args.interop_threads)))
+            except Exception as e:
+                runs.append({'backend': backend, 'error': str(e)})
+
+    completed = [run for run in runs if 'outputs' in run]
+    for run in completed[1:]:
+        run['agreement_with'] = completed[0]['backend']
+        run['agreement'] = agreement(run['outputs'], completed[0]['outputs'])
+    for run in completed:
+        del run['outputs']
+
+    output = json.dumps({
+        'benchmark': 'inference_backends',
+        'started_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'documents': len(texts),
+        'batch_size': args.batch_size,
+        'threads': args.threads,
+        'interop_threads': args.interop_threads,
+        'model_cache_dir': Config.MODEL_CACHE_DIR,
+        'runs': runs
+    }, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Compare spaCy key-point throughput before and after trimming and batching.
+
+Usage:
+    python benchmarks/key_points.py --documents 64 --pages 10 --n-process 1 2 4
+
+"legacy" loads the full pipeline and parses the first 100,000 characters
+of each document one at a time, as extract_key_points originally did.
+The other runs take the path analysis jobs take: utils.extract_key_points
+per document, ANALYSIS_BATCH_SIZE documents at a time on concurrent
+threads, so that the inference engine groups their parses into shared
+nlp.pipe batches. The pipeline is loaded without SPACY_EXCLUDE components,
+only the leading sentences are parsed, and nlp.pipe runs with each
+--n-process value. The result cache is turned off. Prints one JSON object
+per run with documents per second. Requires spaCy and SPACY_MODEL to be
+installed.
+"""
+import argparse
+import json
+import sys
+import time
+
+from common import add_repo_to_path, disable_result_cache
+
+add_repo_to_path()
+
+import utils  # noqa: E402
+from config import Config  # noqa: E402
+from model_registry import registry  # noqa: E402
+from corpus import generate_text  # noqa: E402
+
+
+def legacy_key_points(nlp, text):
+    """Original implementation: full parse of up to 100k characters"""
+    doc = nlp(text[:100000])
+    key_points = []
+    sentences = list(doc.sents)
+    for sent in sentences[:20]:
+        if any(ent.label_ in ['PERSON', 'ORG', 'GPE', 'EVENT', 'PRODUCT'] for ent in sent.ents):
+            key_points.append(sent.text.strip())
+            if len(key_points) >= 5:
+                break
+    if len(key_points) < 5:
+        for sent in sentences[:30]:
+            if len(list(sent.noun_chunks)) >= 2 and sent.text.strip() not in key_points:
+                key_points.append(sent.text.strip())
+                if len(key_points) >= 5:
+                    break
+    return key_points[:5]
+
+
+def report(name, documents, seconds, **extra):
+    print(json.dumps({
+        'run': name,
+        'documents': documents,
+        'seconds': round(seconds, 3),
+        'documents_per_second': round(documents / seconds, 2),
+        **extra
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--documents', type=int, default=64)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--n-process', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--batch-size', type=int, default=Config.SPACY_BATCH_SIZE)
+    args = parser.parse_args()
+
+    try:
+        import spacy
+        full_nlp = spacy.load(Config.SPACY_MODEL)
+    except Exception as e:
+        sys.exit(f'spaCy model {Config.SPACY_MODEL!r} is required: {e}')
+
+    texts = [generate_text(args.pages, seed=i) for i in range(args.documents)]
+
+    start = time.perf_counter()
+    for text in texts:
+        legacy_key_points(full_nlp, text)
+    report('legacy', len(texts), time.perf_counter() - start, pipeline=full_nlp.pipe_names)
+
+    if registry.get('spacy') is None:
+        sys.exit('spaCy could not be loaded through the model registry')
+    disable_result_cache()
+    Config.SPACY_BATCH_SIZE = args.batch_size
+    group_size = max(1, Config.ANALYSIS_BATCH_SIZE)
+    for n_process in args.n_process:
+        Config.SPACY_N_PROCESS = n_process
+        start = time.perf_counter()
+        for first in range(0, len(texts), group_size):
+            outcomes = utils._analyze_concurrently(utils.extract_key_points,
+                                                   [(text,) for text in texts[first:first + group_size]])
+            errors = [error for _, error in outcomes if error is not None]
+            if errors:
+                sys.exit(f'Key point extraction failed: {errors[0]}')
+        report('shipped', len(texts), time.perf_counter() - start, n_process=n_process,
+               batch_size=args.batch_size, group_size=group_size, pipeline=registry.get('spacy').pipe_names)
+
+
+if __name__ == '__main__':
+    main()
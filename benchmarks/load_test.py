@@ -0,0 +1,231 @@
+"""Load-test the Flask API with concurrent clients against a throwaway SQLite database.
+
+Usage:
+    python benchmarks/load_test.py --clients 8 --requests 25 --output load.json
+    python benchmarks/load_test.py --url http://localhost:5000 --admin-password admin123
+
+Without --url the app is started in-process on a free port with a
+temporary database and upload folder. Each client registers its own user
+and then mixes uploads, document listings and admin stats polls.
+Per-endpoint latency percentiles, throughput, status codes and peak RSS
+are reported as JSON.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from common import add_repo_to_path, latency_summary, peak_rss_mb
+from corpus import generate_text
+
+ENDPOINTS = {
+    'upload': ('POST', '/api/documents/upload'),
+    'list': ('GET', '/api/documents'),
+    'stats': ('GET', '/api/admin/stats'),
+}
+
+
+class Recorder:
+    """Thread-safe collection of per-endpoint latencies and status codes"""
+
+    def __init__(self):
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.statuses = {name: Counter() for name in ENDPOINTS}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, status):
+        with self._lock:
+            self.latencies[name].append(seconds)
+            self.statuses[name][str(status)] += 1
+
+
+def request(base_url, method, path, token=None, body=None, content_type=None):
+    """Send one HTTP request; returns (status, parsed JSON or None)"""
+    req = urllib.request.Request(base_url + path, data=body, method=method)
+    if token:
+        req.add_header('Authorization', f'Bearer {token}')
+    if content_type:
+        req.add_header('Content-Type', content_type)
+    try:
+        with urllib.request.urlopen(req, timeout=300) as response:
+            return response.status, json.loads(response.read() or b'null')
+    except urllib.error.HTTPError as e:
+        return e.code, None
+
+
+def multipart_file(filename, content):
+    """Encode a single-file multipart/form-data body"""
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: text/plain\r\n\r\n'
+    ).encode('utf-8') + content + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def register(base_url, index):
+    email = f'load-{uuid.uuid4().hex[:8]}-{index}@example.com'
+    status, data = request(base_url, 'POST', '/api/auth/register',
+                           body=json.dumps({'email': email, 'password': 'load-test', 'full_name': f'Load {index}'}).encode(),
+                           content_type='application/json')
+    if status != 201:
+        raise RuntimeError(f'Could not register load-test user (HTTP {status})')
+    return data['access_token']
+
+
+def login(base_url, email, password):
+    status, data = request(base_url, 'POST', '/api/auth/login',
+                           body=json.dumps({'email': email, 'password': password}).encode(),
+                           content_type='application/json')
+    if status != 200:
+        raise RuntimeError(f'Could not log in as {email} (HTTP {status})')
+    return data['access_token']
+
+
+def client(base_url, index, token, admin_token, requests, pages, duplicate_ratio, mix, recorder, job_ids):
+    """One simulated user issuing a weighted mix of requests"""
+    rng = random.Random(index)
+    names, weights = zip(*mix.items())
+    shared_text = generate_text(pages, seed=0).encode('utf-8')
+
+    for n in range(requests):
+        name = rng.choices(names, weights)[0]
+        method, path = ENDPOINTS[name]
+        start = time.perf_counter()
+        if name == 'upload':
+            content = shared_text if rng.random() < duplicate_ratio else \
+                generate_text(pages, seed=index * 100003 + n + 1).encode('utf-8')
+            body, content_type = multipart_file(f'load_{index}_{n}.txt', content)
+            status, data = request(base_url, method, path, token, body, content_type)
+            if data and data.get('job'):
+                job_ids.append((token, data['job']['id']))
+        elif name == 'stats':
+            status, _ = request(base_url, method, path, admin_token)
+        else:
+            status, _ = request(base_url, method, path, token)
+        recorder.record(name, time.perf_counter() - start, status)
+
+
+def wait_for_jobs(base_url, job_ids, timeout):
+    """Poll queued analysis jobs until all finish; returns (seconds, status counts)"""
+    start = time.perf_counter()
+    pending = list(job_ids)
+    finished = Counter()
+    while pending and time.perf_counter() - start < timeout:
+        still_pending = []
+        for token, job_id in pending:
+            status, data = request(base_url, 'GET', f'/api/jobs/{job_id}', token)
+            job_status = data['job']['status'] if status == 200 else f'http_{status}'
+            if job_status in ('queued', 'running'):
+                still_pending.append((token, job_id))
+            else:
+                finished[job_status] += 1
+        pending = still_pending
+        if pending:
+            time.sleep(0.5)
+    finished['timed_out'] += len(pending)
+    return round(time.perf_counter() - start, 3), dict(finished)
+
+
+def start_local_server(workers):
+    """Start the app in-process on a free port with a throwaway database; returns (base_url, password)"""
+    workdir = tempfile.mkdtemp(prefix='smartdoc-load-')
+    password = uuid.uuid4().hex
+    os.environ.update({
+        'DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+        'ADMIN_EMAIL': 'admin@smartdoc.com',
+        'ADMIN_PASSWORD': password,
+        'ANALYSIS_WORKERS': str(workers),
+        # Measure throughput rather than admission control's 429/503 responses
+        'ANALYSIS_RATE_PER_MINUTE': '0',
+        'ANALYSIS_MAX_QUEUE_DEPTH': '0',
+    })
+
+    add_repo_to_path()
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', password
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='target an already running server instead of starting one')
+    parser.add_argument('--admin-email', default='admin@smartdoc.com')
+    parser.add_argument('--admin-password', help='required with --url')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=25, help='requests per client')
+    parser.add_argument('--pages', type=int, default=2, help='size of each uploaded document')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.0,
+                        help='fraction of uploads that reuse identical content')
+    parser.add_argument('--mix', default='upload=2,list=5,stats=1', help='relative weights per endpoint')
+    parser.add_argument('--workers', type=int, default=2, help='ANALYSIS_WORKERS for the in-process server')
+    parser.add_argument('--wait-jobs', type=float, default=0, help='seconds to wait for queued analyses')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    mix = {name: float(weight) for name, weight in (item.split('=') for item in args.mix.split(','))}
+    if args.url:
+        base_url, password = args.url.rstrip('/'), args.admin_password
+    else:
+        base_url, password = start_local_server(args.workers)
+
+    admin_token = login(base_url, args.admin_email, password)
+    tokens = [register(base_url, index) for index in range(args.clients)]
+    recorder = Recorder()
+    job_ids = []
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        futures = [
+            executor.submit(client, base_url, index, tokens[index], admin_token, args.requests,
+                            args.pages, args.duplicate_ratio, mix, recorder, job_ids)
+            for index in range(args.clients)
+        ]
+        for future in futures:
+            future.result()
+    wall = time.perf_counter() - wall_start
+
+    results = {
+        'benchmark': 'load_test',
+        'started_at': datetime.utcnow().isoformat(),
+        'target': base_url,
+        'clients': args.clients,
+        'requests_per_client': args.requests,
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(sum(len(v) for v in recorder.latencies.values()) / wall, 3),
+        'endpoints': {
+            name: dict(latency_summary(latencies), statuses=dict(recorder.statuses[name]),
+                       throughput_rps=round(len(latencies) / wall, 3))
+            for name, latencies in recorder.latencies.items() if latencies
+        },
+    }
+    if args.wait_jobs and job_ids:
+        seconds, outcome = wait_for_jobs(base_url, job_ids, args.wait_jobs)
+        results['jobs'] = {'count': len(job_ids), 'drain_seconds': seconds, 'outcome': outcome}
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
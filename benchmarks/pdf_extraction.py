@@ -0,0 +1,66 @@
+"""Compare PDF text extraction strategies on generated PDFs.
+
+Usage:
+    python benchmarks/pdf_extraction.py --pages 50 200 500 --workers 4
+
+Prints one JSON object per PDF size with wall time for the legacy
+string-concatenation loop, serial page streaming and the parallel page
+pool, plus the slowest page.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import PyPDF2
+
+from common import add_repo_to_path
+
+add_repo_to_path()
+
+import pdf_extraction  # noqa: E402
+from corpus import write_pdf  # noqa: E402
+
+
+def legacy_extract(file_path):
+    """The original extraction loop, kept as the baseline"""
+    text = ""
+    with open(file_path, 'rb') as file:
+        for page in PyPDF2.PdfReader(file).pages:
+            text += page.extract_text() + "\n"
+    return text.strip()
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return round(time.perf_counter() - start, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[50, 200, 500])
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            path = os.path.join(tmp, f'{pages}.pdf')
+            write_pdf(path, pages)
+            timings = []
+            result = {
+                'pages': pages,
+                'legacy_seconds': timed(legacy_extract, path),
+                'serial_seconds': timed(pdf_extraction.extract_text, path, timings=timings, workers=1),
+            }
+            # First parallel run includes pool start-up; the pool is reused afterwards
+            pdf_extraction.extract_text(path, workers=args.workers)
+            result['parallel_seconds'] = timed(pdf_extraction.extract_text, path, workers=args.workers)
+            slowest = max(timings, key=lambda item: item[1])
+            result['slowest_page'] = {'page': slowest[0], 'seconds': round(slowest[1], 4)}
+            print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark utils.analyze_document and each of its stages over a generated corpus.
+
+Usage:
+    python benchmarks/pipeline.py --pages 1 10 50 --docs 5 --output results.json
+
+For every size, a set of TXT and PDF documents is generated and each stage
+(extract_text, generate_summary, extract_key_points, analyze_sentiment)
+and the full analyze_document call are timed. Results are written as JSON
+with throughput, latency percentiles and peak RSS. The result cache is
+turned off, as every stage sees the same texts again in analyze_document.
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+
+from common import add_repo_to_path, disable_result_cache, latency_summary, peak_rss_mb
+from corpus import generate_text, write_pdf
+
+add_repo_to_path()
+
+import utils  # noqa: E402
+from model_registry import registry  # noqa: E402
+
+
+def build_corpus(directory, pages, docs):
+    """Write `docs` TXT and `docs` PDF files of the given size; returns [(path, file_type)]"""
+    files = []
+    for index in range(docs):
+        txt_path = os.path.join(directory, f'{pages}p_{index}.txt')
+        with open(txt_path, 'w', encoding='utf-8') as file:
+            file.write(generate_text(pages, seed=index))
+        files.append((txt_path, 'txt'))
+
+        pdf_path = os.path.join(directory, f'{pages}p_{index}.pdf')
+        write_pdf(pdf_path, pages, seed=index)
+        files.append((pdf_path, 'pdf'))
+    return files
+
+
+def time_calls(fn, inputs):
+    """Call fn on every input, returning per-call latencies and total wall time"""
+    latencies = []
+    wall_start = time.perf_counter()
+    for args in inputs:
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - start)
+    return latencies, time.perf_counter() - wall_start
+
+
+def stage_result(latencies, wall, total_bytes):
+    result = latency_summary(latencies)
+    result['throughput_per_s'] = round(len(latencies) / wall, 3) if wall else None
+    result['mb_per_s'] = round(total_bytes / 2 ** 20 / wall, 3) if wall else None
+    return result
+
+
+def run(pages_list, docs, warm_up=True):
+    disable_result_cache()
+    if warm_up:
+        registry.warm_up()
+
+    results = {
+        'benchmark': 'pipeline',
+        'started_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'models': registry.status(),
+        'sizes': []
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        for pages in pages_list:
+            files = build_corpus(directory, pages, docs)
+            file_bytes = sum(os.path.getsize(path) for path, _ in files)
+            texts = [utils.extract_text(path, file_type) for path, file_type in files]
+            text_bytes = sum(len(text.encode('utf-8')) for text in texts)
+
+            stages = {}
+            latencies, wall = time_calls(utils.extract_text, files)
+            stages['extract_text'] = stage_result(latencies, wall, file_bytes)
+            for name in ('generate_summary', 'extract_key_points', 'analyze_sentiment'):
+                latencies, wall = time_calls(getattr(utils, name), [(text,) for text in texts])
+                stages[name] = stage_result(latencies, wall, text_bytes)
+            latencies, wall = time_calls(utils.analyze_document, files)
+            stages['analyze_document'] = stage_result(latencies, wall, file_bytes)
+
+            results['sizes'].append({
+                'pages': pages,
+                'documents': len(files),
+                'words_per_document': utils.count_words(texts[0]),
+                'stages': stages,
+                'peak_rss_mb': peak_rss_mb()
+            })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--docs', type=int, default=5, help='documents per file type and size')
+    parser.add_argument('--no-warm-up', action='store_true', help='include model loading in the first call')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    results = run(args.pages, args.docs, warm_up=not args.no_warm_up)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
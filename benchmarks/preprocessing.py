@@ -0,0 +1,244 @@
+"""Measure each analysis stage's text handling before and after sharing one PreparedText.
+
+Usage:
+    python benchmarks/preprocessing.py --pages 10 100 1000 --repeat 3
+
+"before" runs the original implementations, which tokenize the raw string
+again in every stage. "after" builds a PreparedText once ('prepare') and
+passes it to the utils stage functions. The stages are the model-free work
+of an analysis:
+- the summarizer and sentiment chunk inputs
+- the extractive summary
+- the spaCy key point window and the fallback key points
+- the fallback sentiment
+- the word count and the result cache digests
+
+For each document size the script prints one JSON object with the median
+milliseconds and the tracemalloc peak (KB) of each stage, and the size of
+the PreparedText offsets. No models are needed.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import re
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+
+from common import add_repo_to_path
+from corpus import generate_text
+
+add_repo_to_path()
+
+import utils  # noqa: E402
+from config import Config  # noqa: E402
+from prepared_text import prepare  # noqa: E402
+
+_SENTENCE_SEGMENT = re.compile(r'[^.!?]+')
+
+
+def legacy_chunk_text(text, max_words):
+    """Original chunk_text: a regex pass over sentences, split() per sentence"""
+    pending = None
+    current = []
+    for match in re.finditer(r'[^.!?]+[.!?]*', text):
+        words = match.group().split()
+        while words:
+            room = max_words - len(current)
+            if len(words) > room and current:
+                if pending is not None:
+                    yield pending
+                pending = ' '.join(current)
+                current = []
+                continue
+            current.extend(words[:max_words])
+            words = words[max_words:]
+    if current:
+        if pending is not None and len(current) < max_words // 4:
+            pending = pending + ' ' + ' '.join(current)
+        else:
+            if pending is not None:
+                yield pending
+            pending = ' '.join(current)
+    if pending is not None:
+        yield pending
+
+
+def legacy_sample_chunks(text, max_words, max_chunks):
+    total_chunks = -(-sum(1 for _ in re.finditer(r'\S+', text)) // max_words)
+    stride = max(1, -(-total_chunks // max_chunks))
+    return [chunk for index, chunk in enumerate(legacy_chunk_text(text, max_words)) if index % stride == 0]
+
+
+def legacy_sentence_spans(text, min_length):
+    for match in _SENTENCE_SEGMENT.finditer(text):
+        start, end = match.span()
+        segment = match.group()
+        stripped = segment.strip()
+        if len(stripped) > min_length:
+            start += len(segment) - len(segment.lstrip())
+            yield start, start + len(stripped)
+
+
+def legacy_extractive_summary(text, sentences=utils.EXTRACTIVE_SUMMARY_SENTENCES):
+    kept = []
+    stride = 1
+    for index, span in enumerate(legacy_sentence_spans(text, 20)):
+        if index % stride == 0:
+            kept.append(span)
+            if len(kept) > utils.EXTRACTIVE_MAX_SENTENCES:
+                kept = kept[::2]
+                stride *= 2
+    if not kept:
+        return "Document is too short to summarize."
+    if len(kept) > sentences:
+        scores = utils._textrank([utils._WORD.findall(text[start:end].lower()) for start, end in kept])
+        kept = [kept[i] for i in np.sort(np.argsort(-scores, kind='stable')[:sentences])]
+    return ' '.join(' '.join(text[start:end].split()) + '.' for start, end in kept)
+
+
+def legacy_fallback_key_points(text):
+    spans = list(itertools.islice(legacy_sentence_spans(text, 30), 30))
+    if not spans:
+        return []
+    bounds = np.array(spans, dtype=np.int64)
+    starts, ends = bounds[:, 0], bounds[:, 1]
+    head = text[:ends[-1]].lower()
+    offsets = np.fromiter(
+        (m.start() for m in utils._WORD.finditer(head) if m.group() in utils._IMPORTANCE_LEXICON), dtype=np.int64
+    )
+    sentence_index = np.searchsorted(starts, offsets, side='right') - 1
+    inside = (sentence_index >= 0) & (offsets < ends[np.maximum(sentence_index, 0)])
+    selected = list(np.flatnonzero(np.bincount(sentence_index[inside], minlength=len(spans)) > 0)[:5])
+    if len(selected) < 5:
+        word_counts = np.array([len(text[start:end].split()) for start, end in spans[:15]])
+        for index in np.flatnonzero(word_counts >= 8):
+            if index not in selected:
+                selected.append(index)
+                if len(selected) >= 5:
+                    break
+    key_points = []
+    for index in selected:
+        if text[starts[index]:ends[index]] not in key_points:
+            key_points.append(text[starts[index]:ends[index]])
+    return key_points[:5]
+
+
+def legacy_prefix_end(text, sentences, limit):
+    for count, match in enumerate(_SENTENCE_SEGMENT.finditer(text, 0, limit), 1):
+        if count >= sentences:
+            return min(limit, match.end() + 1)
+    return limit
+
+
+def legacy_stages(text):
+    """(name, fn) per stage of the original code; each takes the raw string"""
+    window = utils.KEY_POINT_SENTENCES + 10
+    return [
+        ('summary_chunks', lambda: legacy_sample_chunks(text, Config.SUMMARY_CHUNK_WORDS, Config.SUMMARY_MAX_CHUNKS)),
+        ('extractive_summary', lambda: legacy_extractive_summary(text)),
+        ('key_point_window', lambda: legacy_prefix_end(text, window, min(len(text), utils.KEY_POINT_MAX_CHARS))),
+        ('fallback_key_points', lambda: legacy_fallback_key_points(text)),
+        ('sentiment_chunks', lambda: legacy_sample_chunks(text, Config.SENTIMENT_CHUNK_WORDS,
+                                                          Config.SENTIMENT_MAX_CHUNKS)),
+        ('fallback_sentiment', lambda: utils.analyze_fallback_sentiment(text)),
+        ('word_count', lambda: len(text.split())),
+        # One digest per cached stage
+        ('cache_digests', lambda: [hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+                                   for _ in range(3)]),
+    ]
+
+
+def prepared_stages(text):
+    """(name, fn) per stage with one PreparedText shared by all of them"""
+    holder = {}
+    window = utils.KEY_POINT_SENTENCES + 10
+
+    def build():
+        # Compute every view now so that its cost shows here rather than in the first stage using it
+        document = holder['document'] = prepare(text)
+        document.sentence_spans()
+        document.sentence_words()
+    stages = [('prepare', build)]
+    stages += [
+        ('summary_chunks', lambda: list(utils._sample_chunks(holder['document'], Config.SUMMARY_CHUNK_WORDS,
+                                                             Config.SUMMARY_MAX_CHUNKS))),
+        ('extractive_summary', lambda: utils.generate_extractive_summary(holder['document'])),
+        ('key_point_window', lambda: utils._sentence_prefix_end(holder['document'], window,
+                                                                min(len(text), utils.KEY_POINT_MAX_CHARS))),
+        ('fallback_key_points', lambda: utils.extract_fallback_key_points(holder['document'])),
+        ('sentiment_chunks', lambda: list(utils._sample_chunks(holder['document'], Config.SENTIMENT_CHUNK_WORDS,
+                                                               Config.SENTIMENT_MAX_CHUNKS))),
+        ('fallback_sentiment', lambda: utils.analyze_fallback_sentiment(holder['document'])),
+        ('word_count', lambda: holder['document'].word_count),
+        ('cache_digests', lambda: [holder['document'].digest for _ in range(3)]),
+    ]
+    return stages, holder
+
+
+def run_pass(stages, traced):
+    """Run every stage in order; returns {stage: seconds} or {stage: peak KB} when traced"""
+    measurements = {}
+    for name, fn in stages:
+        if traced:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            fn()
+            measurements[name] = round((tracemalloc.get_traced_memory()[1] - before) / 1024, 1)
+        else:
+            start = time.perf_counter()
+            fn()
+            measurements[name] = time.perf_counter() - start
+    return measurements
+
+
+def measure(make_stages, repeat):
+    """Median milliseconds and tracemalloc peak per stage, each pass starting from the raw string"""
+    timings = [run_pass(make_stages(), traced=False) for _ in range(repeat)]
+    tracemalloc.start()
+    try:
+        peaks = run_pass(make_stages(), traced=True)
+    finally:
+        tracemalloc.stop()
+    result = {
+        name: {'ms': round(statistics.median(run[name] for run in timings) * 1000, 2), 'peak_kb': peaks[name]}
+        for name in peaks
+    }
+    result['total'] = {
+        'ms': round(statistics.median(sum(run.values()) for run in timings) * 1000, 2),
+        'peak_kb': max(peaks.values())
+    }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=float, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for pages in args.pages:
+        text = generate_text(pages)
+        stages, holder = prepared_stages(text)
+        stages[0][1]()
+        for (name, legacy), (_, current) in zip(legacy_stages(text), stages[1:]):
+            # Both sides must produce the same results
+            assert legacy() == current(), name
+        document = holder['document']
+        offsets = sum(array.nbytes for array in (*document.words, *document.segments,
+                                                 *document.sentence_spans(), *document.sentence_words()[:2]))
+        print(json.dumps({
+            'pages': pages,
+            'characters': len(text),
+            'words': document.word_count,
+            'before': measure(lambda: legacy_stages(text), args.repeat),
+            'after': measure(lambda: prepared_stages(text)[0], args.repeat),
+            'prepared_offsets_kb': round(offsets / 1024, 1)
+        }))
+
+
+if __name__ == '__main__':
+    main()
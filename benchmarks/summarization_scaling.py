@@ -0,0 +1,71 @@
+"""Measure how summarization and sentiment latency scale with document length.
+
+Usage:
+    python benchmarks/summarization_scaling.py --pages 1 5 20 100 --repeat 3
+
+Prints one JSON object per document size. Without the transformers models
+installed the fallback methods are measured instead (see ``models`` in the
+output). The result cache is turned off so that every --repeat run is
+timed cold.
+"""
+import argparse
+import json
+import resource
+import statistics
+import time
+import tracemalloc
+
+from common import add_repo_to_path, disable_result_cache
+
+add_repo_to_path()
+
+import utils  # noqa: E402
+from model_registry import registry  # noqa: E402
+from corpus import generate_text  # noqa: E402
+
+
+def timed(fn, *args):
+    """Run fn, returning (result, seconds, peak traced bytes)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 5, 20, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    disable_result_cache()
+    registry.warm_up(['summarizer', 'sentiment'])
+    models = {name: registry.is_loaded(name) for name in ('summarizer', 'sentiment')}
+
+    for pages in args.pages:
+        text = generate_text(pages)
+        summary_times, sentiment_times, peaks = [], [], []
+        for _ in range(args.repeat):
+            _, seconds, peak = timed(utils.generate_summary, text)
+            summary_times.append(seconds)
+            peaks.append(peak)
+            _, seconds, peak = timed(utils.analyze_sentiment, text)
+            sentiment_times.append(seconds)
+            peaks.append(peak)
+
+        print(json.dumps({
+            'pages': pages,
+            'words': utils.count_words(text),
+            'models': models,
+            'summary_seconds_median': round(statistics.median(summary_times), 4),
+            'sentiment_seconds_median': round(statistics.median(sentiment_times), 4),
+            'peak_traced_mb': round(max(peaks) / 2 ** 20, 2),
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        }))
+
+
+if __name__ == '__main__':
+    main()
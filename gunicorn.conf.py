@@ -0,0 +1,64 @@
+"""Gunicorn settings: gunicorn -c gunicorn.conf.py app:app
+
+WEB_CONCURRENCY sets the number of web workers. Model memory does not grow
+with it in either of these modes:
+
+- MODEL_PRELOAD=true: the app and its models are loaded once in the master
+  and the workers are forked from it, sharing the weights copy-on-write.
+- MODEL_SERVER_ADDRESS=<socket path>: workers forward model calls to one
+  model server, which is started here next to the workers unless
+  MODEL_SERVER_START=false (e.g. when it runs as its own service). Without
+  MODEL_SERVER_AUTHKEY, a random key is generated for the server started
+  here and inherited by the workers.
+"""
+import os
+import secrets
+import subprocess
+import sys
+import time
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+preload_app = os.getenv('MODEL_PRELOAD', 'false').lower() == 'true'
+if preload_app:
+    # Analysis workers forked from a web worker inherit its models as well
+    os.environ.setdefault('ANALYSIS_WORKER_START_METHOD', 'fork')
+
+MODEL_SERVER_START_TIMEOUT = int(os.getenv('MODEL_SERVER_START_TIMEOUT', 600))
+
+if os.getenv('MODEL_SERVER_ADDRESS') and os.getenv('MODEL_SERVER_START', 'true').lower() == 'true':
+    # Set before the app is loaded, so the server and every worker read the same key
+    os.environ.setdefault('MODEL_SERVER_AUTHKEY', secrets.token_hex(32))
+
+_model_server = None
+
+
+def on_starting(server):
+    """Start the shared model server and wait until its socket is up"""
+    global _model_server
+    address = os.getenv('MODEL_SERVER_ADDRESS')
+    if not address or os.getenv('MODEL_SERVER_START', 'true').lower() != 'true':
+        return
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_server.py')
+    _model_server = subprocess.Popen([sys.executable, script, '--address', address])
+    deadline = time.monotonic() + MODEL_SERVER_START_TIMEOUT
+    # The socket is created once every model has loaded
+    while not os.path.exists(address) and time.monotonic() < deadline:
+        if _model_server.poll() is not None:
+            raise RuntimeError(f'Model server exited with status {_model_server.returncode}')
+        time.sleep(0.5)
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app import after_fork
+        after_fork()
+
+
+def on_exit(server):
+    if _model_server is not None and _model_server.poll() is None:
+        _model_server.terminate()
+        _model_server.wait(timeout=30)
@@ -0,0 +1,117 @@
+"""Micro-batching inference engine for the HuggingFace pipelines.
+
+Callers submit single texts and get a ``Future`` back. A background
+thread per engine collects pending requests for up to
+``INFERENCE_MAX_WAIT_MS`` or until ``INFERENCE_MAX_BATCH_SIZE`` items are
+waiting, runs them through the pipeline as one batch and routes each
+result back to its caller. Requests with different generation options
+(e.g. summary lengths) are batched separately.
+"""
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from config import Config
+
+
+class BatchingEngine:
+    """Collects single-item requests and runs them through ``batch_fn`` in batches"""
+
+    def __init__(self, name, batch_fn, max_batch_size=None, max_wait_ms=None):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size or Config.INFERENCE_MAX_BATCH_SIZE
+        self.max_wait = (Config.INFERENCE_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+
+    def submit(self, item, **options):
+        """Queue one item for inference and return a Future for its result"""
+        future = Future()
+        self._queue.put((tuple(sorted(options.items())), item, future))
+        self._ensure_worker()
+        return future
+
+    def __call__(self, item, **options):
+        """Run one item through the engine and wait for the result"""
+        return self.submit(item, **options).result()
+
+    def stats(self):
+        """Return achieved batch size statistics"""
+        with self._lock:
+            sizes = dict(self._batch_sizes)
+        batches = sum(sizes.values())
+        items = sum(size * count for size, count in sizes.items())
+        return {
+            'name': self.name,
+            'batches': batches,
+            'items': items,
+            'mean_batch_size': round(items / batches, 2) if batches else 0.0,
+            'batch_sizes': {str(size): count for size, count in sorted(sizes.items())},
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0
+        }
+
+    def _ensure_worker(self):
+        """Start the batching thread if it is not running"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f'{self.name}-batcher', daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the window closes"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Batching loop"""
+        while True:
+            groups = {}
+            for options, item, future in self._collect():
+                if future.set_running_or_notify_cancel():
+                    groups.setdefault(options, []).append((item, future))
+
+            for options, entries in groups.items():
+                items = [item for item, _ in entries]
+                try:
+                    results = self.batch_fn(items, **dict(options))
+                except Exception as e:
+                    for _, future in entries:
+                        future.set_exception(e)
+                else:
+                    for (_, future), result in zip(entries, results):
+                        future.set_result(result)
+                with self._lock:
+                    self._batch_sizes[len(items)] += 1
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(name, batch_fn):
+    """Get (or create) the process-wide engine for a model"""
+    with _engines_lock:
+        engine = _engines.get(name)
+        if engine is None:
+            engine = _engines[name] = BatchingEngine(name, batch_fn)
+        return engine
+
+
+def stats():
+    """Return batch statistics for every engine in this process"""
+    with _engines_lock:
+        engines = list(_engines.values())
+    return {engine.name: engine.stats() for engine in engines}
@@ -0,0 +1,396 @@
+"""Background analysis job queue.
+
+Uploads only persist the file and its ``Document`` row; the expensive
+analysis (text extraction, summarization, sentiment) runs in a pool of
+local worker processes. The web process keeps a small dispatcher thread
+that hands jobs to the pool one free slot at a time, so a job is only
+marked ``running`` once a worker is actually available for it.
+
+Worker processes never touch the database: they run the pure
+``analyze_document`` function and the results are written back by the
+web process in the pool's completion callback.
+
+If a worker process dies (out of memory, a crash in native code) the
+pool breaks: it is replaced and the jobs that were on it are queued again
+one by one, up to ``MAX_CRASH_RETRIES`` times each. Jobs left ``running``
+by a web process that died are queued again once they have been running
+for ``ANALYSIS_JOB_TIMEOUT`` seconds, at startup or by the dispatcher.
+
+Bulk uploads are queued as groups of up to ``ANALYSIS_BATCH_SIZE`` jobs.
+A group occupies one worker slot and its documents are analyzed together
+(``utils.analyze_documents``), so their model calls share batches.
+
+With ``PROVISIONAL_SUMMARIES`` an upload's analysis stores an extractive
+summary and queues a ``summary`` job that replaces it with the abstractive
+one. Summary jobs are dispatched after every queued analysis job, so the
+summarizer never delays the first results of an upload. If a summary job
+fails, the extractive summary is kept as the final one.
+"""
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+from models import db, Document, Analysis, AnalysisJob
+import metrics
+import model_registry
+import search
+import text_store
+import utils
+
+_app = None
+_executor = None
+_slots = None
+_pending = queue.PriorityQueue()  # (priority, sequence, job ids)
+_sequence = itertools.count()
+_dispatcher = None
+_lock = threading.Lock()
+_crashes = {}  # job id -> times it was on a pool that broke
+
+BACKGROUND_POLL_SECONDS = 0.5
+# Seconds the idle dispatcher waits between looks for jobs left running by a dead process
+STALE_SWEEP_SECONDS = 60
+# Times a job is queued again after its worker pool broke before it is failed
+MAX_CRASH_RETRIES = 2
+
+# Dispatch order of queued jobs by kind (lower first)
+PRIORITIES = {'analysis': 0, 'summary': 1}
+
+metrics.gauge('smartdoc_analysis_jobs_queued', 'Analysis jobs waiting for a worker in this process',
+              callback=_pending.qsize)
+_running = metrics.gauge('smartdoc_analysis_jobs_running', 'Analysis jobs running in this process\'s worker pool')
+
+
+def init_app(app):
+    """Bind the job queue to the Flask app and re-enqueue unfinished jobs"""
+    global _app
+    _app = app
+
+    # Spawned pool workers re-import the main module; they must not dispatch jobs
+    if multiprocessing.parent_process() is not None:
+        return
+
+    if app.config['ANALYSIS_WORKERS'] > 0:
+        with app.app_context():
+            _requeue_stale()
+            for job in AnalysisJob.query.filter_by(status='queued').all():
+                _schedule(job.kind, [job.id])
+        # Also started with nothing queued, so that it sweeps up stale jobs
+        _ensure_dispatcher()
+
+
+def enqueue(document):
+    """Create an analysis job for a document and schedule it"""
+    return enqueue_batch([document])[0]
+
+
+def enqueue_batch(documents, kind='analysis'):
+    """Create jobs for several documents in one commit and schedule them in groups"""
+    created = [AnalysisJob(document_id=document.id, status='queued', kind=kind) for document in documents]
+    if not created:
+        return created
+    db.session.add_all(created)
+    db.session.commit()
+
+    batch_size = max(1, _app.config['ANALYSIS_BATCH_SIZE'])
+    groups = [created[i:i + batch_size] for i in range(0, len(created), batch_size)]
+
+    if _app.config['ANALYSIS_WORKERS'] <= 0:
+        # Inline mode: analyze within the request (development/testing)
+        for group in groups:
+            _run_inline([job.id for job in group])
+        for job in created:
+            db.session.refresh(job)
+        return created
+
+    for group in groups:
+        _schedule(kind, [job.id for job in group])
+    _ensure_dispatcher()
+    return created
+
+
+def enqueue_summaries(documents):
+    """Queue abstractive summaries for documents whose analysis has a provisional one"""
+    return enqueue_batch(documents, kind='summary')
+
+
+def _schedule(kind, job_ids):
+    _pending.put((PRIORITIES[kind], next(_sequence), job_ids))
+
+
+def _provisional():
+    """Whether analyses from the worker pool defer their abstractive summary"""
+    return _app.config['PROVISIONAL_SUMMARIES'] and _app.config['ANALYSIS_WORKERS'] > 0
+
+
+def _submit(executor, jobs):
+    """Submit a group of claimed jobs of one kind; the future yields (results, error) pairs"""
+    if jobs[0].kind == 'summary':
+        texts = [text_store.load_text(job.document_id) for job in jobs]
+        return executor.submit(utils.refine_summaries, texts)
+    documents = [(job.document.file_path, job.document.file_type) for job in jobs]
+    return executor.submit(utils.analyze_documents, documents, _provisional())
+
+
+def _run_inline(job_ids):
+    """Analyze a group of jobs in this process"""
+    claimed = [job for job in map(_claim, job_ids) if job is not None]
+    if not claimed:
+        return
+    _running.inc(len(claimed))
+    try:
+        if claimed[0].kind == 'summary':
+            outcomes = utils.refine_summaries([text_store.load_text(job.document_id) for job in claimed])
+        else:
+            documents = [(job.document.file_path, job.document.file_type) for job in claimed]
+            outcomes = utils.analyze_documents(documents)
+    except Exception as e:
+        outcomes = [(None, str(e))] * len(claimed)
+    finally:
+        _running.dec(len(claimed))
+    for job, (results, error) in zip(claimed, outcomes):
+        _finish(job.id, results=results, error=error)
+
+
+def submit_background(fn, *args):
+    """Run fn(*args) in the worker pool behind queued jobs; returns a Future
+
+    Waits until no analysis or summary jobs are queued in this process, then
+    takes a worker slot the same way a job does, so background work
+    (backfills) only uses capacity that serving traffic leaves idle.
+    """
+    if _app.config['ANALYSIS_WORKERS'] <= 0:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    _get_executor()
+    while not _pending.empty():
+        time.sleep(BACKGROUND_POLL_SECONDS)
+    _slots.acquire()
+    try:
+        executor = _get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            _replace_executor(executor)
+            future = _get_executor().submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda f: _slots.release())
+    return future
+
+
+def get_job(job_id):
+    """Look up a job by id"""
+    return db.session.get(AnalysisJob, job_id)
+
+
+def save_analysis(document_id, results):
+    """Persist analysis results for a document"""
+    analysis = Analysis(
+        document_id=document_id,
+        summary=results['summary'],
+        summary_status=results.get('summary_status', 'final'),
+        key_points=results['key_points'],
+        sentiment=results['sentiment'],
+        sentiment_score=results['sentiment_score'],
+        word_count=results['word_count'],
+        version=results.get('version')
+    )
+    db.session.add(analysis)
+    text_store.save_text(document_id, results['extracted_text'])
+    
+    search.index_document(db.session.get(Document, document_id), results['summary'], results['extracted_text'])
+    return analysis
+
+
+def save_summary(document, summary):
+    """Replace a document's provisional summary with the final one (caller commits)"""
+    analysis = document.analysis
+    analysis.summary = summary
+    analysis.summary_status = 'final'
+    search.update_summary(document, summary)
+
+
+def _get_executor():
+    """Create the worker process pool on first use, or after a broken one was dropped"""
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = _app.config['ANALYSIS_WORKERS']
+            context = multiprocessing.get_context(_app.config['ANALYSIS_WORKER_START_METHOD'])
+            initializer = model_registry.warm_up if _app.config['MODEL_WARMUP'] else None
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=initializer)
+            if _slots is None:
+                # Kept across pools: futures of a broken pool still release their slots
+                _slots = threading.BoundedSemaphore(workers)
+        return _executor
+
+
+def _replace_executor(broken):
+    """Drop a pool that lost a worker; the next _get_executor creates a new one"""
+    global _executor
+    with _lock:
+        if _executor is not broken:
+            return
+        _executor = None
+    print("Analysis worker pool broke; starting a new one")
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _ensure_dispatcher():
+    """Start the dispatcher thread if it is not running"""
+    global _dispatcher
+    with _lock:
+        if _dispatcher is None or not _dispatcher.is_alive():
+            _dispatcher = threading.Thread(target=_dispatch_loop, name='analysis-dispatcher', daemon=True)
+            _dispatcher.start()
+
+
+def _dispatch_loop():
+    """Feed queued jobs to the process pool as worker slots free up"""
+    while True:
+        try:
+            _, _, job_ids = _pending.get(timeout=STALE_SWEEP_SECONDS)
+        except queue.Empty:
+            with _app.app_context():
+                _requeue_stale()
+            continue
+        executor = _get_executor()
+        _slots.acquire()
+        claimed = []
+        try:
+            with _app.app_context():
+                # Jobs already claimed by another web process, or deleted, are skipped
+                jobs = [job for job in map(_claim, job_ids) if job is not None]
+                claimed = [job.id for job in jobs]
+                if not claimed:
+                    _slots.release()
+                    continue
+                # The pool may have broken since it was fetched
+                executor = _get_executor()
+                future = _submit(executor, jobs)
+            _running.inc(len(claimed))
+        except BrokenProcessPool:
+            _slots.release()
+            _replace_executor(executor)
+            with _app.app_context():
+                _requeue(claimed)
+            continue
+        except Exception as e:
+            _slots.release()
+            with _app.app_context():
+                for job_id in claimed:
+                    _finish(job_id, error=e)
+            continue
+        future.add_done_callback(lambda f, claimed=claimed, executor=executor: _on_done(claimed, f, executor))
+
+
+def _claim(job_id):
+    """Atomically move a job from queued to running; returns None if it was not queued"""
+    claimed = AnalysisJob.query.filter_by(id=job_id, status='queued').update(
+        {'status': 'running', 'started_at': datetime.utcnow()}
+    )
+    db.session.commit()
+    return db.session.get(AnalysisJob, job_id) if claimed else None
+
+
+def _requeue(job_ids):
+    """Queue jobs from a broken pool again, each on its own; fail those that keep breaking it"""
+    for job_id in job_ids:
+        _crashes[job_id] = _crashes.get(job_id, 0) + 1
+        if _crashes[job_id] > MAX_CRASH_RETRIES:
+            del _crashes[job_id]
+            _finish(job_id, error='The analysis worker stopped unexpectedly')
+            continue
+        requeued = AnalysisJob.query.filter_by(id=job_id, status='running').update(
+            {'status': 'queued', 'started_at': None}
+        )
+        db.session.commit()
+        if requeued:
+            # Alone, so that a document which crashes the worker only fails itself
+            _schedule(db.session.get(AnalysisJob, job_id).kind, [job_id])
+
+
+def _requeue_stale():
+    """Queue again jobs left running, by a process that died, for longer than ANALYSIS_JOB_TIMEOUT"""
+    try:
+        cutoff = datetime.utcnow() - timedelta(seconds=_app.config['ANALYSIS_JOB_TIMEOUT'])
+        stale = AnalysisJob.query.filter(AnalysisJob.status == 'running', AnalysisJob.started_at < cutoff).all()
+        for job_id, kind, started_at in [(job.id, job.kind, job.started_at) for job in stale]:
+            # Another web process may be requeueing the same job
+            requeued = AnalysisJob.query.filter_by(id=job_id, status='running').update(
+                {'status': 'queued', 'started_at': None}
+            )
+            db.session.commit()
+            if requeued:
+                print(f"Requeueing analysis job {job_id}, running since {started_at}")
+                _schedule(kind, [job_id])
+    except Exception as e:
+        db.session.rollback()
+        print(f"Failed to requeue stale analysis jobs: {e}")
+
+
+def _on_done(job_ids, future, executor):
+    """Record the outcome of a finished worker future"""
+    _slots.release()
+    _running.dec(len(job_ids))
+    with _app.app_context():
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            _replace_executor(executor)
+            _requeue(job_ids)
+            return
+        for job_id in job_ids:
+            _crashes.pop(job_id, None)
+        if error is not None:
+            outcomes = [(None, error)] * len(job_ids)
+        else:
+            outcomes = future.result()
+        for job_id, (results, job_error) in zip(job_ids, outcomes):
+            _finish(job_id, results=results, error=job_error)
+
+
+def _finish(job_id, results=None, error=None):
+    """Store results (or the failure) and close out the job"""
+    try:
+        job = db.session.get(AnalysisJob, job_id)
+        if job is None:
+            return
+
+        if results is not None:
+            metrics.record_analysis(results.get('trace'))
+
+        document = db.session.get(Document, job.document_id)
+        if error is None and document is not None and (job.kind != 'summary' or document.analysis is not None):
+            with metrics.analysis_stage_duration.time(stage='store'):
+                if job.kind == 'summary':
+                    save_summary(document, results['summary'])
+                else:
+                    save_analysis(job.document_id, results)
+                job.status = 'done'
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+            if results.get('summary_status') == 'provisional':
+                enqueue_summaries([document])
+        else:
+            job.status = 'failed'
+            job.error = str(error) if error is not None else 'Document was deleted'
+            job.finished_at = datetime.utcnow()
+            if job.kind == 'summary' and document is not None and document.analysis is not None:
+                # The extractive summary becomes the final one instead of staying provisional forever
+                document.analysis.summary_status = 'final'
+            db.session.commit()
+        metrics.analysis_jobs.inc(outcome=job.status, kind=job.kind)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Failed to record analysis job {job_id}: {e}")
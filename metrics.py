@@ -0,0 +1,190 @@
+"""In-process metrics with a Prometheus text exposition.
+
+Counters, gauges and histograms are kept per process behind a single
+lock; recording is a dict lookup and a few additions, cheap enough for
+every request. Gauges can also be backed by a callback that is read at
+scrape time. When several web workers run, each exposes its own values
+(scrape them per process or aggregate by instance).
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ANALYSIS_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_lock = threading.Lock()
+_metrics = {}
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.values = {}
+
+    def _key(self, labels):
+        return tuple(sorted(labels.items()))
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        return [(self.name, key, value) for key, value in self.values.items()]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, callback=None):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with _lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.callback is not None:
+            try:
+                return [(self.name, (), self.callback())]
+            except Exception:
+                return []
+        return [(self.name, key, value) for key, value in self.values.items()]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        samples = []
+        for key, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                samples.append((f'{self.name}_bucket', key + (('le', le),), cumulative))
+            samples.append((f'{self.name}_sum', key, total))
+            samples.append((f'{self.name}_count', key, count))
+        return samples
+
+
+def _register(cls, name, documentation, **kwargs):
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, documentation, **kwargs)
+        return metric
+
+
+def counter(name, documentation):
+    """Get or create a counter"""
+    return _register(Counter, name, documentation)
+
+
+def gauge(name, documentation, callback=None):
+    """Get or create a gauge, optionally read from a callback at scrape time"""
+    return _register(Gauge, name, documentation, callback=callback)
+
+
+def histogram(name, documentation, buckets=DEFAULT_BUCKETS):
+    """Get or create a histogram"""
+    return _register(Histogram, name, documentation, buckets=buckets)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, float) and value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Render every metric in the Prometheus text exposition format (0.0.4)"""
+    lines = []
+    with _lock:
+        metrics = sorted(_metrics.values(), key=lambda m: m.name)
+        snapshot = [(metric, metric.samples()) for metric in metrics]
+
+    for metric, samples in snapshot:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for name, labels, value in samples:
+            if labels:
+                label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+                lines.append(f'{name}{{{label_text}}} {_format_value(value)}')
+            else:
+                lines.append(f'{name} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# ==================== APPLICATION METRICS ====================
+
+http_requests = counter('smartdoc_http_requests_total', 'HTTP requests by endpoint, method and status')
+http_duration = histogram('smartdoc_http_request_duration_seconds', 'HTTP request latency by endpoint')
+http_in_flight = gauge('smartdoc_http_requests_in_flight', 'HTTP requests currently being served')
+db_duration = histogram('smartdoc_db_query_duration_seconds', 'SQL statement latency by statement type')
+analysis_stage_duration = histogram('smartdoc_analysis_stage_duration_seconds',
+                                    'Document analysis time by stage', buckets=ANALYSIS_BUCKETS)
+analysis_jobs = counter('smartdoc_analysis_jobs_total', 'Finished analysis jobs by kind and outcome')
+model_fallbacks = counter('smartdoc_model_fallbacks_total',
+                          'Analysis steps that used the fallback method, by model and reason')
+result_cache_requests = counter('smartdoc_result_cache_requests_total',
+                                'Result cache lookups by analysis stage and outcome (hit tier or miss)')
+
+
+def record_analysis(trace):
+    """Record the stage timings, fallbacks and cache lookups reported by utils.analyze_document"""
+    if not trace:
+        return
+    for stage, seconds in trace.get('stages', {}).items():
+        analysis_stage_duration.observe(seconds, stage=stage)
+    for model, reason in trace.get('fallbacks', []):
+        model_fallbacks.inc(model=model, reason=reason)
+    for stage, outcome in trace.get('cache', []):
+        result_cache_requests.inc(stage=stage, outcome=outcome)
@@ -0,0 +1,127 @@
+"""Minimal versioned schema migrations.
+
+``db.create_all()`` creates missing tables but never alters existing
+ones, so columns and indexes added after a database was first created
+are applied here. Each migration is idempotent and recorded in the
+``schema_migrations`` table once it has run. ``schema_lock`` serialises
+startup across web workers so only one of them migrates at a time.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from models import db
+import text_store
+
+
+_LOCK_KEY = 5_318_008  # arbitrary pg_advisory_lock key for schema changes
+
+
+def _has_column(table, column):
+    return column in {c['name'] for c in inspect(db.engine).get_columns(table)}
+
+
+def _add_column(table, column, ddl):
+    if not _has_column(table, column):
+        db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+
+
+def _create_index(name, table, columns):
+    db.session.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})'))
+
+
+@contextmanager
+def schema_lock():
+    """Hold a cross-process lock while the schema is being changed"""
+    url = db.engine.url
+    if url.get_backend_name() == 'postgresql':
+        with db.engine.connect() as conn:
+            conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': _LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': _LOCK_KEY})
+                conn.commit()
+    elif url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:' and fcntl:
+        with open(f'{url.database}.migrate.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    else:
+        yield
+
+
+def _001_document_content_hash():
+    _add_column('documents', 'content_hash', 'VARCHAR(64)')
+    _create_index('ix_documents_content_hash', 'documents', 'content_hash')
+
+
+def _002_document_listing_indexes():
+    _create_index('ix_documents_user_id_uploaded_at', 'documents', 'user_id, uploaded_at')
+    _create_index('ix_documents_uploaded_at', 'documents', 'uploaded_at')
+
+
+def _003_move_extracted_text():
+    # Move the legacy in-row text (first 10k characters) into the compressed store
+    rows = db.session.execute(text(
+        "SELECT document_id, extracted_text FROM analysis WHERE extracted_text != '' "
+        "AND document_id NOT IN (SELECT document_id FROM document_texts)"
+    )).fetchall()
+    for document_id, content in rows:
+        text_store.save_text(document_id, content)
+    db.session.execute(text("UPDATE analysis SET extracted_text = ''"))
+
+
+def _004_query_indexes():
+    _create_index('ix_documents_user_id', 'documents', 'user_id')
+    _create_index('ix_analysis_sentiment', 'analysis', 'sentiment')
+    _create_index('ix_analysis_jobs_status', 'analysis_jobs', 'status')
+
+
+def _005_analysis_version():
+    _add_column('analysis', 'version', 'VARCHAR(32)')
+
+
+def _006_provisional_summaries():
+    _add_column('analysis', 'summary_status', "VARCHAR(20) NOT NULL DEFAULT 'final'")
+    _add_column('analysis_jobs', 'kind', "VARCHAR(20) NOT NULL DEFAULT 'analysis'")
+
+
+MIGRATIONS = [
+    (1, 'Add documents.content_hash for upload deduplication', _001_document_content_hash),
+    (2, 'Add indexes for paginated document listings', _002_document_listing_indexes),
+    (3, 'Move extracted text out of the analysis table', _003_move_extracted_text),
+    (4, 'Add indexes on documents.user_id, analysis.sentiment and analysis_jobs.status', _004_query_indexes),
+    (5, 'Add analysis.version for re-analysis backfills', _005_analysis_version),
+    (6, 'Add analysis.summary_status and analysis_jobs.kind for provisional summaries', _006_provisional_summaries),
+]
+
+
+def run_migrations():
+    """Apply every migration that has not been recorded yet"""
+    db.session.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, description VARCHAR(255), applied_at TIMESTAMP)'
+    ))
+    applied = {row[0] for row in db.session.execute(text('SELECT version FROM schema_migrations'))}
+
+    for version, description, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        migrate()
+        db.session.execute(
+            text('INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)'),
+            {'v': version, 'd': description, 't': datetime.utcnow()}
+        )
+        db.session.commit()
+        print(f"Applied migration {version}: {description}")
+
+    db.session.commit()
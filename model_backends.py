@@ -0,0 +1,159 @@
+"""CPU inference backends for the HuggingFace pipelines.
+
+``INFERENCE_BACKEND`` selects how the summarizer and sentiment models run:
+
+- ``pytorch``: the stock fp32 eager pipelines.
+- ``quantized``: dynamic int8 quantization of every ``nn.Linear`` layer
+  (``torch.ao.quantization.quantize_dynamic``). Activations stay fp32, so
+  the outputs stay close to the fp32 model.
+- ``onnx``: the model is exported to ONNX and run by ONNX Runtime through
+  optimum. This needs ``pip install optimum[onnxruntime]``.
+
+Converted models are written to ``MODEL_CACHE_DIR``, so later processes
+load them instead of converting again. Cache entries are keyed by model,
+backend and library versions. ``TORCH_NUM_THREADS`` and
+``TORCH_INTEROP_THREADS`` set the thread pools of both PyTorch and
+ONNX Runtime; 0 keeps the library defaults.
+"""
+import os
+import re
+import shutil
+import threading
+
+from config import Config
+
+BACKENDS = ('pytorch', 'quantized', 'onnx')
+
+_TASK_MODELS = {
+    'summarization': 'AutoModelForSeq2SeqLM',
+    'sentiment-analysis': 'AutoModelForSequenceClassification',
+}
+_ORT_TASK_MODELS = {
+    'summarization': 'ORTModelForSeq2SeqLM',
+    'sentiment-analysis': 'ORTModelForSequenceClassification',
+}
+
+_threads_configured = False
+_lock = threading.Lock()
+
+
+def configure_threads():
+    """Apply TORCH_NUM_THREADS / TORCH_INTEROP_THREADS to PyTorch (once per process)"""
+    global _threads_configured
+    with _lock:
+        if _threads_configured:
+            return
+        _threads_configured = True
+        import torch
+        if Config.TORCH_NUM_THREADS > 0:
+            torch.set_num_threads(Config.TORCH_NUM_THREADS)
+        if Config.TORCH_INTEROP_THREADS > 0:
+            try:
+                torch.set_num_interop_threads(Config.TORCH_INTEROP_THREADS)
+            except RuntimeError as e:
+                # Only possible before the first inter-op parallel work in this process
+                print(f"⚠ Could not set inter-op threads: {e}")
+
+
+def cache_path(model_name, backend):
+    """Directory holding a converted model"""
+    import torch
+    import transformers
+    versions = f'torch{torch.__version__}-transformers{transformers.__version__}'
+    if backend == 'onnx':
+        import optimum.version
+        versions += f'-optimum{optimum.version.__version__}'
+    safe_name = re.sub(r'[^A-Za-z0-9._-]+', '--', model_name)
+    return os.path.join(Config.MODEL_CACHE_DIR, backend, safe_name, re.sub(r'[^A-Za-z0-9._-]+', '_', versions))
+
+
+def load_pipeline(task, model_name, backend=None):
+    """Build a transformers pipeline for task on the configured backend"""
+    backend = backend or Config.INFERENCE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown INFERENCE_BACKEND {backend!r}; expected one of {", ".join(BACKENDS)}')
+
+    from transformers import pipeline
+    configure_threads()
+    if backend == 'pytorch':
+        return pipeline(task, model=model_name)
+    if backend == 'quantized':
+        model, tokenizer = _load_quantized(task, model_name)
+    else:
+        model, tokenizer = _load_onnx(task, model_name)
+    return pipeline(task, model=model, tokenizer=tokenizer)
+
+
+def _write_atomically(path, save):
+    """Run save(tmp_dir) and move the result into place; concurrent writers keep the first copy"""
+    tmp = f'{path}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    try:
+        save(tmp)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.rename(tmp, path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _load_quantized(task, model_name):
+    """Load an int8 dynamically quantized model, converting and caching it on first use"""
+    import torch
+    import transformers
+
+    path = cache_path(model_name, 'quantized')
+    model_file = os.path.join(path, 'model.pt')
+    if os.path.exists(model_file):
+        # The whole module is pickled: rebuilding it would mean quantizing again
+        model = torch.load(model_file, weights_only=False)
+        tokenizer = transformers.AutoTokenizer.from_pretrained(path)
+        return model.eval(), tokenizer
+
+    model_class = getattr(transformers, _TASK_MODELS[task])
+    model = model_class.from_pretrained(model_name).eval()
+    tokenizer = transformers.AutoTokenizer.from_pretrained(model_name)
+    model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def save(directory):
+        torch.save(model, os.path.join(directory, 'model.pt'))
+        tokenizer.save_pretrained(directory)
+    _write_atomically(path, save)
+    print(f"✓ Quantized {model_name} cached in {path}")
+    return model, tokenizer
+
+
+def _session_options():
+    import onnxruntime
+    options = onnxruntime.SessionOptions()
+    if Config.TORCH_NUM_THREADS > 0:
+        options.intra_op_num_threads = Config.TORCH_NUM_THREADS
+    if Config.TORCH_INTEROP_THREADS > 0:
+        options.inter_op_num_threads = Config.TORCH_INTEROP_THREADS
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return options
+
+
+def _load_onnx(task, model_name):
+    """Load an ONNX Runtime model, exporting and caching it on first use"""
+    import optimum.onnxruntime
+    import transformers
+
+    model_class = getattr(optimum.onnxruntime, _ORT_TASK_MODELS[task])
+    path = cache_path(model_name, 'onnx')
+    if not os.path.isdir(path):
+        model = model_class.from_pretrained(model_name, export=True)
+        tokenizer = transformers.AutoTokenizer.from_pretrained(model_name)
+
+        def save(directory):
+            model.save_pretrained(directory)
+            tokenizer.save_pretrained(directory)
+        _write_atomically(path, save)
+        print(f"✓ Exported {model_name} to ONNX in {path}")
+
+    # Loaded from the cache so the sessions get the configured thread settings
+    model = model_class.from_pretrained(path, session_options=_session_options(), provider='CPUExecutionProvider')
+    return model, transformers.AutoTokenizer.from_pretrained(path)
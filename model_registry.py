@@ -0,0 +1,140 @@
+"""Lazy registry for the optional NLP models.
+
+Nothing is imported or loaded at import time. Each model is loaded the
+first time it is requested (or by an explicit ``warm_up()``), its load
+time is recorded, and a failed or disabled model resolves to ``None`` so
+callers fall back to the basic text analysis methods.
+
+When ``MODEL_SERVER_ADDRESS`` is set, models are not loaded in this
+process at all: ``get`` reports what the shared model server has loaded
+and model calls are forwarded to it (see model_server.py).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from config import Config
+import model_backends
+import model_server
+
+
+class ModelRegistry:
+    """Loads registered models on first use and keeps them for the life of the process"""
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._load_times = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+        self.server = None
+
+    def register(self, name, loader, enabled=True):
+        """Register a zero-argument loader for a model"""
+        self._loaders[name] = (loader, enabled)
+
+    def use_server(self, client):
+        """Resolve models through a model server client (None to load them in this process)"""
+        self.server = client
+
+    def get(self, name):
+        """Return the loaded model, loading it if needed; None if disabled or unavailable"""
+        if self.server is not None:
+            return self.server.model(name)
+        if name in self._models:
+            return self._models[name]
+
+        with self._lock:
+            if name in self._models:
+                return self._models[name]
+
+            loader, enabled = self._loaders[name]
+            model = None
+            if enabled:
+                start = time.perf_counter()
+                try:
+                    model = loader()
+                    self._load_times[name] = round(time.perf_counter() - start, 3)
+                    print(f"✓ Model '{name}' loaded in {self._load_times[name]}s")
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    print(f"⚠ Model '{name}' not available - using fallback methods: {str(e)[:100]}")
+
+            # Failures are cached too, so a missing model is not retried on every call
+            self._models[name] = model
+            return model
+
+    def is_loaded(self, name):
+        """Check whether a model has been loaded successfully"""
+        if self.server is not None:
+            return self.server.model(name) is not None
+        return self._models.get(name) is not None
+
+    def warm_up(self, names=None):
+        """Load the given models (default: all enabled ones) ahead of first use"""
+        for name in names or self._loaders:
+            self.get(name)
+
+    def status(self):
+        """Return per-model load state and timings"""
+        if self.server is not None:
+            return {name: dict(state, server=self.server.address) for name, state in self.server.status().items()}
+        return {
+            name: {
+                'enabled': enabled,
+                'loaded': self.is_loaded(name),
+                'load_time': self._load_times.get(name),
+                'error': self._errors.get(name)
+            }
+            for name, (_, enabled) in self._loaders.items()
+        }
+
+
+def _load_spacy():
+    import spacy
+    # Components key-point extraction never reads (e.g. the lemmatizer) are not loaded
+    return spacy.load(Config.SPACY_MODEL, exclude=Config.SPACY_EXCLUDE)
+
+
+@contextmanager
+def _model_download():
+    """Turn off TLS certificate verification while a model loads, if MODEL_DOWNLOAD_INSECURE is set
+
+    The override is process-wide while it lasts, so it is opt-in and the
+    default HTTPS context is put back as soon as the load is over.
+    """
+    if not Config.MODEL_DOWNLOAD_INSECURE:
+        yield
+        return
+
+    import ssl
+    default_context = ssl._create_default_https_context
+    ssl._create_default_https_context = ssl._create_unverified_context
+    try:
+        yield
+    finally:
+        ssl._create_default_https_context = default_context
+
+
+def _load_summarizer():
+    with _model_download():
+        return model_backends.load_pipeline("summarization", Config.SUMMARIZER_MODEL)
+
+
+def _load_sentiment():
+    with _model_download():
+        return model_backends.load_pipeline("sentiment-analysis", Config.SENTIMENT_MODEL)
+
+
+registry = ModelRegistry()
+registry.register('spacy', _load_spacy, enabled=Config.SPACY_ENABLED)
+registry.register('summarizer', _load_summarizer, enabled=Config.SUMMARIZER_ENABLED)
+registry.register('sentiment', _load_sentiment, enabled=Config.SENTIMENT_ENABLED)
+if Config.MODEL_SERVER_ADDRESS:
+    registry.use_server(model_server.ModelClient(Config.MODEL_SERVER_ADDRESS,
+                                                 Config.MODEL_SERVER_AUTHKEY.encode('utf-8')))
+
+
+def warm_up():
+    """Load every enabled model now (used as the analysis worker initializer)"""
+    registry.warm_up()
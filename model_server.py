@@ -0,0 +1,191 @@
+"""Shared model server: one process holds the models for every worker.
+
+Each process that analyzes documents would otherwise load its own copy of
+the summarizer, sentiment classifier and spaCy pipeline. Start one server
+with ``flask serve-models`` (or ``python model_server.py``) and set
+``MODEL_SERVER_ADDRESS`` to its Unix socket path for the web and analysis
+workers: their model calls (model name, batch function, texts, options)
+are sent over the socket and run through the server's inference engines,
+so calls from different workers also share batches.
+
+Connections are authenticated with ``MODEL_SERVER_AUTHKEY``, which must
+be set explicitly (gunicorn.conf.py generates one for the server it
+starts), and the socket is created accessible to its owner only. A worker that cannot reach the
+server reports its models as unavailable and uses the fallback methods
+until the server is back.
+"""
+import argparse
+import os
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from config import Config
+
+# How long a client trusts the model status it last fetched from the server
+STATUS_TTL_SECONDS = 5
+
+# Functions of utils that clients may ask the server to run
+BATCH_FUNCTIONS = ('_summarize_batch', '_classify_batch', '_parse_key_points')
+
+
+class ModelServerError(Exception):
+    """The model server could not be reached or failed a call"""
+
+
+class RemoteModel:
+    """Stands in for a model loaded by the server; calls go through utils._run_model_batch"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f'RemoteModel({self.name!r})'
+
+
+class ModelClient:
+    """Connection to a model server, one socket per calling thread"""
+
+    def __init__(self, address, authkey):
+        self.address = address
+        self.authkey = authkey
+        self._local = threading.local()
+        self._status = {}
+        self._status_at = 0.0
+        self._lock = threading.Lock()
+
+    def _call(self, *message):
+        conn = getattr(self._local, 'conn', None)
+        # A cached connection may have been closed by a server restart; retry once on a new one
+        for retry in ((True, False) if conn is not None else (False,)):
+            try:
+                if conn is None:
+                    conn = self._local.conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+                conn.send(message)
+                ok, value = conn.recv()
+                break
+            except (OSError, EOFError, AuthenticationError) as e:
+                self._local.conn = None
+                if conn is not None:
+                    conn.close()
+                conn = None
+                if not retry:
+                    raise ModelServerError(f'Model server at {self.address} is unavailable: {e}')
+        if not ok:
+            raise ModelServerError(value)
+        return value
+
+    def status(self):
+        """Per-model load state on the server, refreshed every STATUS_TTL_SECONDS"""
+        with self._lock:
+            if time.monotonic() - self._status_at < STATUS_TTL_SECONDS:
+                return self._status
+        try:
+            status = self._call('status')
+        except ModelServerError as e:
+            print(f"⚠ {e}")
+            status = {}
+        with self._lock:
+            self._status = status
+            self._status_at = time.monotonic()
+        return status
+
+    def model(self, name):
+        """A RemoteModel if the server has the model loaded, else None"""
+        return RemoteModel(name) if self.status().get(name, {}).get('loaded') else None
+
+    def run_batch(self, name, batch_fn, texts, options):
+        """Run texts through a model on the server"""
+        return self._call('run', name, batch_fn.__name__, list(texts), options)
+
+    def inference_stats(self):
+        """Batch statistics of the server's inference engines"""
+        return self._call('inference_stats')
+
+
+def _dispatch(message):
+    """Handle one client request in the server"""
+    import inference
+    import utils
+    from model_registry import registry
+
+    command = message[0]
+    if command == 'status':
+        return registry.status()
+    if command == 'inference_stats':
+        return inference.stats()
+    if command == 'run':
+        name, fn_name, texts, options = message[1:]
+        if fn_name not in BATCH_FUNCTIONS:
+            raise ModelServerError(f'Unknown batch function: {fn_name}')
+        return utils._run_model_batch(name, getattr(utils, fn_name), texts, **options)
+    raise ModelServerError(f'Unknown command: {command}')
+
+
+def _handle(conn):
+    """Serve one client connection until it closes"""
+    with conn:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                reply = (True, _dispatch(message))
+            except Exception as e:
+                reply = (False, str(e))
+            try:
+                conn.send(reply)
+            except OSError:
+                return
+
+
+def serve(address=None):
+    """Load the models and serve them on a Unix socket until interrupted"""
+    from model_registry import registry
+
+    address = address or Config.MODEL_SERVER_ADDRESS
+    if not address:
+        raise SystemExit('Set MODEL_SERVER_ADDRESS (or pass --address) to the socket path to listen on')
+    if not Config.MODEL_SERVER_AUTHKEY:
+        # Messages are unpickled, so only clients holding the key may connect
+        raise SystemExit('Set MODEL_SERVER_AUTHKEY to a secret shared with the web and analysis workers')
+
+    # This process owns the models; it must not forward calls to itself
+    registry.use_server(None)
+    if os.path.exists(address):
+        try:
+            Client(address, family='AF_UNIX', authkey=Config.MODEL_SERVER_AUTHKEY.encode('utf-8')).close()
+        except (OSError, AuthenticationError):
+            os.remove(address)  # left behind by a server that exited
+        else:
+            raise SystemExit(f'A model server is already listening on {address}')
+
+    registry.warm_up()
+    # Create the socket without group and other permissions, rather than restricting it afterwards
+    umask = os.umask(0o077)
+    try:
+        listener = Listener(address, family='AF_UNIX', authkey=Config.MODEL_SERVER_AUTHKEY.encode('utf-8'))
+    finally:
+        os.umask(umask)
+    print(f"Model server listening on {address}")
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, OSError) as e:
+                print(f"Rejected model server connection: {e}")
+                continue
+            threading.Thread(target=_handle, args=(conn,), name='model-client', daemon=True).start()
+    finally:
+        listener.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--address', help='Unix socket path (default: MODEL_SERVER_ADDRESS)')
+    try:
+        serve(parser.parse_args().address)
+    except KeyboardInterrupt:
+        pass
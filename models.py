@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+import uuid
 import bcrypt
 
 db = SQLAlchemy()
@@ -17,14 +18,18 @@ class User(db.Model):
     # Relationships
     documents = db.relationship('Document', backref='user', lazy=True, cascade='all, delete-orphan')
     
-    def set_password(self, password):
+    def set_password(self, password, rounds=12):
         """Hash and set the password"""
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
     
     def check_password(self, password):
         """Verify password against hash"""
         return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
     
+    def password_rounds(self):
+        """Return the bcrypt cost the stored hash was created with"""
+        return int(self.password_hash.split('$')[2])
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -37,17 +42,23 @@ class User(db.Model):
 
 class Document(db.Model):
     __tablename__ = 'documents'
+    __table_args__ = (
+        # Per-user listing, newest first
+        db.Index('ix_documents_user_id_uploaded_at', 'user_id', 'uploaded_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
     file_type = db.Column(db.String(10), nullable=False)
     file_size = db.Column(db.Integer, nullable=False)  # in bytes
-    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    content_hash = db.Column(db.String(64), index=True)  # SHA-256 of the file contents
+    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     
     # Relationships
     analysis = db.relationship('Analysis', backref='document', uselist=False, cascade='all, delete-orphan')
+    jobs = db.relationship('AnalysisJob', backref='document', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
         return {
@@ -61,17 +72,31 @@ class Document(db.Model):
         }
 
 
+class StoredFile(db.Model):
+    __tablename__ = 'stored_files'
+    
+    content_hash = db.Column(db.String(64), primary_key=True)
+    file_path = db.Column(db.String(500), nullable=False)
+    file_size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)  # documents sharing this file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class Analysis(db.Model):
     __tablename__ = 'analysis'
     
     id = db.Column(db.Integer, primary_key=True)
     document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), nullable=False, unique=True)
-    extracted_text = db.Column(db.Text, nullable=False)
+    # Legacy column, left empty: the full text lives in document_text_chunks (see text_store.py)
+    extracted_text = db.Column(db.Text, nullable=False, default='')
     summary = db.Column(db.Text, nullable=False)
+    # provisional: extractive summary, replaced by the abstractive one when its job finishes
+    summary_status = db.Column(db.String(20), nullable=False, default='final', server_default='final')
     key_points = db.Column(db.Text)  # JSON string of key points
-    sentiment = db.Column(db.String(20))  # positive, negative, neutral
+    sentiment = db.Column(db.String(20), index=True)  # positive, negative, neutral
     sentiment_score = db.Column(db.Float)  # -1 to 1
     word_count = db.Column(db.Integer)
+    version = db.Column(db.String(32))  # utils.analysis_version() that produced this analysis
     analyzed_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -79,9 +104,123 @@ class Analysis(db.Model):
             'id': self.id,
             'document_id': self.document_id,
             'summary': self.summary,
+            'summary_status': self.summary_status,
             'key_points': self.key_points,
             'sentiment': self.sentiment,
             'sentiment_score': self.sentiment_score,
             'word_count': self.word_count,
+            'version': self.version,
             'analyzed_at': self.analyzed_at.isoformat()
         }
+
+
+class DocumentText(db.Model):
+    __tablename__ = 'document_texts'
+    
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), primary_key=True)
+    char_count = db.Column(db.Integer, nullable=False)  # length of the full text in characters
+    chunk_chars = db.Column(db.Integer, nullable=False)  # characters per compressed chunk
+    stored_size = db.Column(db.Integer, nullable=False)  # compressed bytes across all chunks
+
+
+class TextChunk(db.Model):
+    __tablename__ = 'document_text_chunks'
+    
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), primary_key=True)
+    seq = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed UTF-8
+
+
+class AnalysisJob(db.Model):
+    __tablename__ = 'analysis_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, done, failed
+    # analysis: full analysis of an upload; summary: abstractive summary replacing a provisional one
+    kind = db.Column(db.String(20), nullable=False, default='analysis', server_default='analysis')
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'document_id': self.document_id,
+            'kind': self.kind,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class UploadSession(db.Model):
+    __tablename__ = 'upload_sessions'
+    
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    file_type = db.Column(db.String(10), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)  # declared size in bytes
+    received = db.Column(db.BigInteger, nullable=False, default=0)  # bytes written so far
+    tmp_path = db.Column(db.String(500))
+    status = db.Column(db.String(20), nullable=False, default='active')  # active, complete
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'file_type': self.file_type,
+            'total_size': self.total_size,
+            'received': self.received,
+            'status': self.status,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
+
+class RateLimitBucket(db.Model):
+    __tablename__ = 'rate_limit_buckets'
+    
+    # Upload token bucket per user, shared by every web process (admission.py)
+    user_id = db.Column(db.Integer, primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)  # documents the user may upload as of updated_at
+    updated_at = db.Column(db.Float, nullable=False)  # Unix time the tokens were last refilled
+
+
+class BackfillRun(db.Model):
+    __tablename__ = 'backfill_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    target_version = db.Column(db.String(32), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='running')  # running, paused, cancelled, done, failed
+    cursor = db.Column(db.Integer, nullable=False, default=0)  # last analysis id processed
+    total = db.Column(db.Integer, nullable=False, default=0)  # stale analyses when the run started
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    batch_size = db.Column(db.Integer, nullable=False)
+    owner = db.Column(db.String(100))  # process currently working on the run
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'target_version': self.target_version,
+            'status': self.status,
+            'total': self.total,
+            'processed': self.processed,
+            'failed': self.failed,
+            'batch_size': self.batch_size,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
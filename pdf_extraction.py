@@ -0,0 +1,110 @@
+"""Page-level PDF text extraction.
+
+Pages are produced by a generator and joined through ``io.StringIO``
+instead of repeated string concatenation. Large PDFs can be split into
+page ranges that are extracted in parallel by a process pool; the ranges
+are reassembled in page order. If a pool worker dies, the pool is
+replaced and the remaining pages of that PDF are extracted in the calling
+process. Callers may pass a ``timings`` list to
+collect ``(page_number, seconds)`` for every page.
+"""
+import io
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import PyPDF2
+
+from config import Config
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def count_pages(file_path):
+    """Return the number of pages in a PDF"""
+    with open(file_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def iter_pages(file_path, start=0, stop=None):
+    """Yield (page_number, text, seconds) for pages in [start, stop)"""
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        pages = pdf_reader.pages
+        stop = len(pages) if stop is None else min(stop, len(pages))
+        for page_number in range(start, stop):
+            page_start = time.perf_counter()
+            text = pages[page_number].extract_text() or ''
+            yield page_number, text, time.perf_counter() - page_start
+
+
+def _extract_range(file_path, start, stop):
+    """Extract one page range (runs in a pool worker)"""
+    return list(iter_pages(file_path, start, stop))
+
+
+def _iter_pages_parallel(file_path, page_count, workers):
+    """Yield pages in order while page ranges are extracted across worker processes"""
+    step = Config.PDF_PAGES_PER_TASK
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    executor = _get_pool(workers)
+    futures = []
+    next_page = 0
+    try:
+        futures = [executor.submit(_extract_range, file_path, start, stop) for start, stop in ranges]
+        for future in futures:
+            for page in future.result():
+                yield page
+                next_page = page[0] + 1
+    except BrokenProcessPool:
+        _replace_pool(executor)
+        yield from iter_pages(file_path, next_page)
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _get_pool(workers):
+    """Return the process-wide extraction pool, created on first use and kept warm"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context(Config.ANALYSIS_WORKER_START_METHOD)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _pool
+
+
+def _replace_pool(broken):
+    """Drop a pool that lost a worker; the next _get_pool creates a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is not broken:
+            return
+        _pool = None
+    print("PDF extraction pool broke; starting a new one")
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_pages(file_path, workers=None):
+    """Yield (page_number, text, seconds) for every page, in parallel for large PDFs"""
+    workers = Config.PDF_EXTRACT_WORKERS if workers is None else workers
+    if workers > 1:
+        page_count = count_pages(file_path)
+        if page_count >= Config.PDF_PARALLEL_MIN_PAGES:
+            yield from _iter_pages_parallel(file_path, page_count, workers)
+            return
+    yield from iter_pages(file_path)
+
+
+def extract_text(file_path, timings=None, workers=None):
+    """Extract the text of a PDF, one page per line block"""
+    buffer = io.StringIO()
+    for page_number, text, seconds in extract_pages(file_path, workers=workers):
+        buffer.write(text)
+        buffer.write('\n')
+        if timings is not None:
+            timings.append((page_number + 1, seconds))
+    return buffer.getvalue().strip()
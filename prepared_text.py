@@ -0,0 +1,157 @@
+"""Tokenize once: word and sentence offsets shared by every analysis stage.
+
+``prepare(text)`` wraps an extracted text in a ``PreparedText`` that finds
+its whitespace-separated words and its sentence segments (runs of
+characters other than ``.``, ``!`` and ``?``) with a few vectorized NumPy
+passes. The text is encoded in blocks, so the temporary arrays stay small
+whatever the document size. Only start/end offsets are kept, in int32
+arrays, and slices of the text are cut from them when a stage needs
+strings. Each view is computed on first use and cached on the object, and
+so is the SHA-256 digest used by the result cache.
+
+The offsets match ``str.split()`` and ``re.finditer(r'[^.!?]+', text)``
+exactly, so stages built on them return the same results as before.
+"""
+import hashlib
+
+import numpy as np
+
+# Characters encoded per block while scanning; bounds the temporary arrays (4 bytes per character)
+SCAN_BLOCK_CHARS = 1 << 20
+
+_MAX_SPACE = 0x3000
+_SPACE_TABLE = np.zeros(_MAX_SPACE + 1, dtype=bool)
+_SPACE_TABLE[[code for code in range(_MAX_SPACE + 1) if chr(code).isspace()]] = True
+_TERMINATORS = np.array([ord('.'), ord('!'), ord('?')], dtype=np.uint32)
+
+
+def _is_word_char(codes):
+    return ~((codes <= _MAX_SPACE) & _SPACE_TABLE[np.minimum(codes, _MAX_SPACE)])
+
+
+def _is_segment_char(codes):
+    return ~np.isin(codes, _TERMINATORS)
+
+
+class PreparedText:
+    """An extracted text with lazily computed word and sentence offsets"""
+
+    __slots__ = ('text', '_words', '_segments', '_stripped', '_sentence_words', '_digest')
+
+    def __init__(self, text):
+        self.text = text
+        self._words = None
+        self._segments = None
+        self._stripped = None
+        self._sentence_words = None
+        self._digest = None
+
+    def __len__(self):
+        return len(self.text)
+
+    def _offset_dtype(self):
+        return np.int32 if len(self.text) < 2 ** 31 else np.int64
+
+    def _runs(self, is_member):
+        """(starts, ends) of the maximal runs of characters selected by is_member"""
+        text = self.text
+        dtype = self._offset_dtype()
+        starts, ends = [np.zeros(0, dtype=dtype)], [np.zeros(0, dtype=dtype)]
+        previous = False
+        for offset in range(0, len(text), SCAN_BLOCK_CHARS):
+            codes = np.frombuffer(text[offset:offset + SCAN_BLOCK_CHARS].encode('utf-32-le', 'surrogatepass'),
+                                  dtype=np.uint32)
+            member = is_member(codes).astype(np.int8)
+            edges = np.diff(member, prepend=np.int8(previous))
+            starts.append((np.flatnonzero(edges == 1) + offset).astype(dtype))
+            ends.append((np.flatnonzero(edges == -1) + offset).astype(dtype))
+            previous = bool(member[-1])
+        if previous:
+            ends.append(np.array([len(text)], dtype=dtype))
+        return np.concatenate(starts), np.concatenate(ends)
+
+    @property
+    def words(self):
+        """(starts, ends) of the whitespace-separated words, as str.split() finds them"""
+        if self._words is None:
+            self._words = self._runs(_is_word_char)
+        return self._words
+
+    @property
+    def word_count(self):
+        return len(self.words[0])
+
+    @property
+    def segments(self):
+        """(starts, ends) of the raw sentence segments between '.', '!' and '?' characters"""
+        if self._segments is None:
+            self._segments = self._runs(_is_segment_char)
+        return self._segments
+
+    def sentence_spans(self, min_length=0):
+        """(starts, ends) of the segments stripped of whitespace, keeping those longer than min_length"""
+        if self._stripped is None:
+            seg_starts, seg_ends = self.segments
+            word_starts, word_ends = self.words
+            if not len(word_starts):
+                empty = np.zeros(0, dtype=seg_starts.dtype)
+                self._stripped = (empty, empty)
+            else:
+                # First character of a word at or after the segment start, last one before its end
+                first = np.minimum(np.searchsorted(word_ends, seg_starts, side='right'), len(word_starts) - 1)
+                last = np.maximum(np.searchsorted(word_starts, seg_ends, side='left') - 1, 0)
+                starts = np.maximum(word_starts[first], seg_starts)
+                ends = np.minimum(word_ends[last], seg_ends)
+                keep = starts < ends
+                self._stripped = (starts[keep], ends[keep])
+        starts, ends = self._stripped
+        if min_length:
+            longer = (ends - starts) > min_length
+            return starts[longer], ends[longer]
+        return starts, ends
+
+    def words_in(self, starts, ends):
+        """Number of words overlapping each [start, end) span, like len(text[start:end].split()) for stripped spans"""
+        word_starts, word_ends = self.words
+        return np.searchsorted(word_starts, ends) - np.searchsorted(word_ends, starts, side='right')
+
+    def sentence_words(self):
+        """(starts, ends, sizes): the words of every sentence in order, and the number of words per sentence
+
+        A sentence runs from the start of one segment to the start of the next,
+        so it keeps its terminators. As with re.finditer(r'[^.!?]+[.!?]*') and
+        str.split(), a word running across a sentence end is cut there, and
+        terminators before the first segment belong to no sentence.
+        """
+        if self._sentence_words is None:
+            sentence_starts = self.segments[0]
+            starts, ends = self.words
+            if not len(sentence_starts) or not len(starts):
+                starts, ends = starts[:0], ends[:0]
+            else:
+                index = np.searchsorted(starts, sentence_starts, side='right') - 1
+                clipped = np.maximum(index, 0)
+                cuts = sentence_starts[(index >= 0) & (starts[clipped] < sentence_starts)
+                                       & (ends[clipped] > sentence_starts)]
+                if len(cuts):
+                    starts = np.sort(np.concatenate([starts, cuts]))
+                    ends = np.sort(np.concatenate([ends, cuts]))
+                if len(starts) and starts[0] < sentence_starts[0]:
+                    keep = starts >= sentence_starts[0]
+                    starts, ends = starts[keep], ends[keep]
+            sizes = np.bincount(np.searchsorted(sentence_starts, starts, side='right') - 1,
+                                minlength=len(sentence_starts))
+            self._sentence_words = (starts, ends, sizes)
+        return self._sentence_words
+
+    @property
+    def digest(self):
+        """SHA-256 of the UTF-8 text"""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.text.encode('utf-8', 'surrogatepass')).hexdigest()
+        return self._digest
+
+
+def prepare(text):
+    """Wrap a text in a PreparedText (a PreparedText is returned as is)"""
+    return text if isinstance(text, PreparedText) else PreparedText(text)
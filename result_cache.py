@@ -0,0 +1,219 @@
+"""Cache for per-stage analysis results.
+
+Summaries, key points and sentiment are stored under a key built from the
+stage, a stage version (model, options and algorithm version) and the
+SHA-256 of the text, so identical content is only analyzed once. Lookups
+go through a list of tiers, fastest first; a hit in a slower tier is
+copied into the faster ones.
+
+The default tiers are an in-process LRU bounded by total size and, when
+``RESULT_CACHE_PATH`` is set, a SQLite file shared by every worker
+process. Other backends can be plugged in with ``configure`` as long as
+they provide ``get``, ``set`` and ``stats``. Values are JSON-encoded.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+import metrics
+
+
+class MemoryTier:
+    """In-process LRU bounded by the total size of the encoded values"""
+
+    name = 'memory'
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous)
+            self._entries[key] = value
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes}
+
+
+class SQLiteTier:
+    """SQLite file shared across processes, trimmed to its size limit by least recent use"""
+
+    name = 'disk'
+    EVICT_EVERY = 100  # writes between size checks
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, used_at REAL NOT NULL)'
+        )
+        self._connect().execute('CREATE INDEX IF NOT EXISTS ix_results_used_at ON results (used_at)')
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE results SET used_at = ? WHERE key = ?', (time.time(), key))
+        return row[0]
+
+    def set(self, key, value):
+        conn = self._connect()
+        conn.execute('INSERT OR REPLACE INTO results (key, value, size, used_at) VALUES (?, ?, ?, ?)',
+                     (key, value, len(value), time.time()))
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% of the limit so eviction does not run on every write
+        excess = total - int(self.max_bytes * 0.9)
+        cutoff = conn.execute(
+            'SELECT used_at FROM (SELECT used_at, SUM(size) OVER (ORDER BY used_at) AS running FROM results) '
+            'WHERE running >= ? ORDER BY used_at LIMIT 1', (excess,)
+        ).fetchone()
+        if cutoff is not None:
+            conn.execute('DELETE FROM results WHERE used_at <= ?', (cutoff[0],))
+
+    def stats(self):
+        entries, size = self._connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        return {'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes, 'path': self.path}
+
+
+class ResultCache:
+    """Look values up through the tiers in order, filling faster tiers on a hit"""
+
+    def __init__(self, tiers):
+        self.tiers = list(tiers)
+
+    def get(self, key):
+        """Return (value, outcome); outcome is 'hit_<tier>' or 'miss'"""
+        for index, tier in enumerate(self.tiers):
+            try:
+                encoded = tier.get(key)
+            except Exception as e:
+                print(f"Result cache {tier.name} read failed: {e}")
+                continue
+            if encoded is not None:
+                for faster in self.tiers[:index]:
+                    self._safe_set(faster, key, encoded)
+                return json.loads(encoded), f'hit_{tier.name}'
+        return None, 'miss'
+
+    def set(self, key, value):
+        encoded = json.dumps(value)
+        for tier in self.tiers:
+            self._safe_set(tier, key, encoded)
+
+    @staticmethod
+    def _safe_set(tier, key, encoded):
+        try:
+            tier.set(key, encoded)
+        except Exception as e:
+            print(f"Result cache {tier.name} write failed: {e}")
+
+    def stats(self):
+        """Entry counts and sizes per tier"""
+        tiers = {}
+        for tier in self.tiers:
+            try:
+                tiers[tier.name] = tier.stats()
+            except Exception as e:
+                tiers[tier.name] = {'error': str(e)}
+        return tiers
+
+
+def make_key(stage, version, digest):
+    """Cache key for a stage result on a text, given the SHA-256 hex digest of the text"""
+    return f'{stage}:{version}:{digest}'
+
+
+def _default_tiers():
+    tiers = [MemoryTier(int(Config.RESULT_CACHE_MEMORY_MB * 1024 * 1024))]
+    if Config.RESULT_CACHE_PATH:
+        tiers.append(SQLiteTier(Config.RESULT_CACHE_PATH, int(Config.RESULT_CACHE_DISK_MB * 1024 * 1024)))
+    return tiers
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide cache (None when RESULT_CACHE_ENABLED is off)"""
+    global _cache
+    if not Config.RESULT_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(_default_tiers())
+        return _cache
+
+
+def configure(tiers):
+    """Replace the cache tiers, e.g. with another backend"""
+    global _cache
+    with _cache_lock:
+        _cache = ResultCache(tiers)
+    return _cache
+
+
+def stats():
+    """Tier sizes and per-stage hit rates, or None when caching is disabled
+
+    Lookups are counted from the analysis traces this process records, so
+    they include those made in analysis worker processes; the memory tier
+    figures are this process's own.
+    """
+    cache = get_cache()
+    if cache is None:
+        return None
+    stages = {}
+    for _, labels, count in metrics.result_cache_requests.samples():
+        labels = dict(labels)
+        stages.setdefault(labels['stage'], {})[labels['outcome']] = count
+    for outcomes in stages.values():
+        lookups = sum(outcomes.values())
+        outcomes['hit_rate'] = round(1 - outcomes.get('miss', 0) / lookups, 3) if lookups else None
+    return {'tiers': cache.stats(), 'stages': stages}
@@ -0,0 +1,170 @@
+"""Full-text search over documents.
+
+On SQLite the index is an FTS5 table (``document_search``) keyed by
+document id, holding the filename, summary and full extracted text. It is
+written in the same transaction as the analysis and rows are removed when
+documents are deleted. Every row carries an indexed owner token, so
+per-user queries intersect with the owner's postings inside the index
+instead of filtering matches afterwards.
+
+The FTS5 table stores the text it indexes, so the body is kept a second
+time, uncompressed, next to the compressed chunks of text_store.py. An
+external-content table reading the chunks would avoid that, but FTS5 can
+only remove such a row given the exact text it indexed, which is gone by
+the time an analysis is replaced. With ``SEARCH_FULL_TEXT`` off, bodies
+are not indexed and only filenames and summaries are searched.
+
+Other databases fall back to a LIKE scan over filenames and summaries
+(the full text is only stored compressed, see text_store.py).
+"""
+import re
+
+from sqlalchemy import text
+from sqlalchemy.orm import joinedload
+
+from config import Config
+from models import db, Document, Analysis
+import text_store
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def is_fts_enabled():
+    """Check whether the FTS5 index is used on this database"""
+    return db.engine.dialect.name == 'sqlite'
+
+
+def init_search():
+    """Create the search index and populate it from existing analyses if it is new"""
+    if not is_fts_enabled():
+        return
+
+    exists = db.session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'document_search'"
+    )).first()
+    if exists:
+        return
+
+    db.session.execute(text(
+        "CREATE VIRTUAL TABLE document_search USING fts5("
+        "filename, summary, body, owner, tokenize = 'porter unicode61')"
+    ))
+    for analysis in Analysis.query.options(joinedload(Analysis.document)).yield_per(500):
+        body = text_store.load_text(analysis.document_id) if Config.SEARCH_FULL_TEXT else None
+        index_document(analysis.document, analysis.summary, body)
+    db.session.commit()
+
+
+def _owner_token(user_id):
+    return f'u{user_id}'
+
+
+def index_document(document, summary, body):
+    """Add or replace a document in the index (caller commits); the body only with SEARCH_FULL_TEXT"""
+    if not is_fts_enabled():
+        return
+    remove_document(document.id)
+    if not Config.SEARCH_FULL_TEXT:
+        body = None
+    db.session.execute(
+        text('INSERT INTO document_search (rowid, filename, summary, body, owner) '
+             'VALUES (:id, :filename, :summary, :body, :owner)'),
+        {'id': document.id, 'filename': document.filename, 'summary': summary, 'body': body,
+         'owner': _owner_token(document.user_id)}
+    )
+
+
+def copy_document(source_id, document, analysis):
+    """Index a document with the indexed text of an identical one (caller commits)"""
+    if not is_fts_enabled():
+        return
+    copied = db.session.execute(
+        text('INSERT INTO document_search (rowid, filename, summary, body, owner) '
+             'SELECT :id, :filename, summary, body, :owner FROM document_search WHERE rowid = :source'),
+        {'id': document.id, 'filename': document.filename, 'owner': _owner_token(document.user_id),
+         'source': source_id}
+    ).rowcount
+    if not copied:
+        body = text_store.load_text(source_id) if Config.SEARCH_FULL_TEXT else None
+        index_document(document, analysis.summary, body)
+
+
+def update_summary(document, summary):
+    """Replace the indexed summary of a document, keeping its indexed body (caller commits)"""
+    if not is_fts_enabled():
+        return
+    updated = db.session.execute(
+        text('UPDATE document_search SET summary = :summary WHERE rowid = :id'),
+        {'id': document.id, 'summary': summary}
+    ).rowcount
+    if not updated:
+        body = text_store.load_text(document.id) if Config.SEARCH_FULL_TEXT else None
+        index_document(document, summary, body)
+
+
+def remove_document(document_id):
+    """Remove a document from the index (caller commits)"""
+    if not is_fts_enabled():
+        return
+    db.session.execute(text('DELETE FROM document_search WHERE rowid = :id'), {'id': document_id})
+
+
+def build_match_query(query):
+    """Turn free text into a safe FTS5 query: all terms required, the last one as a prefix"""
+    terms = _TERM.findall(query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return '{filename summary body} : (' + ' '.join(quoted) + ')'
+
+
+def search(query, user_id=None, limit=20, offset=0):
+    """Return [(document, score, snippet)] ranked best first; user_id=None searches all users"""
+    if is_fts_enabled():
+        hits = _search_fts(query, user_id, limit, offset)
+    else:
+        hits = _search_like(query, user_id, limit, offset)
+    if not hits:
+        return []
+
+    documents = {
+        doc.id: doc for doc in
+        Document.query.options(joinedload(Document.analysis)).filter(Document.id.in_([h[0] for h in hits]))
+    }
+    return [(documents[doc_id], score, snippet) for doc_id, score, snippet in hits if doc_id in documents]
+
+
+def _search_fts(query, user_id, limit, offset):
+    match = build_match_query(query)
+    if match is None:
+        return []
+    if user_id is not None:
+        # Column filter on the owner token keeps the scan inside the user's postings
+        match = f'owner:"{_owner_token(user_id)}" AND ({match})'
+
+    # Snippets come from the body, or from the summary when bodies are not indexed
+    rows = db.session.execute(
+        text("SELECT rowid, bm25(document_search, 10.0, 5.0, 1.0, 0.0) AS rank, "
+             "snippet(document_search, :column, '<mark>', '</mark>', '...', 16) "
+             "FROM document_search WHERE document_search MATCH :match "
+             "ORDER BY rank LIMIT :limit OFFSET :offset"),
+        {'column': 2 if Config.SEARCH_FULL_TEXT else 1, 'match': match, 'limit': limit, 'offset': offset}
+    )
+    # bm25() is lower-is-better; report a positive relevance score
+    return [(row[0], round(-row[1], 4), row[2]) for row in rows]
+
+
+def _search_like(query, user_id, limit, offset):
+    terms = _TERM.findall(query)
+    if not terms:
+        return []
+
+    q = Document.query.join(Analysis)
+    if user_id is not None:
+        q = q.filter(Document.user_id == user_id)
+    for term in terms:
+        pattern = f'%{term}%'
+        q = q.filter(db.or_(Document.filename.ilike(pattern), Analysis.summary.ilike(pattern)))
+    documents = q.order_by(Document.uploaded_at.desc()).limit(limit).offset(offset).all()
+    return [(doc.id, None, doc.analysis.summary[:200]) for doc in documents]
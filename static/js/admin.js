@@ -47,10 +47,10 @@ loadStats();
 loadUsers();
 loadDocuments();
 
-// Load statistics
-async function loadStats() {
+// Load statistics (fresh skips the server's cached snapshot, e.g. right after a delete)
+async function loadStats(fresh = false) {
     try {
-        const response = await fetchWithAuth(`${API_URL}/api/admin/stats`);
+        const response = await fetchWithAuth(`${API_URL}/api/admin/stats${fresh ? '?fresh=1' : ''}`);
         const data = await response.json();
         
         if (response.ok) {
@@ -133,14 +133,21 @@ function displayUsers(users) {
     `).join('');
 }
 
-// Load documents
-async function loadDocuments() {
+// Documents loaded so far and the cursor for the next page
+let loadedDocuments = [];
+let documentsCursor = null;
+
+// Load documents (first page, or the next page when loading more)
+async function loadDocuments(loadMore = false) {
     try {
-        const response = await fetchWithAuth(`${API_URL}/api/admin/documents`);
+        const query = loadMore && documentsCursor ? `?cursor=${encodeURIComponent(documentsCursor)}` : '';
+        const response = await fetchWithAuth(`${API_URL}/api/admin/documents${query}`);
         const data = await response.json();
         
         if (response.ok) {
-            displayDocuments(data.documents);
+            loadedDocuments = loadMore ? loadedDocuments.concat(data.documents) : data.documents;
+            documentsCursor = data.next_cursor;
+            displayDocuments(loadedDocuments);
         }
     } catch (error) {
         console.error('Error loading documents:', error);
@@ -189,6 +196,18 @@ function displayDocuments(documents) {
             </tr>
         `;
     }).join('');
+    
+    if (documentsCursor) {
+        tbody.innerHTML += `
+            <tr>
+                <td colspan="8" class="text-center">
+                    <button class="btn btn-outline-primary btn-sm" onclick="loadDocuments(true)">
+                        <i class="fas fa-chevron-down me-1"></i>Load more
+                    </button>
+                </td>
+            </tr>
+        `;
+    }
 }
 
 // Delete user
@@ -219,7 +238,7 @@ async function deleteUser(userId) {
                 }).then(() => {
                     loadUsers();
                     loadDocuments();
-                    loadStats();
+                    loadStats(true);
                 });
             } else {
                 const data = await response.json();
@@ -266,7 +285,7 @@ async function deleteDocument(docId) {
                     showConfirmButton: false
                 }).then(() => {
                     loadDocuments();
-                    loadStats();
+                    loadStats(true);
                 });
             } else {
                 const data = await response.json();
@@ -1,6 +1,12 @@
 // API Configuration
 const API_URL = 'http://localhost:5000';
 
+// Files above the threshold are uploaded in resumable chunks
+const CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024;
+const MAX_UPLOAD_SIZE = 512 * 1024 * 1024;
+// Largest batch request (BATCH_MAX_REQUEST_SIZE)
+const MAX_BATCH_UPLOAD_SIZE = 512 * 1024 * 1024;
+
 // Helper function to get auth token
 function getAuthToken() {
     return localStorage.getItem('token');
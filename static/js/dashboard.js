@@ -78,18 +78,96 @@ uploadZone.addEventListener('drop', (e) => {
     e.preventDefault();
     uploadZone.classList.remove('dragover');
     
-    const files = e.dataTransfer.files;
-    if (files.length > 0) {
-        handleFileUpload(files[0]);
-    }
+    handleFiles(e.dataTransfer.files);
 });
 
 fileInput.addEventListener('change', (e) => {
-    if (e.target.files.length > 0) {
-        handleFileUpload(e.target.files[0]);
-    }
+    handleFiles(e.target.files);
 });
 
+// Several files or a zip archive go through the batch endpoint
+function handleFiles(files) {
+    if (files.length === 0) {
+        return;
+    }
+    if (files.length === 1 && !files[0].name.toLowerCase().endsWith('.zip')) {
+        handleFileUpload(files[0]);
+    } else {
+        handleBatchUpload(Array.from(files));
+    }
+}
+
+// Upload several documents (or zip archives) in one request
+async function handleBatchUpload(files) {
+    // The files are sent in a single request
+    const totalSize = files.reduce((total, file) => total + file.size, 0);
+    if (totalSize > MAX_BATCH_UPLOAD_SIZE) {
+        Swal.fire({
+            icon: 'error',
+            title: 'Upload Too Large',
+            text: `Files uploaded together should not exceed ${formatFileSize(MAX_BATCH_UPLOAD_SIZE)} in total`
+        });
+        return;
+    }
+    
+    const formData = new FormData();
+    files.forEach(file => formData.append('files', file));
+    
+    Swal.fire({
+        title: `Uploading ${files.length} files...`,
+        html: '<p>Documents are analyzed in the background</p>',
+        allowOutsideClick: false,
+        showConfirmButton: false,
+        didOpen: () => {
+            Swal.showLoading();
+        }
+    });
+    
+    try {
+        const response = await fetchWithAuth(`${API_URL}/api/documents/batch`, {
+            method: 'POST',
+            body: formData
+        });
+        const data = await response.json();
+        
+        if (!response.ok) {
+            Swal.fire({
+                icon: 'error',
+                title: 'Upload Failed',
+                text: data.error || 'Could not upload documents',
+                confirmButtonColor: '#667eea'
+            });
+            return;
+        }
+        
+        const jobs = data.results.filter(result => result.job).map(result => result.job.id);
+        const finished = await Promise.all(jobs.map(jobId => waitForJob(jobId)));
+        const failed = finished.filter(result => result.job.status === 'failed').length;
+        const rejected = data.results.filter(result => result.status === 'rejected');
+        
+        Swal.fire({
+            icon: failed || rejected.length ? 'warning' : 'success',
+            title: 'Batch Upload Complete',
+            text: `${data.results.length - rejected.length - failed} of ${data.results.length} files analyzed.` +
+                (rejected.length ? ` Rejected: ${rejected.map(result => result.filename).join(', ')}` : ''),
+            confirmButtonColor: '#667eea'
+        }).then(() => {
+            loadDocuments();
+            loadStats();
+            fileInput.value = '';
+            document.querySelector('[data-section="documents"]').click();
+        });
+    } catch (error) {
+        console.error('Batch upload error:', error);
+        Swal.fire({
+            icon: 'error',
+            title: 'Error',
+            text: 'An error occurred during upload. Please try again.',
+            confirmButtonColor: '#667eea'
+        });
+    }
+}
+
 // Handle file upload
 async function handleFileUpload(file) {
     // Validate file type
@@ -105,20 +183,16 @@ async function handleFileUpload(file) {
         return;
     }
     
-    // Validate file size (16MB)
-    if (file.size > 16 * 1024 * 1024) {
+    // Validate file size (512MB)
+    if (file.size > MAX_UPLOAD_SIZE) {
         Swal.fire({
             icon: 'error',
             title: 'File Too Large',
-            text: 'File size should not exceed 16MB'
+            text: 'File size should not exceed 512MB'
         });
         return;
     }
     
-    // Create form data
-    const formData = new FormData();
-    formData.append('file', file);
-    
     // Show loading with progress
     Swal.fire({
         title: 'Uploading & Analyzing Document...',
@@ -140,14 +214,27 @@ async function handleFileUpload(file) {
     });
     
     try {
-        const response = await fetchWithAuth(`${API_URL}/api/documents/upload`, {
-            method: 'POST',
-            body: formData
-        });
+        // Large files are sent in resumable chunks; small ones in a single request
+        let response;
+        if (file.size > CHUNKED_UPLOAD_THRESHOLD) {
+            response = await uploadInChunks(file);
+        } else {
+            const formData = new FormData();
+            formData.append('file', file);
+            response = await fetchWithAuth(`${API_URL}/api/documents/upload`, {
+                method: 'POST',
+                body: formData
+            });
+        }
         
-        const data = await response.json();
+        let data = await response.json();
         
-        if (response.ok) {
+        // Analysis runs in the background; wait for the queued job to finish
+        if (response.status === 202 && data.job) {
+            data = await waitForJob(data.job.id);
+        }
+        
+        if (response.ok && (!data.job || data.job.status === 'done')) {
             Swal.fire({
                 icon: 'success',
                 title: 'Success!',
@@ -167,7 +254,7 @@ async function handleFileUpload(file) {
             Swal.fire({
                 icon: 'error',
                 title: 'Upload Failed',
-                text: data.error || 'Could not upload document',
+                text: data.error || (data.job && data.job.error) || 'Could not upload document',
                 confirmButtonColor: '#667eea'
             });
         }
@@ -182,20 +269,159 @@ async function handleFileUpload(file) {
     }
 }
 
-// Load documents
-async function loadDocuments() {
+// Upload a file in chunks, resuming from the server's offset after a failed chunk
+async function uploadInChunks(file, maxRetries = 5) {
+    const initResponse = await fetchWithAuth(`${API_URL}/api/uploads`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename: file.name, size: file.size })
+    });
+    
+    if (!initResponse.ok) {
+        return initResponse;
+    }
+    
+    const { upload, chunk_size: chunkSize } = await initResponse.json();
+    let offset = 0;
+    let retries = 0;
+    
+    while (offset < file.size) {
+        try {
+            const response = await fetchWithAuth(`${API_URL}/api/uploads/${upload.id}?offset=${offset}`, {
+                method: 'PUT',
+                headers: { 'Content-Type': 'application/octet-stream' },
+                body: file.slice(offset, offset + chunkSize)
+            });
+            const data = await response.json();
+            
+            if (response.ok || response.status === 409) {
+                offset = data.upload.received;
+                retries = 0;
+                continue;
+            }
+            if (response.status < 500) {
+                return new Response(JSON.stringify(data), { status: response.status });
+            }
+        } catch (error) {
+            console.error('Chunk upload error:', error);
+        }
+        
+        if (++retries > maxRetries) {
+            throw new Error('Upload failed after several retries');
+        }
+        await new Promise(resolve => setTimeout(resolve, 1000 * retries));
+        
+        // Ask the server how much it has and continue from there
+        const statusResponse = await fetchWithAuth(`${API_URL}/api/uploads/${upload.id}`);
+        if (statusResponse.ok) {
+            offset = (await statusResponse.json()).upload.received;
+        }
+    }
+    
+    return fetchWithAuth(`${API_URL}/api/uploads/${upload.id}/complete`, { method: 'POST' });
+}
+
+// Poll an analysis job until it is done or failed, giving up after maxWaitMs
+async function waitForJob(jobId, intervalMs = 1500, maxWaitMs = 10 * 60 * 1000) {
+    const deadline = Date.now() + maxWaitMs;
+    while (true) {
+        if (Date.now() >= deadline) {
+            return { job: { status: 'failed', error: 'Analysis is taking longer than expected, check your documents later' } };
+        }
+
+        const response = await fetchWithAuth(`${API_URL}/api/jobs/${jobId}`);
+        const data = await response.json();
+        
+        if (!response.ok) {
+            return { job: { status: 'failed', error: data.error } };
+        }
+        
+        if (['done', 'failed'].includes(data.job.status)) {
+            return data;
+        }
+        
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+}
+
+// Documents loaded so far and the cursor for the next page
+let loadedDocuments = [];
+let documentsCursor = null;
+
+// Re-fetch documents with a draft summary until their final summary is stored,
+// at most maxAttempts times after each load of the document list
+let summaryRefreshTimer = null;
+let summaryRefreshAttempts = 0;
+function scheduleSummaryRefresh(intervalMs = 5000, maxAttempts = 60) {
+    clearTimeout(summaryRefreshTimer);
+    const drafts = loadedDocuments.filter(doc => doc.analysis && doc.analysis.summary_status === 'provisional');
+    if (drafts.length === 0 || summaryRefreshAttempts >= maxAttempts) {
+        return;
+    }
+    
+    summaryRefreshTimer = setTimeout(async () => {
+        summaryRefreshAttempts++;
+        for (const draft of drafts) {
+            const response = await fetchWithAuth(`${API_URL}/api/documents/${draft.id}`);
+            if (response.ok || response.status === 404) {
+                const data = await response.json();
+                const index = loadedDocuments.findIndex(doc => doc.id === draft.id);
+                if (index >= 0 && response.ok) {
+                    loadedDocuments[index] = data.document;
+                } else if (index >= 0) {
+                    // Deleted in the meantime
+                    loadedDocuments.splice(index, 1);
+                }
+            }
+        }
+        // Leave search results on screen alone
+        if (!document.getElementById('searchDocuments').value.trim()) {
+            displayDocuments(loadedDocuments);
+        }
+        scheduleSummaryRefresh(intervalMs, maxAttempts);
+    }, intervalMs);
+}
+
+// Load documents (first page, or the next page when loading more)
+async function loadDocuments(loadMore = false) {
     try {
-        const response = await fetchWithAuth(`${API_URL}/api/documents`);
+        const query = loadMore && documentsCursor ? `?cursor=${encodeURIComponent(documentsCursor)}` : '';
+        const response = await fetchWithAuth(`${API_URL}/api/documents${query}`);
         const data = await response.json();
         
         if (response.ok) {
-            displayDocuments(data.documents);
+            loadedDocuments = loadMore ? loadedDocuments.concat(data.documents) : data.documents;
+            documentsCursor = data.next_cursor;
+            displayDocuments(loadedDocuments);
+            summaryRefreshAttempts = 0;
+            scheduleSummaryRefresh();
         }
     } catch (error) {
         console.error('Error loading documents:', error);
     }
 }
 
+// Fetch every page of the current user's documents
+async function fetchAllDocuments() {
+    let documents = [];
+    let cursor = null;
+    
+    do {
+        const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+        const response = await fetchWithAuth(`${API_URL}/api/documents${query}`);
+        const data = await response.json();
+        
+        if (!response.ok) {
+            throw new Error(data.error || 'Could not load documents');
+        }
+        
+        documents = documents.concat(data.documents);
+        cursor = data.next_cursor;
+    } while (cursor);
+    
+    return documents;
+}
+
 // Display documents
 function displayDocuments(documents) {
     const container = document.getElementById('documentsContainer');
@@ -219,6 +445,16 @@ function displayDocuments(documents) {
     
     container.innerHTML = documents.map(doc => createDocumentCard(doc)).join('');
     
+    if (documentsCursor) {
+        container.innerHTML += `
+            <div class="text-center my-3">
+                <button class="btn btn-outline-primary" onclick="loadDocuments(true)">
+                    <i class="fas fa-chevron-down me-2"></i>Load more
+                </button>
+            </div>
+        `;
+    }
+    
     // Update recent activity with latest 5 documents
     updateRecentActivity(documents.slice(0, 5));
 }
@@ -305,7 +541,9 @@ function createDocumentCard(doc) {
             <div class="card-body">
                 <div class="row">
                     <div class="col-md-12 mb-3">
-                        <h6><i class="fas fa-align-left me-2"></i>Summary</h6>
+                        <h6><i class="fas fa-align-left me-2"></i>Summary
+                            ${analysis.summary_status === 'provisional' ? '<span class="badge bg-secondary ms-2">Draft, refining…</span>' : ''}
+                        </h6>
                         <p>${analysis.summary}</p>
                     </div>
                     
@@ -384,27 +622,23 @@ async function deleteDocument(docId) {
 // Load stats
 async function loadStats() {
     try {
-        const response = await fetchWithAuth(`${API_URL}/api/documents`);
-        const data = await response.json();
+        const documents = await fetchAllDocuments();
         
-        if (response.ok) {
-            const documents = data.documents;
-            const total = documents.length;
-            let positive = 0, negative = 0, neutral = 0;
-            
-            documents.forEach(doc => {
-                if (doc.analysis) {
-                    if (doc.analysis.sentiment === 'positive') positive++;
-                    else if (doc.analysis.sentiment === 'negative') negative++;
-                    else neutral++;
-                }
-            });
-            
-            document.getElementById('totalDocs').textContent = total;
-            document.getElementById('positiveDocs').textContent = positive;
-            document.getElementById('neutralDocs').textContent = neutral;
-            document.getElementById('negativeDocs').textContent = negative;
-        }
+        const total = documents.length;
+        let positive = 0, negative = 0, neutral = 0;
+        
+        documents.forEach(doc => {
+            if (doc.analysis) {
+                if (doc.analysis.sentiment === 'positive') positive++;
+                else if (doc.analysis.sentiment === 'negative') negative++;
+                else neutral++;
+            }
+        });
+        
+        document.getElementById('totalDocs').textContent = total;
+        document.getElementById('positiveDocs').textContent = positive;
+        document.getElementById('neutralDocs').textContent = neutral;
+        document.getElementById('negativeDocs').textContent = negative;
     } catch (error) {
         console.error('Error loading stats:', error);
     }
@@ -414,22 +648,31 @@ async function loadStats() {
 loadDocuments();
 loadStats();
 
-// Search documents
+// Search documents (server-side full-text search)
 const searchInput = document.getElementById('searchDocuments');
+let searchTimer = null;
 if (searchInput) {
     searchInput.addEventListener('input', (e) => {
-        const searchTerm = e.target.value.toLowerCase();
-        const documentCards = document.querySelectorAll('.document-card');
+        clearTimeout(searchTimer);
+        const searchTerm = e.target.value.trim();
         
-        documentCards.forEach(card => {
-            const filename = card.querySelector('.document-header h4')?.textContent.toLowerCase() || '';
-            const summary = card.querySelector('.card-body p')?.textContent.toLowerCase() || '';
+        searchTimer = setTimeout(async () => {
+            if (!searchTerm) {
+                loadDocuments();
+                return;
+            }
             
-            if (filename.includes(searchTerm) || summary.includes(searchTerm)) {
-                card.style.display = 'block';
-            } else {
-                card.style.display = 'none';
+            try {
+                const response = await fetchWithAuth(`${API_URL}/api/documents/search?q=${encodeURIComponent(searchTerm)}`);
+                const data = await response.json();
+                
+                if (response.ok) {
+                    documentsCursor = null;
+                    displayDocuments(data.results.map(result => result.document));
+                }
+            } catch (error) {
+                console.error('Error searching documents:', error);
             }
-        });
+        }, 300);
     });
 }
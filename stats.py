@@ -0,0 +1,56 @@
+"""Admin statistics computed in one aggregate query and cached for a short TTL.
+
+Writes do not clear the snapshot, so under a steady stream of uploads the
+aggregate still runs at most once per STATS_CACHE_TTL; changes show up
+once it expires, or at once with ``get_stats(fresh=True)``.
+"""
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import case, func, select
+
+from config import Config
+from models import db, User, Document, Analysis
+
+_snapshot = None
+_expires_at = 0.0
+_lock = threading.Lock()
+
+
+def compute_stats():
+    """Compute the full stats payload with a single SELECT"""
+    def sentiment_count(label):
+        return func.coalesce(func.sum(case((Analysis.sentiment == label, 1), else_=0)), 0)
+
+    query = select(
+        select(func.count(User.id)).scalar_subquery(),
+        select(func.count(Document.id)).scalar_subquery(),
+        func.count(Analysis.id),
+        sentiment_count('positive'),
+        sentiment_count('negative'),
+        sentiment_count('neutral')
+    ).select_from(Analysis)
+    total_users, total_documents, total_analyses, positive, negative, neutral = db.session.execute(query).one()
+
+    return {
+        'total_users': total_users,
+        'total_documents': total_documents,
+        'total_analyses': total_analyses,
+        'sentiment_breakdown': {
+            'positive': positive,
+            'negative': negative,
+            'neutral': neutral
+        },
+        'generated_at': datetime.utcnow().isoformat()
+    }
+
+
+def get_stats(fresh=False):
+    """Return the cached stats snapshot, recomputing it if expired or fresh is requested"""
+    global _snapshot, _expires_at
+    with _lock:
+        if fresh or _snapshot is None or time.monotonic() >= _expires_at:
+            _snapshot = compute_stats()
+            _expires_at = time.monotonic() + Config.STATS_CACHE_TTL
+        return _snapshot
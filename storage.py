@@ -0,0 +1,155 @@
+"""Content-addressed upload storage.
+
+Uploads are hashed (SHA-256) while they are streamed to disk. Identical
+bytes are kept once under ``UPLOAD_FOLDER/<hash[:2]>/<hash>.<ext>`` and
+shared between documents through a reference count in ``stored_files``.
+"""
+import contextlib
+import hashlib
+import os
+import uuid
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, StoredFile, Document, Analysis
+import text_store
+
+CHUNK_SIZE = 64 * 1024
+
+
+def save_upload(stream, upload_folder, file_type):
+    """Stream an upload to disk, hashing it on the way; returns (content_hash, file_path, file_size)"""
+    tmp_path, content_hash, file_size = write_upload(stream, upload_folder)
+    file_path = store_file(tmp_path, upload_folder, content_hash, file_type, file_size)
+    return content_hash, file_path, file_size
+
+
+def write_upload(stream, upload_folder):
+    """Stream an upload to a temporary file, hashing it on the way; returns (tmp_path, content_hash, file_size)
+
+    Nothing is written to the database, so callers can write every file of a
+    batch before opening the transaction that stores them.
+    """
+    tmp_path = os.path.join(upload_folder, f'.upload-{uuid.uuid4().hex}')
+    digest = hashlib.sha256()
+    file_size = 0
+
+    try:
+        with open(tmp_path, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                file_size += len(chunk)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+    return tmp_path, digest.hexdigest(), file_size
+
+
+def store_file(tmp_path, upload_folder, content_hash, file_type, file_size):
+    """Move a fully written file into the content store and take a reference to it"""
+    stored = acquire(content_hash)
+    if stored is not None:
+        # Same bytes already on disk
+        os.remove(tmp_path)
+        return stored.file_path
+
+    file_path = stored_path(upload_folder, content_hash, file_type)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    os.replace(tmp_path, file_path)
+
+    try:
+        # A savepoint, so that a conflict only undoes this insert and not the caller's earlier rows
+        with db.session.begin_nested():
+            db.session.add(StoredFile(content_hash=content_hash, file_path=file_path, file_size=file_size,
+                                      ref_count=1))
+    except IntegrityError:
+        # A concurrent upload stored the same content first
+        stored = acquire(content_hash)
+        if stored is None:
+            raise
+        return stored.file_path
+    return file_path
+
+
+def stored_path(upload_folder, content_hash, file_type):
+    """Where content with this hash is kept"""
+    return os.path.join(upload_folder, content_hash[:2], f'{content_hash}.{file_type}')
+
+
+def discard(tmp_path, upload_folder, content_hash, file_type, moved):
+    """Clean up after write_upload (and store_file when `moved`) once their transaction was rolled back
+
+    The rollback already undid the reference counts; what is left is the
+    temporary file, or a file moved into the store whose row was not kept.
+    """
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(tmp_path)
+    if moved and db.session.get(StoredFile, content_hash) is None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(stored_path(upload_folder, content_hash, file_type))
+
+
+def acquire(content_hash):
+    """Take a reference on stored content; returns the StoredFile or None if it is not stored"""
+    updated = StoredFile.query.filter_by(content_hash=content_hash).update(
+        {'ref_count': StoredFile.ref_count + 1}
+    )
+    if not updated:
+        return None
+    stored = db.session.get(StoredFile, content_hash)
+    if not os.path.exists(stored.file_path):
+        # File went missing; drop the stale entry and store the upload again
+        db.session.delete(stored)
+        db.session.flush()
+        return None
+    return stored
+
+
+def release(document):
+    """Drop a document's reference to its file, deleting the file once nothing uses it"""
+    if not document.content_hash:
+        # Documents uploaded before deduplication own their file outright
+        if os.path.exists(document.file_path):
+            os.remove(document.file_path)
+        return
+
+    StoredFile.query.filter_by(content_hash=document.content_hash).update(
+        {'ref_count': StoredFile.ref_count - 1}
+    )
+    stored = db.session.get(StoredFile, document.content_hash)
+    if stored is not None and stored.ref_count <= 0:
+        if os.path.exists(stored.file_path):
+            os.remove(stored.file_path)
+        db.session.delete(stored)
+
+
+def find_analysis(content_hash, file_type):
+    """Find a completed analysis of identical content, if any"""
+    return (
+        Analysis.query.join(Document)
+        .filter(Document.content_hash == content_hash, Document.file_type == file_type)
+        .order_by(Analysis.analyzed_at.desc())
+        .first()
+    )
+
+
+def copy_analysis(source, document_id):
+    """Create an analysis for a document from an existing one"""
+    analysis = Analysis(
+        document_id=document_id,
+        summary=source.summary,
+        summary_status=source.summary_status,
+        key_points=source.key_points,
+        sentiment=source.sentiment,
+        sentiment_score=source.sentiment_score,
+        word_count=source.word_count,
+        version=source.version
+    )
+    db.session.add(analysis)
+    text_store.copy_text(source.document_id, document_id)
+    return analysis
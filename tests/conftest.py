@@ -0,0 +1,59 @@
+"""Shared fixtures: the app on a temporary SQLite database, analyzing inline without models"""
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+_tmp = tempfile.mkdtemp(prefix='smartdoc-tests-')
+os.environ.update(
+    DATABASE_URI='sqlite:///' + os.path.join(_tmp, 'smartdoc.db'),
+    UPLOAD_FOLDER=os.path.join(_tmp, 'uploads'),
+    ANALYSIS_WORKERS='0',
+    ANALYSIS_RATE_PER_MINUTE='0',
+    ANALYSIS_MAX_QUEUE_DEPTH='0',
+    RESULT_CACHE_ENABLED='false',
+    RESULT_CACHE_PATH='',
+    MODEL_SERVER_ADDRESS='',
+    MODEL_PRELOAD='false',
+    MODEL_WARMUP='false',
+    SPACY_ENABLED='false',
+    SUMMARIZER_ENABLED='false',
+    SENTIMENT_ENABLED='false',
+    BCRYPT_ROUNDS='4',
+    BACKFILL_DELAY_SECONDS='0',
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_emails = itertools.count()
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def db_session(app):
+    """The database session inside an app context"""
+    from models import db
+    with app.app_context():
+        yield db.session
+        db.session.remove()
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Register a new user and return their Authorization header"""
+    response = client.post('/api/auth/register', json={
+        'email': f'user{next(_emails)}@example.com', 'password': 'password', 'full_name': 'Test User'
+    })
+    assert response.status_code == 201, response.get_json()
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
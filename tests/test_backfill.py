@@ -0,0 +1,131 @@
+import io
+import threading
+import time
+
+import pytest
+
+import backfill
+from models import db, Analysis, BackfillRun
+
+
+@pytest.fixture
+def stale(client, auth_headers, db_session):
+    """Upload a few documents and mark every analysis as made by an older version"""
+    for index in range(5):
+        client.post('/api/documents/upload', headers=auth_headers, content_type='multipart/form-data', data={
+            'file': (io.BytesIO(f'Backfill document {index} with great results.'.encode()), f'bf{index}.txt')
+        })
+    Analysis.query.update({'version': 'old'}, synchronize_session=False)
+    db_session.commit()
+    yield
+    # Leave no run in progress for the next test
+    for run in BackfillRun.query.filter(BackfillRun.status.in_(['running', 'paused'])):
+        backfill.set_status(run, 'cancel')
+    _wait_for_worker()
+
+
+@pytest.fixture
+def held_batch(monkeypatch):
+    """Hold the first batch in analysis until released; yields (started, release) events"""
+    started, release = threading.Event(), threading.Event()
+    run_groups = backfill._run_groups
+
+    def held(items):
+        if not started.is_set():
+            started.set()
+            release.wait(10)
+        return run_groups(items)
+
+    monkeypatch.setattr(backfill, '_run_groups', held)
+    yield started, release
+    release.set()
+
+
+def _wait(run_id, statuses, timeout=20):
+    deadline = time.monotonic() + timeout
+    while True:
+        db.session.rollback()  # end the read transaction so other threads' commits are visible
+        run = db.session.get(BackfillRun, run_id)
+        if run.status in statuses or time.monotonic() > deadline:
+            return run
+        time.sleep(0.05)
+
+
+def _wait_for_worker(timeout=20):
+    deadline = time.monotonic() + timeout
+    while backfill._thread is not None and backfill._thread.is_alive() and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def test_run_reanalyzes_every_stale_analysis(stale, db_session):
+    run = backfill.start(batch_size=2)
+    run = _wait(run.id, {'done', 'failed'})
+    assert run.status == 'done'
+    assert run.processed == run.total > 0
+    assert backfill.stale_query(run.target_version).count() == 0
+
+
+def test_only_one_run_at_a_time(stale, db_session, held_batch):
+    backfill.start(batch_size=2)
+    with pytest.raises(backfill.BackfillError):
+        backfill.start()
+
+
+def test_invalid_transitions_are_refused(stale, db_session, held_batch):
+    run = backfill.start(batch_size=2)
+    with pytest.raises(backfill.BackfillError):
+        backfill.set_status(run, 'resume')
+
+    backfill.set_status(run, 'cancel')
+    for action in ('pause', 'resume', 'cancel'):
+        with pytest.raises(backfill.BackfillError):
+            backfill.set_status(run, action)
+
+
+def test_pause_keeps_the_cursor_and_resume_finishes(stale, db_session, held_batch):
+    started, release = held_batch
+    run = backfill.start(batch_size=2)
+    assert started.wait(10)
+
+    backfill.set_status(run, 'pause')
+    release.set()
+    _wait_for_worker()
+    run = _wait(run.id, {'paused'})
+    # The batch in flight when the run was paused is redone on resume
+    assert (run.status, run.processed, run.cursor) == ('paused', 0, 0)
+
+    backfill.set_status(run, 'resume')
+    run = _wait(run.id, {'done', 'failed'})
+    assert run.status == 'done'
+    assert run.processed == run.total
+
+
+def test_resume_while_a_batch_is_running_does_not_stall(stale, db_session, held_batch):
+    started, release = held_batch
+    run = backfill.start(batch_size=2)
+    assert started.wait(10)
+
+    # Pause and resume before the held batch finishes: the worker thread is still alive
+    backfill.set_status(run, 'pause')
+    backfill.set_status(run, 'resume')
+    release.set()
+
+    run = _wait(run.id, {'done', 'failed'})
+    assert run.status == 'done'
+    assert run.processed == run.total
+    _wait_for_worker()
+    assert backfill._thread is None
+
+
+def test_cancel_discards_the_batch_in_flight(stale, db_session, held_batch):
+    started, release = held_batch
+    run = backfill.start(batch_size=2)
+    assert started.wait(10)
+
+    backfill.set_status(run, 'cancel')
+    release.set()
+    _wait_for_worker()
+    run = _wait(run.id, {'cancelled'})
+    assert (run.status, run.processed, run.cursor) == ('cancelled', 0, 0)
+    assert run.finished_at is not None
+    assert backfill.stale_query(run.target_version).count() == run.total
@@ -0,0 +1,93 @@
+import hashlib
+import os
+
+import pytest
+
+CONTENT = b'Chunked uploads resume from the last offset the server received. ' * 40
+
+
+@pytest.fixture
+def upload(client, auth_headers):
+    response = client.post('/api/uploads', headers=auth_headers, json={'filename': 'big.txt', 'size': len(CONTENT)})
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['upload']
+
+
+def _put(client, headers, upload_id, offset, data, **extra_headers):
+    return client.put(f'/api/uploads/{upload_id}', headers={**headers, **extra_headers},
+                      query_string={'offset': offset}, data=data)
+
+
+def test_chunks_assemble_into_the_document(client, auth_headers, upload):
+    for offset in range(0, len(CONTENT), 1000):
+        chunk = CONTENT[offset:offset + 1000]
+        response = _put(client, auth_headers, upload['id'], offset, chunk,
+                        **{'X-Chunk-SHA256': hashlib.sha256(chunk).hexdigest()})
+        assert response.status_code == 200
+        assert response.get_json()['upload']['received'] == offset + len(chunk)
+
+    response = client.post(f"/api/uploads/{upload['id']}/complete", headers=auth_headers,
+                           json={'sha256': hashlib.sha256(CONTENT).hexdigest()})
+    assert response.status_code in (201, 202), response.get_json()
+    document = response.get_json()['document']
+    assert document['file_size'] == len(CONTENT)
+
+    text = client.get(f"/api/documents/{document['id']}/text", headers=auth_headers).get_json()
+    assert text['text'] == CONTENT.decode().strip()
+
+
+def test_out_of_order_chunk_gets_409_with_the_resume_offset(client, auth_headers, upload):
+    assert _put(client, auth_headers, upload['id'], 0, CONTENT[:500]).status_code == 200
+
+    for offset in (0, 100, 900):
+        response = _put(client, auth_headers, upload['id'], offset, CONTENT[offset:offset + 100])
+        assert response.status_code == 409
+        assert response.get_json()['upload']['received'] == 500
+
+    # Resuming from `received` carries on where the upload stopped
+    assert client.get(f"/api/uploads/{upload['id']}", headers=auth_headers).get_json()['upload']['received'] == 500
+    assert _put(client, auth_headers, upload['id'], 500, CONTENT[500:]).status_code == 200
+
+
+def test_failed_checksum_discards_the_chunk(client, auth_headers, upload):
+    response = _put(client, auth_headers, upload['id'], 0, CONTENT[:500], **{'X-Chunk-SHA256': '0' * 64})
+    assert response.status_code == 400
+    assert response.get_json()['upload']['received'] == 0
+    assert _put(client, auth_headers, upload['id'], 0, CONTENT[:500]).status_code == 200
+
+
+def test_chunk_past_the_declared_size_is_refused(client, auth_headers, upload):
+    response = _put(client, auth_headers, upload['id'], 0, CONTENT + b'extra')
+    assert response.status_code == 416
+
+
+def test_incomplete_upload_cannot_be_completed(client, auth_headers, upload):
+    _put(client, auth_headers, upload['id'], 0, CONTENT[:100])
+    response = client.post(f"/api/uploads/{upload['id']}/complete", headers=auth_headers, json={})
+    assert response.status_code == 409
+
+
+def test_completed_upload_refuses_more_chunks_and_a_second_completion(client, auth_headers, upload):
+    _put(client, auth_headers, upload['id'], 0, CONTENT)
+    assert client.post(f"/api/uploads/{upload['id']}/complete", headers=auth_headers, json={}).status_code in (201, 202)
+
+    assert _put(client, auth_headers, upload['id'], len(CONTENT), b'x').status_code == 409
+    assert client.post(f"/api/uploads/{upload['id']}/complete", headers=auth_headers, json={}).status_code == 409
+
+
+def test_uploads_are_private_to_their_user(client, auth_headers, upload):
+    other = client.post('/api/auth/register', json={
+        'email': 'uploads-other@example.com', 'password': 'password', 'full_name': 'Other'
+    }).get_json()['access_token']
+    response = _put(client, {'Authorization': f'Bearer {other}'}, upload['id'], 0, CONTENT[:10])
+    assert response.status_code == 404
+
+
+def test_cancelled_upload_removes_its_partial_file(app, client, auth_headers, upload):
+    _put(client, auth_headers, upload['id'], 0, CONTENT[:100])
+    partial = os.path.join(app.config['UPLOAD_FOLDER'], '.partial', upload['id'])
+    assert os.path.exists(partial)
+
+    assert client.delete(f"/api/uploads/{upload['id']}", headers=auth_headers).status_code == 200
+    assert not os.path.exists(partial)
+    assert client.get(f"/api/uploads/{upload['id']}", headers=auth_headers).status_code == 404
@@ -0,0 +1,59 @@
+from sqlalchemy import inspect, text
+
+import migrations
+import text_store
+from app import upgrade_database
+from models import db, Analysis, Document, DocumentText, User
+
+
+def _applied():
+    return [row[0] for row in db.session.execute(text('SELECT version FROM schema_migrations ORDER BY version'))]
+
+
+def _forget(*versions):
+    """Drop migration records, as if the migrations had never run"""
+    db.session.execute(text('DELETE FROM schema_migrations WHERE version IN (%s)' % ','.join(map(str, versions))))
+    db.session.commit()
+
+
+def test_every_migration_is_recorded_once(db_session):
+    upgrade_database()
+    upgrade_database()
+    assert _applied() == [version for version, _, _ in migrations.MIGRATIONS]
+
+
+def test_migrations_can_run_again_on_an_up_to_date_schema(db_session):
+    _forget(*(version for version, _, _ in migrations.MIGRATIONS))
+    migrations.run_migrations()
+    assert _applied() == [version for version, _, _ in migrations.MIGRATIONS]
+
+
+def test_missing_column_is_added(db_session):
+    db_session.execute(text('ALTER TABLE analysis DROP COLUMN version'))
+    db_session.commit()
+    _forget(5)
+
+    migrations.run_migrations()
+    assert 'version' in {column['name'] for column in inspect(db.engine).get_columns('analysis')}
+    assert 5 in _applied()
+
+
+def test_legacy_text_is_moved_once(db_session):
+    user = User(email='migrations@example.com', full_name='Migrations')
+    user.set_password('password', 4)
+    db_session.add(user)
+    db_session.flush()
+    document = Document(filename='legacy.txt', file_path='legacy.txt', file_type='txt', file_size=11,
+                        user_id=user.id)
+    db_session.add(document)
+    db_session.flush()
+    db_session.add(Analysis(document_id=document.id, extracted_text='legacy text', summary='Legacy'))
+    db_session.commit()
+
+    for _ in range(2):
+        _forget(3)
+        migrations.run_migrations()
+
+    assert text_store.load_text(document.id) == 'legacy text'
+    assert DocumentText.query.filter_by(document_id=document.id).count() == 1
+    assert db_session.get(Analysis, document.analysis.id).extracted_text == ''
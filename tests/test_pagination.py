@@ -0,0 +1,82 @@
+import io
+from datetime import datetime
+
+import pytest
+
+from models import Document
+
+
+def _upload(client, headers, index):
+    response = client.post('/api/documents/upload', headers=headers, content_type='multipart/form-data', data={
+        'file': (io.BytesIO(f'Document number {index} has good results.'.encode()), f'doc{index}.txt')
+    })
+    assert response.status_code in (201, 202), response.get_json()
+    return response.get_json()['document']['id']
+
+
+def _walk(client, headers, limit):
+    """Follow next_cursor through every page; returns the ids in order"""
+    ids, cursor, pages = [], None, 0
+    while True:
+        query = {'limit': limit, **({'cursor': cursor} if cursor else {})}
+        response = client.get('/api/documents', headers=headers, query_string=query)
+        assert response.status_code == 200
+        data = response.get_json()
+        assert len(data['documents']) <= limit
+        ids.extend(document['id'] for document in data['documents'])
+        pages += 1
+        cursor = data['next_cursor']
+        if cursor is None:
+            return ids, pages
+
+
+@pytest.fixture
+def uploaded(client, auth_headers):
+    return [_upload(client, auth_headers, index) for index in range(7)]
+
+
+def test_pages_cover_every_document_once_newest_first(client, auth_headers, uploaded):
+    ids, pages = _walk(client, auth_headers, limit=3)
+    assert sorted(ids) == sorted(uploaded)
+    assert ids == sorted(uploaded, reverse=True)
+    assert pages == 3
+
+
+def test_exact_multiple_of_the_page_size_has_no_empty_last_page(client, auth_headers):
+    uploaded = [_upload(client, auth_headers, index) for index in range(4)]
+    ids, pages = _walk(client, auth_headers, limit=2)
+    assert ids == sorted(uploaded, reverse=True)
+    assert pages == 2
+
+
+def test_documents_with_equal_timestamps_are_ordered_by_id(client, auth_headers, uploaded, db_session):
+    # Several uploads within the same instant must neither repeat nor be skipped across pages
+    same_time = datetime(2024, 1, 1, 12, 0, 0)
+    Document.query.filter(Document.id.in_(uploaded[1:5])).update({'uploaded_at': same_time},
+                                                                  synchronize_session=False)
+    db_session.commit()
+
+    ids, _ = _walk(client, auth_headers, limit=2)
+    assert len(ids) == len(set(ids)) == len(uploaded)
+    tied = [doc_id for doc_id in ids if doc_id in uploaded[1:5]]
+    assert tied == sorted(uploaded[1:5], reverse=True)
+    # The backdated documents come after the newer ones
+    assert ids[-4:] == tied
+
+
+def test_listing_only_shows_own_documents(client, auth_headers, uploaded):
+    other = client.post('/api/auth/register', json={
+        'email': 'pagination-other@example.com', 'password': 'password', 'full_name': 'Other'
+    }).get_json()['access_token']
+    ids, _ = _walk(client, {'Authorization': f'Bearer {other}'}, limit=5)
+    assert ids == []
+
+
+def test_invalid_cursor_is_rejected(client, auth_headers):
+    response = client.get('/api/documents', headers=auth_headers, query_string={'cursor': 'not-a-cursor'})
+    assert response.status_code == 400
+
+
+def test_limit_is_clamped(client, auth_headers, uploaded):
+    response = client.get('/api/documents', headers=auth_headers, query_string={'limit': 0})
+    assert len(response.get_json()['documents']) == 1
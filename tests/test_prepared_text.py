@@ -0,0 +1,98 @@
+import random
+import re
+
+import numpy as np
+import pytest
+
+import prepared_text
+import utils
+from prepared_text import prepare
+
+ALPHABET = ['a', 'B', 'é', '中', ' ', ' ', '\n', '\t', '　', '\x1c', '.', '!', '?', ',', '1', 'x']
+
+
+def _random_texts(count, seed=7):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 200))) for _ in range(count)]
+
+
+TEXTS = ['', ' ', 'one', '  Two words.  ', 'A. B! C? ...', 'Dr. Smith. e.g. this!\n\nNext\tline?'] + _random_texts(300)
+
+
+@pytest.fixture(params=[prepared_text.SCAN_BLOCK_CHARS, 7])
+def block_chars(request, monkeypatch):
+    """Also scan in tiny blocks, so that words and sentences cross block boundaries"""
+    monkeypatch.setattr(prepared_text, 'SCAN_BLOCK_CHARS', request.param)
+    return request.param
+
+
+def _spans(document, starts, ends):
+    return [document.text[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+
+
+def test_words_match_str_split(block_chars):
+    for text in TEXTS:
+        document = prepare(text)
+        assert _spans(document, *document.words) == text.split()
+        assert document.word_count == len(text.split())
+
+
+def test_segments_match_sentence_regex(block_chars):
+    for text in TEXTS:
+        document = prepare(text)
+        expected = [match.span() for match in re.finditer(r'[^.!?]+', text)]
+        assert list(zip(*(offsets.tolist() for offsets in document.segments))) == expected
+
+
+def test_sentence_spans_are_stripped_segments(block_chars):
+    for text in TEXTS:
+        document = prepare(text)
+        expected = [s.strip() for s in re.findall(r'[^.!?]+', text) if len(s.strip()) > 5]
+        assert _spans(document, *document.sentence_spans(5)) == expected
+
+
+def test_sentence_words_follow_sentence_regex(block_chars):
+    for text in TEXTS:
+        document = prepare(text)
+        starts, ends, sizes = document.sentence_words()
+        expected = [match.group().split() for match in re.finditer(r'[^.!?]+[.!?]*', text)]
+        assert _spans(document, starts, ends) == [word for words in expected for word in words]
+        assert sizes.tolist() == [len(words) for words in expected]
+
+
+def test_words_in_counts_words_of_stripped_spans():
+    document = prepare('alpha beta. gamma delta epsilon!  zeta')
+    starts, ends = document.sentence_spans()
+    counts = document.words_in(starts, ends)
+    assert counts.tolist() == [len(document.text[s:e].split()) for s, e in zip(starts.tolist(), ends.tolist())]
+
+
+def test_offsets_are_int32_and_cached():
+    document = prepare('some words here')
+    assert document.words[0].dtype == np.int32
+    assert document.words is document.words
+    assert prepare(document) is document
+
+
+def test_digest_is_sha256_of_utf8():
+    import hashlib
+    assert prepare('héllo').digest == hashlib.sha256('héllo'.encode('utf-8')).hexdigest()
+
+
+def test_count_lexicon_matches_split_tokens():
+    for text in TEXTS + ['Good results, great GROWTH; problems and tissues. bad-bad']:
+        expected = [0, 0]
+        for token in text.split():
+            for word in utils._WORD.findall(token.lower()):
+                group = utils._SENTIMENT_LEXICON.get(word)
+                if group is not None:
+                    expected[group] += 1
+        assert utils.count_lexicon(text, utils._SENTIMENT_LEXICON, 2).tolist() == expected
+
+
+def test_stages_accept_prepared_text():
+    text = 'The results are significant and show great progress. ' * 30
+    document = prepare(text)
+    assert utils.count_words(document) == len(text.split())
+    assert utils.analyze_fallback_sentiment(document) == utils.analyze_fallback_sentiment(text)
+    assert utils.extract_fallback_key_points(document) == utils.extract_fallback_key_points(text)
@@ -0,0 +1,77 @@
+"""Compressed storage for extracted document text.
+
+The full text of every analysed document is kept outside the ``analysis``
+table, split into fixed-size character chunks that are zlib-compressed
+independently (``document_text_chunks``), with the length recorded in
+``document_texts``. Listings never touch these tables; the text is read
+only when it is asked for, and a character range only decompresses the
+chunks it overlaps.
+"""
+import zlib
+
+from sqlalchemy import text
+
+from models import db, DocumentText, TextChunk
+
+CHUNK_CHARS = 64 * 1024
+COMPRESSION_LEVEL = 6
+
+
+def save_text(document_id, content):
+    """Store the full text of a document, replacing any previous copy (caller commits)"""
+    delete_text(document_id)
+
+    stored_size = 0
+    for seq, start in enumerate(range(0, len(content), CHUNK_CHARS)):
+        data = zlib.compress(content[start:start + CHUNK_CHARS].encode('utf-8'), COMPRESSION_LEVEL)
+        stored_size += len(data)
+        db.session.add(TextChunk(document_id=document_id, seq=seq, data=data))
+
+    db.session.add(DocumentText(document_id=document_id, char_count=len(content),
+                                chunk_chars=CHUNK_CHARS, stored_size=stored_size))
+
+
+def copy_text(source_id, document_id):
+    """Give a document the stored text of an identical one (caller commits)"""
+    db.session.execute(
+        text('INSERT INTO document_text_chunks (document_id, seq, data) '
+             'SELECT :id, seq, data FROM document_text_chunks WHERE document_id = :source'),
+        {'id': document_id, 'source': source_id}
+    )
+    db.session.execute(
+        text('INSERT INTO document_texts (document_id, char_count, chunk_chars, stored_size) '
+             'SELECT :id, char_count, chunk_chars, stored_size FROM document_texts WHERE document_id = :source'),
+        {'id': document_id, 'source': source_id}
+    )
+
+
+def delete_text(document_id):
+    """Remove a document's stored text (caller commits)"""
+    TextChunk.query.filter_by(document_id=document_id).delete()
+    DocumentText.query.filter_by(document_id=document_id).delete()
+
+
+def get_length(document_id):
+    """Return the text length in characters, or None if nothing is stored"""
+    return db.session.query(DocumentText.char_count).filter_by(document_id=document_id).scalar()
+
+
+def load_text(document_id, start=0, end=None):
+    """Return characters [start, end) of a document's text ('' if nothing is stored)"""
+    header = db.session.get(DocumentText, document_id)
+    if header is None:
+        return ''
+
+    end = header.char_count if end is None else min(end, header.char_count)
+    if start >= end:
+        return ''
+
+    size = header.chunk_chars
+    first, last = start // size, (end - 1) // size
+    chunks = (
+        db.session.query(TextChunk.data)
+        .filter(TextChunk.document_id == document_id, TextChunk.seq.between(first, last))
+        .order_by(TextChunk.seq)
+    )
+    content = ''.join(zlib.decompress(row.data).decode('utf-8') for row in chunks)
+    return content[start - first * size:end - first * size]
@@ -0,0 +1,143 @@
+"""Resumable chunked uploads and zip archives for bulk uploads.
+
+A client opens an upload session with the file name and size, PUTs the
+bytes in chunks at increasing offsets, and completes the session. Each
+chunk is streamed straight into a partial file under
+``UPLOAD_FOLDER/.partial`` and its optional SHA-256 is verified while it
+is written, so worker memory stays constant regardless of file size. A
+client that loses its connection asks for the session and resumes from
+the reported offset.
+"""
+import hashlib
+import os
+import zipfile
+from datetime import datetime, timedelta
+
+from models import db, UploadSession
+import storage
+
+CHUNK_READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A client error in the chunked upload protocol"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _partial_path(upload_folder, upload_id):
+    return os.path.join(upload_folder, '.partial', upload_id)
+
+
+def create_session(user_id, filename, file_type, total_size, upload_folder, expiry_hours):
+    """Open a new upload session with an empty partial file"""
+    purge_expired(expiry_hours)
+
+    session = UploadSession(user_id=user_id, filename=filename, file_type=file_type, total_size=total_size)
+    db.session.add(session)
+    db.session.flush()
+
+    session.tmp_path = _partial_path(upload_folder, session.id)
+    os.makedirs(os.path.dirname(session.tmp_path), exist_ok=True)
+    open(session.tmp_path, 'wb').close()
+    db.session.commit()
+    return session
+
+
+def write_chunk(session, offset, stream, length, expected_sha256=None, max_chunk_size=None):
+    """Append one chunk at `offset`, verifying its checksum as it is written"""
+    if session.status != 'active':
+        raise UploadError('Upload is already complete', 409)
+    if offset != session.received:
+        # Out-of-order or repeated chunk; the client should resume from `received`
+        raise UploadError(f'Expected offset {session.received}', 409)
+    if length is None:
+        raise UploadError('Content-Length is required', 411)
+    if max_chunk_size and length > max_chunk_size:
+        raise UploadError(f'Chunk exceeds the maximum chunk size of {max_chunk_size} bytes', 413)
+    if offset + length > session.total_size:
+        raise UploadError('Chunk extends past the declared file size', 416)
+
+    digest = hashlib.sha256()
+    written = 0
+    with open(session.tmp_path, 'r+b') as out:
+        out.seek(offset)
+        try:
+            while written < length:
+                block = stream.read(min(CHUNK_READ_SIZE, length - written))
+                if not block:
+                    break
+                digest.update(block)
+                out.write(block)
+                written += len(block)
+
+            if written != length:
+                raise UploadError('Chunk body is shorter than Content-Length')
+            if expected_sha256 and digest.hexdigest() != expected_sha256.lower():
+                raise UploadError('Chunk checksum mismatch')
+        except Exception:
+            # Discard the partial chunk so the client can resend it from the same offset
+            out.truncate(offset)
+            raise
+        out.truncate(offset + written)
+
+    session.received = offset + written
+    session.updated_at = datetime.utcnow()
+    db.session.commit()
+    return digest.hexdigest()
+
+
+def complete_session(session, upload_folder, expected_sha256=None):
+    """Finish an upload: hash the assembled file and move it into the content store"""
+    if session.status != 'active':
+        raise UploadError('Upload is already complete', 409)
+    if session.received != session.total_size:
+        raise UploadError(f'Upload incomplete: received {session.received} of {session.total_size} bytes', 409)
+
+    digest = hashlib.sha256()
+    with open(session.tmp_path, 'rb') as file:
+        for block in iter(lambda: file.read(storage.CHUNK_SIZE), b''):
+            digest.update(block)
+    content_hash = digest.hexdigest()
+    if expected_sha256 and content_hash != expected_sha256.lower():
+        raise UploadError('File checksum mismatch')
+
+    file_path = storage.store_file(session.tmp_path, upload_folder, content_hash, session.file_type,
+                                   session.total_size)
+    session.status = 'complete'
+    session.updated_at = datetime.utcnow()
+    return content_hash, file_path
+
+
+def discard_session(session):
+    """Delete an upload session and its partial file (caller commits)"""
+    if session.status == 'active' and session.tmp_path and os.path.exists(session.tmp_path):
+        os.remove(session.tmp_path)
+    db.session.delete(session)
+
+
+def purge_expired(expiry_hours):
+    """Discard unfinished sessions idle for longer than the expiry window (caller commits)"""
+    cutoff = datetime.utcnow() - timedelta(hours=expiry_hours)
+    for session in UploadSession.query.filter(UploadSession.status == 'active',
+                                              UploadSession.updated_at < cutoff).all():
+        discard_session(session)
+
+
+def list_archive(stream, max_uncompressed_size):
+    """Open a zip upload and return (archive, members) for the files it contains"""
+    try:
+        archive = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile:
+        raise UploadError('Not a valid zip archive')
+
+    members = [
+        info for info in archive.infolist()
+        if not info.is_dir() and not any(part.startswith(('.', '__MACOSX')) for part in info.filename.split('/'))
+    ]
+    # Members are read back with their declared sizes, so this also bounds decompression
+    if sum(info.file_size for info in members) > max_uncompressed_size:
+        raise UploadError(f'Archive expands beyond {max_uncompressed_size} bytes', 413)
+    return archive, members
@@ -1,36 +1,101 @@
-import os
-import PyPDF2
+import hashlib
 import json
-from werkzeug.utils import secure_filename
+import functools
+import itertools
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import numpy as np
 import re
+from config import Config
+import inference
+from model_registry import registry
+import pdf_extraction
+from prepared_text import prepare
+import result_cache
 
-# Try to load spaCy (optional for enhanced key points)
-nlp = None
-try:
-    import spacy
-    nlp = spacy.load("en_core_web_sm")
-    print("✓ spaCy model loaded successfully")
-except Exception as e:
-    print(f"⚠ spaCy not available (optional): {e}")
-
-# Try to load transformers (optional for AI features)
-summarizer = None
-sentiment_analyzer = None
-try:
-    from transformers import pipeline
-    import ssl
-    import certifi
-    
-    # Disable SSL verification (temporary workaround for SSL errors)
-    # Note: Only use this for development/testing
-    ssl._create_default_https_context = ssl._create_unverified_context
-    
-    summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-    sentiment_analyzer = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
-    print("✓ AI models loaded successfully")
-except Exception as e:
-    print(f"⚠ AI models not available - using fallback methods: {str(e)[:100]}")
-    print("  The app will still work with basic text analysis!")
+# Fallback lexicons
+POSITIVE_WORDS = [
+    'good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic',
+    'positive', 'success', 'beneficial', 'advantage', 'improve', 'better',
+    'best', 'happy', 'pleased', 'satisfied', 'effective', 'efficient',
+    'innovative', 'breakthrough', 'achievement', 'progress', 'growth'
+]
+
+NEGATIVE_WORDS = [
+    'bad', 'terrible', 'awful', 'poor', 'negative', 'failure', 'problem',
+    'issue', 'concern', 'risk', 'threat', 'worse', 'worst', 'difficult',
+    'challenge', 'crisis', 'decline', 'decrease', 'loss', 'damage',
+    'harmful', 'dangerous', 'critical', 'severe'
+]
+
+IMPORTANT_KEYWORDS = [
+    'important', 'significant', 'key', 'main', 'primary', 'essential',
+    'critical', 'major', 'crucial', 'fundamental', 'conclusion',
+    'summary', 'result', 'finding', 'shows', 'demonstrates', 'reveals'
+]
+
+
+def _build_lexicon(*word_lists):
+    """Map every word (and its common inflections) to the index of the list it came from
+
+    Lookups are on whole words, so 'problems' counts as 'problem' while
+    'tissues' no longer counts as 'issue'.
+    """
+    lexicon = {}
+    for group, words in enumerate(word_lists):
+        for word in words:
+            for suffix in _INFLECTIONS:
+                lexicon.setdefault(word + suffix, group)
+    return lexicon
+
+
+_INFLECTIONS = ('', 's', 'es', 'd', 'ed', 'ing', 'ly', 'ful', 'ment', 'ments')
+_WORD = re.compile(r'[^\W\d_]+')
+_SENTIMENT_LEXICON = _build_lexicon(POSITIVE_WORDS, NEGATIVE_WORDS)
+_IMPORTANCE_LEXICON = _build_lexicon(IMPORTANT_KEYWORDS)
+
+
+def count_lexicon(text, lexicon, groups):
+    """Count whole-word lexicon hits per group in a single pass over the text
+
+    The whitespace words are cut from the PreparedText word offsets and
+    tallied by Counter; only the distinct words are then lower-cased, split
+    on punctuation and looked up.
+    """
+    document = prepare(text)
+    starts, ends = document.words
+    words = [document.text[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+    counts = np.zeros(groups, dtype=np.int64)
+    for token, occurrences in Counter(words).items():
+        for word in _WORD.findall(token.lower()):
+            group = lexicon.get(word)
+            if group is not None:
+                counts[group] += occurrences
+    return counts
+
+
+# Per-thread record of fallbacks and cache lookups during the current analyze_document call
+_trace = threading.local()
+
+# Aggregate score below which a document with mixed chunk labels is reported as neutral
+MIXED_SENTIMENT_THRESHOLD = 0.1
+
+# Bump when the summary, key point or sentiment logic changes; analyses made with an older
+# version (or other models) are picked up by the admin backfill (backfill.py)
+ANALYSIS_ALGORITHM_VERSION = 2  # 2: TextRank fallback summaries
+
+# Extractive summaries: the top sentences by TextRank, ranking at most EXTRACTIVE_MAX_SENTENCES
+# evenly spaced sentences of a long document
+EXTRACTIVE_SUMMARY_SENTENCES = 3
+EXTRACTIVE_MAX_SENTENCES = 400
+TEXTRANK_DAMPING = 0.85
+
+# spaCy key points are drawn from the first 30 sentences of at most 100k characters
+KEY_POINT_SENTENCES = 30
+KEY_POINT_MAX_CHARS = 100000
 
 
 def allowed_file(filename, allowed_extensions):
@@ -38,15 +103,10 @@ def allowed_file(filename, allowed_extensions):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
 
-def extract_text_from_pdf(file_path):
+def extract_text_from_pdf(file_path, timings=None):
     """Extract text from PDF file"""
     try:
-        text = ""
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        return text.strip()
+        return pdf_extraction.extract_text(file_path, timings=timings)
     except Exception as e:
         raise Exception(f"Error extracting text from PDF: {str(e)}")
 
@@ -61,184 +121,454 @@ def extract_text_from_txt(file_path):
         raise Exception(f"Error reading text file: {str(e)}")
 
 
-def extract_text(file_path, file_type):
+def extract_text(file_path, file_type, timings=None):
     """Extract text based on file type"""
     if file_type == 'pdf':
-        return extract_text_from_pdf(file_path)
+        return extract_text_from_pdf(file_path, timings=timings)
     elif file_type == 'txt':
         return extract_text_from_txt(file_path)
     else:
         raise Exception(f"Unsupported file type: {file_type}")
 
 
+def _summarize_batch(texts, max_length, min_length):
+    """Run a batch of texts through the summarization pipeline"""
+    outputs = registry.get('summarizer')(texts, max_length=max_length, min_length=min_length, do_sample=False,
+                                         truncation=True, batch_size=len(texts))
+    return [output['summary_text'] for output in outputs]
+
+
+def _classify_batch(texts):
+    """Run a batch of texts through the sentiment pipeline"""
+    return registry.get('sentiment')(texts, truncation=True, batch_size=len(texts))
+
+
+def _run_model(name, batch_fn, text, **options):
+    """Run one text through a model, micro-batched with concurrent callers when enabled"""
+    if registry.server is not None:
+        return registry.server.run_batch(name, batch_fn, [text], options)[0]
+    if Config.INFERENCE_BATCHING:
+        return inference.get_engine(name, batch_fn)(text, **options)
+    return batch_fn([text], **options)[0]
+
+
+def _run_model_batch(name, batch_fn, texts, **options):
+    """Run several texts through a model as one batch"""
+    if registry.server is not None:
+        # The model server batches calls from all of its clients
+        return registry.server.run_batch(name, batch_fn, texts, options)
+    if Config.INFERENCE_BATCHING:
+        engine = inference.get_engine(name, batch_fn)
+        futures = [engine.submit(text, **options) for text in texts]
+        return [future.result() for future in futures]
+    return batch_fn(texts, **options)
+
+
+def _map_chunks(name, batch_fn, chunks, **options):
+    """Run a stream of chunks through a model, holding at most one batch of chunks in memory"""
+    window = []
+    for chunk in chunks:
+        window.append(chunk)
+        if len(window) >= Config.INFERENCE_MAX_BATCH_SIZE:
+            yield from zip(window, _run_model_batch(name, batch_fn, window, **options))
+            window = []
+    if window:
+        yield from zip(window, _run_model_batch(name, batch_fn, window, **options))
+
+
+def count_words(text):
+    """Count whitespace-separated words (reuses the offsets of a PreparedText)"""
+    return prepare(text).word_count
+
+
+def _chunk_bounds(document, max_words):
+    """(first, last) word indexes into document.sentence_words() of each chunk of at most max_words words"""
+    bounds = []
+    chunk_start = position = 0
+    for size in document.sentence_words()[2].tolist():
+        while size:
+            if size > max_words - (position - chunk_start) and position > chunk_start:
+                # Sentence does not fit; close the current chunk first
+                bounds.append((chunk_start, position))
+                chunk_start = position
+                continue
+            taken = min(size, max_words)
+            position += taken
+            size -= taken
+
+    if position > chunk_start:
+        # Fold a short tail into the previous chunk instead of emitting a fragment
+        if bounds and position - chunk_start < max_words // 4:
+            bounds[-1] = (bounds[-1][0], position)
+        else:
+            bounds.append((chunk_start, position))
+    return bounds
+
+
+def _chunk(document, first, last):
+    """Join words first..last-1 of document.sentence_words() with single spaces"""
+    starts, ends, _ = document.sentence_words()
+    start, end = int(starts[first]), int(ends[last - 1])
+    text = document.text
+    if document.words_in(start, end) == last - first:
+        # No word in the chunk was cut at a sentence end, so split() finds the same words
+        return ' '.join(text[start:end].split())
+    return ' '.join([text[start:end] for start, end in zip(starts[first:last].tolist(), ends[first:last].tolist())])
+
+
+def _sample_chunks(text, max_words, max_chunks):
+    """Chunk a text, keeping an evenly spaced subset if it would exceed max_chunks
+
+    Only the chunks kept are joined into strings.
+    """
+    document = prepare(text)
+    total_chunks = -(-document.word_count // max_words)
+    stride = max(1, -(-total_chunks // max_chunks))
+    for first, last in _chunk_bounds(document, max_words)[::stride]:
+        yield _chunk(document, first, last)
+
+
+def _stage_settings(stage):
+    """Model and settings that a stage's result depends on besides the text
+
+    A model that could not be loaded is recorded as '-', so results from the
+    fallback method are never served once the model is available.
+    """
+    if stage == 'summary':
+        model = _backend_model(Config.SUMMARIZER_MODEL) if registry.get('summarizer') else '-'
+        return [model, Config.SUMMARY_CHUNK_WORDS, Config.SUMMARY_MAX_CHUNKS]
+    if stage == 'key_points':
+        model = Config.SPACY_MODEL if registry.get('spacy') else '-'
+        return [model, sorted(Config.SPACY_EXCLUDE)]
+    model = _backend_model(Config.SENTIMENT_MODEL) if registry.get('sentiment') else '-'
+    return [model, Config.SENTIMENT_CHUNK_WORDS, Config.SENTIMENT_MAX_CHUNKS]
+
+
+def _cached_stage(stage, decode=None):
+    """Serve a stage function from the result cache, keyed by text hash and stage version
+
+    Results that fell back because a model call raised are not cached, so the
+    model is tried again next time.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(text, *args, **kwargs):
+            document = prepare(text)
+            cache = result_cache.get_cache()
+            if cache is None:
+                return fn(document, *args, **kwargs)
+
+            settings = [ANALYSIS_ALGORITHM_VERSION, _stage_settings(stage), args, sorted(kwargs.items())]
+            version = hashlib.sha1(json.dumps(settings).encode('utf-8')).hexdigest()[:12]
+            key = result_cache.make_key(stage, version, document.digest)
+            value, outcome = cache.get(key)
+            lookups = getattr(_trace, 'cache', None)
+            if lookups is not None:
+                lookups.append((stage, outcome))
+            if value is not None:
+                return decode(value) if decode else value
+
+            _trace.model_error = False
+            value = fn(document, *args, **kwargs)
+            if not _trace.model_error:
+                cache.set(key, value)
+            return value
+        return wrapper
+    return decorator
+
+
+@_cached_stage('summary')
 def generate_summary(text, max_length=150, min_length=50):
     """Generate summary using AI or fallback method"""
-    if summarizer:
+    if registry.get('summarizer'):
         try:
-            # Limit text length for summarization (BART has a token limit)
-            max_input_length = 1024
-            if len(text.split()) > max_input_length:
-                text = ' '.join(text.split()[:max_input_length])
-            
-            # Generate summary
-            summary = summarizer(text, max_length=max_length, min_length=min_length, do_sample=False)
-            return summary[0]['summary_text']
+            return summarize_long_text(text, max_length=max_length, min_length=min_length)
         except Exception as e:
             print(f"AI summarization failed, using fallback: {e}")
+            _note_fallback('summarizer', 'error')
+    else:
+        _note_fallback('summarizer', 'unavailable')
     
     # Fallback: Smart extraction method
     return generate_fallback_summary(text)
 
 
+def summarize_long_text(text, max_length=150, min_length=50):
+    """Map-reduce summarization: summarize chunks in batches, then summarize the partial summaries"""
+    chunk_words = Config.SUMMARY_CHUNK_WORDS
+    document = prepare(text)
+    
+    while True:
+        # Map: partial summaries of each chunk (BART has a token limit per input)
+        chunks = _sample_chunks(document, chunk_words, Config.SUMMARY_MAX_CHUNKS)
+        first = next(chunks, None)
+        if first is None:
+            return generate_fallback_summary(document)
+        second = next(chunks, None)
+        if second is None:
+            # Fits in a single model input: this is the final summary
+            return _run_model('summarizer', _summarize_batch, first, max_length=max_length, min_length=min_length)
+        
+        partials = [
+            summary for _, summary in _map_chunks(
+                'summarizer', _summarize_batch, _prepend(first, second, chunks),
+                max_length=max_length, min_length=min(min_length, max_length // 3)
+            )
+        ]
+        
+        # Reduce: the joined partial summaries become the next round's input
+        reduced = prepare(' '.join(partials))
+        if reduced.word_count >= document.word_count:
+            # Not converging (summary lengths too large for the chunk size); summarize the head
+            return _run_model('summarizer', _summarize_batch, first, max_length=max_length, min_length=min_length)
+        document = reduced
+
+
+def _prepend(first, second, rest):
+    """Re-attach chunks that were taken off the front of a generator"""
+    yield first
+    yield second
+    yield from rest
+
+
 def generate_fallback_summary(text):
     """Generate summary using basic text analysis (no AI required)"""
-    # Split into sentences
-    sentences = re.split(r'[.!?]+', text)
-    sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
-    
-    if not sentences:
+    return generate_extractive_summary(text)
+
+
+def generate_extractive_summary(text, sentences=EXTRACTIVE_SUMMARY_SENTENCES):
+    """TextRank over TF-IDF sentence vectors: the most central sentences, in document order"""
+    document = prepare(text)
+    starts, ends = document.sentence_spans(20)
+    if not len(starts):
         return "Document is too short to summarize."
     
-    # Take first sentence, middle sentence, and last sentence for variety
-    summary_sentences = []
-    
-    if len(sentences) >= 1:
-        summary_sentences.append(sentences[0])
-    
-    if len(sentences) >= 3:
-        summary_sentences.append(sentences[len(sentences) // 2])
-    
-    if len(sentences) >= 2:
-        summary_sentences.append(sentences[-1])
+    # Rank every stride-th sentence, the stride being the smallest power of two that keeps at most
+    # EXTRACTIVE_MAX_SENTENCES
+    stride = 1
+    while -(-len(starts) // stride) > EXTRACTIVE_MAX_SENTENCES:
+        stride *= 2
+    spans = list(zip(starts[::stride].tolist(), ends[::stride].tolist()))
     
-    summary = '. '.join(summary_sentences[:3])
+    text = document.text
+    if len(spans) > sentences:
+        scores = _textrank([_WORD.findall(text[start:end].lower()) for start, end in spans])
+        top = np.sort(np.argsort(-scores, kind='stable')[:sentences])
+        spans = [spans[i] for i in top]
     
-    # Ensure it ends with punctuation
-    if summary and summary[-1] not in '.!?':
-        summary += '.'
-    
-    return summary if summary else "Unable to generate summary from this document."
+    return ' '.join(' '.join(text[start:end].split()) + '.' for start, end in spans)
+
 
+def _textrank(sentences):
+    """PageRank scores of tokenized sentences over their TF-IDF cosine similarity graph"""
+    n = len(sentences)
+    vocabulary = {}
+    rows = np.repeat(np.arange(n), [len(words) for words in sentences])
+    terms = np.fromiter((vocabulary.setdefault(word, len(vocabulary)) for words in sentences for word in words),
+                        dtype=np.int64, count=len(rows))
+    if not len(terms):
+        return np.zeros(n)
+    
+    # Term frequencies per (sentence, term) pair, then smoothed IDF weights
+    pairs, tf = np.unique(rows * len(vocabulary) + terms, return_counts=True)
+    pair_rows, pair_terms = np.divmod(pairs, len(vocabulary))
+    df = np.bincount(pair_terms, minlength=len(vocabulary))
+    weights = tf * (np.log(n / df) + 1.0)[pair_terms]
+    norms = np.sqrt(np.bincount(pair_rows, weights=weights ** 2, minlength=n))
+    norms[norms == 0] = 1.0
+    
+    # Only terms shared by two or more sentences contribute to similarity
+    shared = df[pair_terms] > 1
+    shared_ids = np.cumsum(df > 1) - 1
+    vectors = np.zeros((n, int((df > 1).sum())), dtype=np.float32)
+    vectors[pair_rows[shared], shared_ids[pair_terms[shared]]] = weights[shared]
+    vectors /= norms[:, None]
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0.0)
+    
+    # Row-normalized transition matrix; sentences with no similar sentence link to all
+    totals = similarity.sum(axis=1, keepdims=True)
+    transition = np.where(totals > 0, similarity / np.where(totals > 0, totals, 1.0), 1.0 / n)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(100):
+        updated = (1 - TEXTRANK_DAMPING) / n + TEXTRANK_DAMPING * (transition.T @ scores)
+        converged = np.abs(updated - scores).sum() < 1e-6
+        scores = updated
+        if converged:
+            break
+    return scores
 
+
+@_cached_stage('key_points')
 def extract_key_points(text):
     """Extract key points using NLP or fallback method"""
+    nlp = registry.get('spacy')
     if nlp:
         try:
-            doc = nlp(text[:100000])  # Limit text length
-            
-            # Extract sentences with important entities or noun chunks
-            key_points = []
-            sentences = list(doc.sents)
-            
-            # Get sentences with named entities
-            for sent in sentences[:20]:  # Limit to first 20 sentences
-                if any(ent.label_ in ['PERSON', 'ORG', 'GPE', 'EVENT', 'PRODUCT'] for ent in sent.ents):
-                    key_points.append(sent.text.strip())
-                    if len(key_points) >= 5:
-                        break
-            
-            # If not enough, add sentences with important noun chunks
-            if len(key_points) < 5:
-                for sent in sentences[:30]:
-                    if len(list(sent.noun_chunks)) >= 2 and sent.text.strip() not in key_points:
-                        key_points.append(sent.text.strip())
-                        if len(key_points) >= 5:
-                            break
-            
-            return key_points[:5]
+            # Concurrent callers share nlp.pipe batches through the inference engine
+            parse = lambda windows: _run_model_batch('spacy', _parse_key_points, windows)
+            return _spacy_key_points([text], parse)[0]
         except Exception as e:
             print(f"spaCy extraction failed, using fallback: {e}")
+            _note_fallback('spacy', 'error')
+    else:
+        _note_fallback('spacy', 'unavailable')
     
     # Fallback: Basic key point extraction
     return extract_fallback_key_points(text)
 
 
-def extract_fallback_key_points(text):
-    """Extract key points using basic text analysis (no AI required)"""
-    # Split into sentences
-    sentences = re.split(r'[.!?]+', text)
-    sentences = [s.strip() for s in sentences if len(s.strip()) > 30]
-    
-    if not sentences:
-        return []
-    
+def _sentence_prefix_end(document, sentences, limit):
+    """Offset just past roughly the first `sentences` sentences of a prepared text, at most limit"""
+    starts, ends = document.segments
+    if len(starts) >= sentences and starts[sentences - 1] < limit:
+        return min(limit, int(ends[sentences - 1]) + 1)
+    return limit
+
+
+def _spacy_key_points(documents, parse):
+    """Parse growing prefixes of each prepared text until they cover the sentences key points come from"""
+    limits = [min(len(document), KEY_POINT_MAX_CHARS) for document in documents]
+    windows = [_sentence_prefix_end(document, KEY_POINT_SENTENCES + 10, limit)
+               for document, limit in zip(documents, limits)]
+    results = [None] * len(documents)
+    
+    pending = list(range(len(documents)))
+    while pending:
+        parsed = parse([documents[i].text[:windows[i]] for i in pending])
+        retry = []
+        for i, (key_points, sentence_count) in zip(pending, parsed):
+            # More sentences than needed means the ones used are complete
+            if sentence_count > KEY_POINT_SENTENCES or windows[i] >= limits[i]:
+                results[i] = key_points
+            else:
+                windows[i] = min(limits[i], windows[i] * 2)
+                retry.append(i)
+        pending = retry
+    return results
+
+
+def _parse_key_points(texts):
+    """Run spaCy over texts with nlp.pipe; returns (key_points, sentence_count) per text"""
+    nlp = registry.get('spacy')
+    docs = nlp.pipe(texts, batch_size=Config.SPACY_BATCH_SIZE, n_process=Config.SPACY_N_PROCESS)
+    return [_key_points_from_doc(doc) for doc in docs]
+
+
+def _key_points_from_doc(doc):
+    """Pick up to 5 key sentences from a parsed document"""
+    # Extract sentences with important entities or noun chunks
     key_points = []
+    sentences = list(itertools.islice(doc.sents, KEY_POINT_SENTENCES + 1))
     
-    # Look for sentences with keywords indicating importance
-    important_keywords = [
-        'important', 'significant', 'key', 'main', 'primary', 'essential',
-        'critical', 'major', 'crucial', 'fundamental', 'conclusion',
-        'summary', 'result', 'finding', 'shows', 'demonstrates', 'reveals'
-    ]
-    
-    for sentence in sentences[:30]:  # Check first 30 sentences
-        sentence_lower = sentence.lower()
-        
-        # Check for important keywords
-        if any(keyword in sentence_lower for keyword in important_keywords):
-            key_points.append(sentence)
+    # Get sentences with named entities
+    for sent in sentences[:20]:  # Limit to first 20 sentences
+        if any(ent.label_ in ['PERSON', 'ORG', 'GPE', 'EVENT', 'PRODUCT'] for ent in sent.ents):
+            key_points.append(sent.text.strip())
             if len(key_points) >= 5:
                 break
     
-    # If we don't have enough, add sentences that are not too short
+    # If not enough, add sentences with important noun chunks
     if len(key_points) < 5:
-        for sentence in sentences[:15]:
-            if sentence not in key_points and len(sentence.split()) >= 8:
-                key_points.append(sentence)
+        for sent in sentences[:KEY_POINT_SENTENCES]:
+            if len(list(sent.noun_chunks)) >= 2 and sent.text.strip() not in key_points:
+                key_points.append(sent.text.strip())
                 if len(key_points) >= 5:
                     break
     
+    return key_points[:5], len(sentences)
+
+
+def extract_fallback_key_points(text):
+    """Extract key points using basic text analysis (no AI required)"""
+    # Only the first 30 sentences are considered
+    document = prepare(text)
+    starts, ends = (bounds[:30] for bounds in document.sentence_spans(30))
+    
+    if not len(starts):
+        return []
+    
+    text = document.text
+    
+    # One scan for importance keywords over the covered text, mapped back to sentences
+    head = text[:ends[-1]].lower()
+    offsets = np.fromiter(
+        (m.start() for m in _WORD.finditer(head) if m.group() in _IMPORTANCE_LEXICON), dtype=np.int64
+    )
+    sentence_index = np.searchsorted(starts, offsets, side='right') - 1
+    inside = (sentence_index >= 0) & (offsets < ends[np.maximum(sentence_index, 0)])
+    keyword_hits = np.bincount(sentence_index[inside], minlength=len(starts))
+    
+    # Sentences with keywords indicating importance, in document order
+    selected = list(np.flatnonzero(keyword_hits > 0)[:5])
+    
+    # If we don't have enough, add sentences (from the first 15) that are not too short
+    if len(selected) < 5:
+        word_counts = document.words_in(starts[:15], ends[:15])
+        for index in np.flatnonzero(word_counts >= 8):
+            if index not in selected:
+                selected.append(index)
+                if len(selected) >= 5:
+                    break
+    
+    key_points = []
+    for index in selected:
+        sentence = text[starts[index]:ends[index]]
+        if sentence not in key_points:
+            key_points.append(sentence)
     return key_points[:5]
 
 
+@_cached_stage('sentiment', decode=tuple)
 def analyze_sentiment(text):
     """Analyze sentiment using AI or fallback method"""
-    if sentiment_analyzer:
+    if registry.get('sentiment'):
         try:
-            # Limit text length for sentiment analysis
-            max_length = 512
-            text_sample = ' '.join(text.split()[:max_length])
+            # Score the document chunk by chunk (the model has a 512 token limit)
+            chunks = _sample_chunks(text, Config.SENTIMENT_CHUNK_WORDS, Config.SENTIMENT_MAX_CHUNKS)
+            weighted_score = 0.0
+            total_words = 0
+            labels = set()
             
-            result = sentiment_analyzer(text_sample)[0]
-            label = result['label'].lower()
-            score = result['score']
+            for chunk, result in _map_chunks('sentiment', _classify_batch, chunks):
+                label = result['label'].lower()
+                
+                # Convert to sentiment score (-1 to 1)
+                if label == 'positive':
+                    chunk_score = result['score']
+                else:  # negative
+                    chunk_score = -result['score']
+                
+                words = count_words(chunk)
+                weighted_score += chunk_score * words
+                total_words += words
+                labels.add(label)
             
-            # Convert to sentiment score (-1 to 1)
-            if label == 'positive':
-                sentiment_score = score
-            else:  # negative
-                sentiment_score = -score
-            
-            return label, round(sentiment_score, 3)
+            if total_words:
+                sentiment_score = weighted_score / total_words
+                
+                if len(labels) == 1:
+                    label = labels.pop()
+                elif abs(sentiment_score) < MIXED_SENTIMENT_THRESHOLD:
+                    label = 'neutral'
+                else:
+                    label = 'positive' if sentiment_score > 0 else 'negative'
+                
+                return label, round(sentiment_score, 3)
         except Exception as e:
             print(f"AI sentiment failed, using fallback: {e}")
+            _note_fallback('sentiment', 'error')
+    else:
+        _note_fallback('sentiment', 'unavailable')
     
     # Fallback: Basic sentiment analysis
     return analyze_fallback_sentiment(text)
 
 
 def analyze_fallback_sentiment(text):
-    """Analyze sentiment using basic keyword matching (no AI required)"""
-    text_lower = text.lower()
-    
-    # Positive and negative word lists
-    positive_words = [
-        'good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic',
-        'positive', 'success', 'beneficial', 'advantage', 'improve', 'better',
-        'best', 'happy', 'pleased', 'satisfied', 'effective', 'efficient',
-        'innovative', 'breakthrough', 'achievement', 'progress', 'growth'
-    ]
-    
-    negative_words = [
-        'bad', 'terrible', 'awful', 'poor', 'negative', 'failure', 'problem',
-        'issue', 'concern', 'risk', 'threat', 'worse', 'worst', 'difficult',
-        'challenge', 'crisis', 'decline', 'decrease', 'loss', 'damage',
-        'harmful', 'dangerous', 'critical', 'severe'
-    ]
-    
-    # Count occurrences
-    positive_count = sum(text_lower.count(word) for word in positive_words)
-    negative_count = sum(text_lower.count(word) for word in negative_words)
+    """Analyze sentiment using whole-word keyword matching (no AI required)"""
+    # Single pass: group 0 is the positive lexicon, group 1 the negative one
+    positive_count, negative_count = (int(n) for n in count_lexicon(text, _SENTIMENT_LEXICON, 2))
     
     total = positive_count + negative_count
     
@@ -261,31 +591,173 @@ def analyze_fallback_sentiment(text):
     return sentiment, score
 
 
-def analyze_document(file_path, file_type):
-    """Perform complete document analysis"""
+@contextmanager
+def _stage(trace, name):
+    """Time one analysis stage into the trace"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace['stages'][name] = time.perf_counter() - start
+
+
+def _note_fallback(model, reason):
+    """Record in the current analysis trace that a model step used its fallback method"""
+    if reason == 'error':
+        _trace.model_error = True
+    fallbacks = getattr(_trace, 'fallbacks', None)
+    if fallbacks is not None:
+        fallbacks.append((model, reason))
+
+
+def _backend_model(model_name):
+    """Name a transformers model together with a non-default inference backend"""
+    if Config.INFERENCE_BACKEND == 'pytorch':
+        return model_name
+    # Quantized and ONNX models give slightly different outputs
+    return f'{model_name}@{Config.INFERENCE_BACKEND}'
+
+
+def analysis_version():
+    """Identify the analysis algorithms and configured models; stored on every Analysis"""
+    models = '|'.join([
+        _backend_model(Config.SUMMARIZER_MODEL) if Config.SUMMARIZER_ENABLED else '-',
+        _backend_model(Config.SENTIMENT_MODEL) if Config.SENTIMENT_ENABLED else '-',
+        Config.SPACY_MODEL if Config.SPACY_ENABLED else '-',
+    ])
+    return f'{ANALYSIS_ALGORITHM_VERSION}-{hashlib.sha1(models.encode("utf-8")).hexdigest()[:10]}'
+
+
+def analyze_document(file_path, file_type, provisional=False):
+    """Perform complete document analysis
+
+    The result includes a 'trace' with per-stage timings, model fallbacks and
+    result cache lookups; analysis may run in a worker process, so the caller
+    records it as metrics. With provisional=True and the summarizer available,
+    the summary is extractive and 'summary_status' is 'provisional': the caller
+    replaces it later with refine_summaries.
+    """
+    with _tracing() as trace:
+        return _analyze_document(file_path, file_type, trace, provisional)
+
+
+def analyze_text(text):
+    """Analyze already extracted text; same result as analyze_document without the text itself"""
+    with _tracing() as trace:
+        return _analyze_text(text, trace)
+
+
+@contextmanager
+def _tracing():
+    """Collect fallbacks and cache lookups made on this thread into a new trace"""
+    trace = {'stages': {}, 'fallbacks': [], 'cache': []}
+    _trace.fallbacks = trace['fallbacks']
+    _trace.cache = trace['cache']
+    try:
+        yield trace
+    finally:
+        _trace.fallbacks = None
+        _trace.cache = None
+
+
+def _analyze_concurrently(fn, items):
+    """Run fn(*item) for every item on concurrent threads; returns (results, error) per item"""
+    with ThreadPoolExecutor(max_workers=len(items), thread_name_prefix='analysis') as pool:
+        futures = [pool.submit(fn, *item) for item in items]
+
+    outcomes = []
+    for future in futures:
+        try:
+            outcomes.append((future.result(), None))
+        except Exception as e:
+            outcomes.append((None, str(e)))
+    return outcomes
+
+
+def analyze_documents(documents, provisional=False):
+    """Analyze several (file_path, file_type) documents together
+
+    Documents run on concurrent threads, so their model calls are grouped into
+    shared batches by the inference engine. Returns one (results, error) pair
+    per document, in order; one failing document does not fail the others.
+    """
+    return _analyze_concurrently(analyze_document, [(*document, provisional) for document in documents])
+
+
+def refine_summaries(texts):
+    """Abstractive summaries replacing provisional ones; one (results, error) pair per text"""
+    return _analyze_concurrently(_refine_summary, [(text,) for text in texts])
+
+
+def _refine_summary(text):
+    with _tracing() as trace:
+        with _stage(trace, 'summary'):
+            summary = generate_summary(text)
+        if any(reason == 'error' for _, reason in trace['fallbacks']):
+            raise Exception("Abstractive summarization failed; keeping the provisional summary")
+        return {'summary': summary, 'trace': trace}
+
+
+def reanalyze_documents(items):
+    """Re-run analysis for (text, file_path, file_type) items, like analyze_documents
+
+    Stored text is reused; items without text are extracted from their file
+    again, and only those results include 'extracted_text'.
+    """
+    return _analyze_concurrently(_reanalyze, items)
+
+
+def _reanalyze(text, file_path, file_type):
+    if text is None:
+        return analyze_document(file_path, file_type)
+    return analyze_text(text)
+
+
+def _analyze_document(file_path, file_type, trace, provisional=False):
     # Extract text
-    extracted_text = extract_text(file_path, file_type)
-    
+    page_timings = []
+    with _stage(trace, 'extract_text'):
+        extracted_text = extract_text(file_path, file_type, timings=page_timings)
+    
+    results = _analyze_text(extracted_text, trace, provisional)
+    results['extracted_text'] = extracted_text
+    results['page_timings'] = page_timings
+    return results
+
+
+def _analyze_text(extracted_text, trace, provisional=False):
     if not extracted_text:
         raise Exception("No text could be extracted from the document")
     
-    # Generate summary
-    summary = generate_summary(extracted_text)
+    # Every stage reuses the word and sentence offsets found once here
+    document = prepare(extracted_text)
+    
+    # Generate summary (extractive for now when the abstractive one is deferred)
+    if provisional and registry.get('summarizer'):
+        with _stage(trace, 'extractive_summary'):
+            summary, summary_status = generate_extractive_summary(document), 'provisional'
+    else:
+        with _stage(trace, 'summary'):
+            summary, summary_status = generate_summary(document), 'final'
     
     # Extract key points
-    key_points = extract_key_points(extracted_text)
+    with _stage(trace, 'key_points'):
+        key_points = extract_key_points(document)
     
     # Analyze sentiment
-    sentiment, sentiment_score = analyze_sentiment(extracted_text)
+    with _stage(trace, 'sentiment'):
+        sentiment, sentiment_score = analyze_sentiment(document)
     
     # Count words
-    word_count = len(extracted_text.split())
+    word_count = document.word_count
     
     return {
-        'extracted_text': extracted_text,
         'summary': summary,
+        'summary_status': summary_status,
         'key_points': json.dumps(key_points),
         'sentiment': sentiment,
         'sentiment_score': sentiment_score,
-        'word_count': word_count
+        'word_count': word_count,
+        'version': analysis_version(),
+        'trace': trace
     }